@@ -3,19 +3,24 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from app.extensions import db, cache, compress
 from app.utils.limiters import limiter
+from app.utils.event_bus import event_bus
 from app.config import config
 
-def create_app(config_name='development'):
+def create_app(config_name='development', start_background=True):
+    """Build the app; scripts pass start_background=False, stored as
+    BACKGROUND_JOBS, so services skip starting their background threads."""
     app = Flask(__name__)
     
     # Load config
     app.config.from_object(config[config_name])
+    app.config['BACKGROUND_JOBS'] = start_background
     
     # Initialize extensions
     db.init_app(app)
     cache.init_app(app)
     limiter.init_app(app)
     compress.init_app(app)
+    event_bus.init_app(app)
     
     # Enable CORS
     CORS(app)
@@ -42,6 +47,26 @@ def create_app(config_name='development'):
         app.register_blueprint(video_routes.video_bp, url_prefix='/video')
         app.register_blueprint(water_quality_bp)
 
+        # Alerts are evaluated in the background instead of inside the insert flush
+        from app.services.alert_service import alert_evaluator
+        alert_evaluator.init_app(app)
+
+        # Detection models load lazily on first use, not per imported module
+        from app.services.model_registry import model_registry
+        model_registry.init_app(app)
+
+        # PDF reports are built on a worker pool and cached by data watermark
+        from app.services.report_jobs import report_jobs
+        report_jobs.init_app(app)
+
+        # Old readings move to Parquet; reads merge both tiers
+        from app.services.archive_service import archive
+        archive.init_app(app)
+
+        # Rollups keep reports and charts off the raw readings
+        from app.services.rollup_service import rollups
+        rollups.init_app(app)
+
     # Error handlers
     @app.errorhandler(404)
     def not_found_error(error):
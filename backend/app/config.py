@@ -1,4 +1,6 @@
 # app/config.py
+import os
+
 class Config:
     # Database configuration
     SQLALCHEMY_DATABASE_URI = 'mysql+pymysql://root:@localhost/dbserial'
@@ -21,6 +23,68 @@ class Config:
     # Rate limiting
     RATELIMIT_DEFAULT = "200 per day;50 per hour;1 per second"
     
+    # Largest batch accepted by /update_sensor_data/bulk
+    BULK_INGEST_MAX_ROWS = 10000
+    
+    # How long GET /data keeps a computed row count
+    DATA_COUNT_CACHE_TIMEOUT = 30  # seconds
+    
+    # Newest reading kept in the cache backend; refreshed on ingest
+    CURRENT_STATE_TIMEOUT = 60  # seconds
+    
+    # Background alert evaluation
+    ALERT_BATCH_SIZE = 500
+    ALERT_SWEEP_INTERVAL = 5  # seconds
+    ALERT_SWEEP_OVERLAP = 1000  # ids behind the watermark re-checked for late commits
+    
+    # Ingest events for WebSocket push; None keeps them in-process
+    EVENT_BUS_REDIS_URL = None
+    
+    # Compact WebSocket clients get a full keyframe every N delta frames
+    LIVE_KEYFRAME_INTERVAL = 30
+    
+    # Cameras watched by DetectionService: USB index, IP camera URL or video file
+    DETECTION_SOURCES = [
+        {'name': 'camera0', 'uri': 0},
+        # {'name': 'tank2', 'uri': 'http://192.168.18.137:8080/video'},
+    ]
+    DETECTION_TARGET_FPS = 5  # per source, lowered automatically under load
+    DETECTION_BATCH_SIZE = 8
+    
+    # Frames whose thumbnail differs less than this (0-255) reuse the last detections
+    MOTION_GATE_THRESHOLD = 4.0
+    MOTION_GATE_REFRESH = 5.0  # seconds between forced inferences
+    
+    # Detection models, loaded on first use
+    DETECTION_MODELS = {
+        'catfish': "C:/Users/ADMIN/AquaAutoManS/machine_learning/weights/best1.pt"
+    }
+    DETECTION_MODEL_FORMAT = None  # None (PyTorch), 'onnx', 'openvino' or 'onnxruntime'
+    DETECTION_MIN_BOX_SIZE = 0  # pixels; boxes narrower or shorter than this are dropped as noise
+    # ONNX Runtime backend
+    DETECTION_MODEL_INT8 = False
+    ONNX_INTRA_OP_THREADS = 0  # 0 = one thread per physical core
+    ONNX_INTER_OP_THREADS = 1
+    # Set to ('127.0.0.1', 6001) to share one model via inference_server.py
+    INFERENCE_SERVER_ADDRESS = None
+    # Shared secret for the server and its clients; the server refuses to start without it
+    INFERENCE_SERVER_AUTHKEY = os.environ.get('AQUAMANS_INFERENCE_AUTHKEY', '').encode() or None
+    
+    # Background PDF report jobs; cached files are shared by identical requests
+    REPORT_JOB_WORKERS = 2
+    REPORT_CACHE_DIR = None  # None = <system temp dir>/aquamans_reports
+    REPORT_CACHE_TTL = 86400  # seconds
+    REPORT_CACHE_MAX_FILES = 200
+    
+    # Minute/hour/day rollups read by reports and charts
+    ROLLUP_INTERVAL = 60  # seconds between compaction passes
+    ROLLUP_LATE_WINDOW = 300  # seconds re-rolled each pass for late detection counts and alerts
+    
+    # Parquet archive for old readings; None disables tiering (e.g. 30)
+    ARCHIVE_AFTER_DAYS = None
+    ARCHIVE_DIR = None  # None = backend/archive
+    ARCHIVE_INTERVAL = 3600  # seconds between tiering passes
+    
     # Compression
     COMPRESS_MIMETYPES = ['text/html', 'text/css', 'text/xml', 'application/json']
     COMPRESS_LEVEL = 6
@@ -32,6 +96,7 @@ class DevelopmentConfig(Config):
 
 class ProductionConfig(Config):
     DEBUG = False
+    EVENT_BUS_REDIS_URL = 'redis://localhost:6379/0'
 
 config = {
     'development': DevelopmentConfig,
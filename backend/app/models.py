@@ -2,9 +2,10 @@
 
 from app import db
 from datetime import datetime
-from sqlalchemy import Index, event
+from sqlalchemy import Index
 from sqlalchemy.orm import relationship
 from app.extensions import db
+from app.utils.thresholds import evaluate_alerts
 
 class aquamans(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -19,10 +20,12 @@ class aquamans(db.Model):
     catfish = db.Column(db.Float, default=0)
     dead_catfish = db.Column(db.Float, default=0)
     timeData = db.Column(db.DateTime, default=datetime.utcnow, index=True)
-    dead_catfish_image = db.Column(db.LargeBinary, nullable=True)
+    # Snapshot bytes live in catfish_image so time-series scans never touch them
+    image_id = db.Column(db.Integer, db.ForeignKey('catfish_image.id'), nullable=True, index=True)
     
     # Add relationship to alerts
     alerts = relationship('Alert', backref='reading', lazy='dynamic')
+    image = relationship('CatfishImage', lazy='select')
 
     # Add indexes for commonly queried columns
     __table_args__ = (
@@ -52,73 +55,75 @@ class aquamans(db.Model):
 
     def check_parameters(self):
         """Check if any parameters are outside normal ranges"""
-        alerts = []
-        
-        # Temperature check
-        if self.temperature <= 20 or self.temperature >= 35:
-            alerts.append({
-                'type': 'temperature',
-                'severity': 'critical',
-                'value': self.temperature,
-                'message': f'Temperature is {self.tempResult}'
-            })
-        elif 20 < self.temperature < 26 or 32 <= self.temperature < 35:
-            alerts.append({
-                'type': 'temperature',
-                'severity': 'warning',
-                'value': self.temperature,
-                'message': f'Temperature is {self.tempResult}'
-            })
-
-        # Oxygen check
-        if self.oxygen <= 0.8:
-            alerts.append({
-                'type': 'oxygen',
-                'severity': 'critical',
-                'value': self.oxygen,
-                'message': f'Oxygen is {self.oxygenResult}'
-            })
-        elif self.oxygen < 1.5:
-            alerts.append({
-                'type': 'oxygen',
-                'severity': 'warning',
-                'value': self.oxygen,
-                'message': f'Oxygen is {self.oxygenResult}'
-            })
-
-        # pH check
-        if self.phlevel < 4 or self.phlevel > 9:
-            alerts.append({
-                'type': 'ph',
-                'severity': 'critical',
-                'value': self.phlevel,
-                'message': f'pH is {self.phResult}'
-            })
-        elif 4 <= self.phlevel < 6 or 7.5 < self.phlevel <= 9:
-            alerts.append({
-                'type': 'ph',
-                'severity': 'warning',
-                'value': self.phlevel,
-                'message': f'pH is {self.phResult}'
-            })
-
-        # Turbidity check
-        if self.turbidity >= 50:
-            alerts.append({
-                'type': 'turbidity',
-                'severity': 'critical',
-                'value': self.turbidity,
-                'message': f'Turbidity is {self.turbidityResult}'
-            })
-        elif 20 <= self.turbidity < 50:
-            alerts.append({
-                'type': 'turbidity',
-                'severity': 'warning',
-                'value': self.turbidity,
-                'message': f'Turbidity is {self.turbidityResult}'
-            })
-
-        return alerts
+        return evaluate_alerts([self])[0]
+
+class CatfishImage(db.Model):
+    """Content-addressed dead catfish snapshot, shared by identical frames"""
+    __tablename__ = 'catfish_image'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    data = db.Column(db.LargeBinary(length=16777215), nullable=False)  # MEDIUMBLOB on MySQL
+    size = db.Column(db.Integer)
+    content_type = db.Column(db.String(50), default='image/jpeg')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CatfishImage {self.id} {self.sha256[:12]}>'
+
+class ReadingRollup(db.Model):
+    """Per-minute/hour/day aggregates of aquamans, maintained by app.services.rollup_service"""
+    __tablename__ = 'aquamans_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(10), nullable=False)  # 'minute', 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    alert_count = db.Column(db.Integer, nullable=False, default=0)
+    # <column>_count counts non-null values; mean = <column>_sum / <column>_count
+    temperature_min = db.Column(db.Float)
+    temperature_max = db.Column(db.Float)
+    temperature_sum = db.Column(db.Float)
+    temperature_count = db.Column(db.Integer)
+    oxygen_min = db.Column(db.Float)
+    oxygen_max = db.Column(db.Float)
+    oxygen_sum = db.Column(db.Float)
+    oxygen_count = db.Column(db.Integer)
+    phlevel_min = db.Column(db.Float)
+    phlevel_max = db.Column(db.Float)
+    phlevel_sum = db.Column(db.Float)
+    phlevel_count = db.Column(db.Integer)
+    turbidity_min = db.Column(db.Float)
+    turbidity_max = db.Column(db.Float)
+    turbidity_sum = db.Column(db.Float)
+    turbidity_count = db.Column(db.Integer)
+    catfish_min = db.Column(db.Float)
+    catfish_max = db.Column(db.Float)
+    catfish_sum = db.Column(db.Float)
+    catfish_count = db.Column(db.Integer)
+    dead_catfish_min = db.Column(db.Float)
+    dead_catfish_max = db.Column(db.Float)
+    dead_catfish_sum = db.Column(db.Float)
+    dead_catfish_count = db.Column(db.Integer)
+
+    __table_args__ = (
+        Index('idx_rollup_bucket', 'resolution', 'bucket_start', unique=True),
+    )
+
+    def __repr__(self):
+        return f'<ReadingRollup {self.resolution} {self.bucket_start}>'
+
+class JobState(db.Model):
+    """Progress of a background job, kept in the database so restarts resume where it stopped."""
+    __tablename__ = 'background_job_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer)          # newest aquamans.id handled
+    last_time = db.Column(db.DateTime)       # newest timeData handled, for time-based jobs
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<JobState {self.name} {self.last_id} {self.last_time}>'
 
 class Alert(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -147,23 +152,3 @@ class Alert(db.Model):
             'acknowledged_at': self.acknowledged_at.strftime('%Y-%m-%d %H:%M:%S') if self.acknowledged_at else None,
             'acknowledged_by': self.acknowledged_by
         }
-
-# Add SQLAlchemy event listeners to automatically create alerts
-@event.listens_for(aquamans, 'after_insert')
-def check_parameters_after_insert(mapper, connection, target):
-    alerts = target.check_parameters()
-    if alerts:
-        for alert_data in alerts:
-            alert = Alert(
-                reading_id=target.id,
-                alert_type='water_quality',
-                severity=alert_data['severity'],
-                parameter=alert_data['type'],
-                value=alert_data['value'],
-                message=alert_data['message']
-            )
-            db.session.add(alert)
-        try:
-            db.session.commit()
-        except:
-            db.session.rollback()
\ No newline at end of file
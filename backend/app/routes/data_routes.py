@@ -17,12 +17,30 @@ def get_data():
     date_filter = request.args.get('date')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
-    return data_service.get_data(date_filter, page, per_page)
+    # Passing cursor (empty for the first page) switches to keyset pagination
+    cursor = request.args.get('cursor')
+    total_mode = request.args.get('total')
+    if total_mode not in (None, 'exact', 'approx', 'none'):
+        return jsonify({'error': 'total must be exact, approx or none'}), 400
+    return data_service.get_data(date_filter, page, per_page, cursor, total_mode)
+
+def series_args():
+    """Time range and downsampling options shared by the *-data chart endpoints"""
+    return (
+        request.args.get('start'),
+        request.args.get('end'),
+        request.args.get('points', type=int),
+        request.args.get('mode')
+    )
+
+def stream_arg():
+    """?stream=1 streams filtered results instead of building one JSON document"""
+    return request.args.get('stream', default=False, type=lambda v: v.lower() in ('1', 'true'))
 
 @bp.route('/temperature-data', methods=['GET'])
 @limiter.exempt
 def get_temperature_data():
-    return data_service.get_temperature_data()
+    return data_service.get_temperature_data(*series_args())
 
 @bp.route('/filtered-temperature-data', methods=['GET'])
 @limiter.exempt
@@ -30,12 +48,13 @@ def get_filtered_temperature_data():
     filter_type = request.args.get('filter', 'date')
     selected_date = request.args.get('selected_date')
     selected_week_start = request.args.get('week_start')
-    return data_service.get_filtered_temperature_data(filter_type, selected_date, selected_week_start)
+    stream = stream_arg()
+    return data_service.get_filtered_temperature_data(filter_type, selected_date, selected_week_start, stream)
 
 @bp.route('/oxygen-data', methods=['GET'])
 @limiter.exempt
 def get_oxygen_data():
-    return data_service.get_oxygen_data()
+    return data_service.get_oxygen_data(*series_args())
 
 @bp.route('/filtered-oxygen-data', methods=['GET'])
 @limiter.exempt
@@ -43,12 +62,13 @@ def get_filtered_oxygen_data():
     filter_type = request.args.get('filter', 'date')
     selected_date = request.args.get('selected_date')
     selected_week_start = request.args.get('week_start')
-    return data_service.get_filtered_oxygen_data(filter_type, selected_date, selected_week_start)
+    stream = stream_arg()
+    return data_service.get_filtered_oxygen_data(filter_type, selected_date, selected_week_start, stream)
 
 @bp.route('/phlevel-data', methods=['GET'])
 @limiter.exempt
 def get_phlevel_data():
-    return data_service.get_phlevel_data()
+    return data_service.get_phlevel_data(*series_args())
 
 @bp.route('/filtered-phlevel-data', methods=['GET'])
 @limiter.exempt
@@ -56,12 +76,13 @@ def get_filtered_phlevel_data():
     filter_type = request.args.get('filter', 'date')
     selected_date = request.args.get('selected_date')
     selected_week_start = request.args.get('week_start')
-    return data_service.get_filtered_phlevel_data(filter_type, selected_date, selected_week_start)
+    stream = stream_arg()
+    return data_service.get_filtered_phlevel_data(filter_type, selected_date, selected_week_start, stream)
 
 @bp.route('/turbidity-data', methods=['GET'])
 @limiter.exempt
 def get_turbidity_data():
-    return data_service.get_turbidity_data()
+    return data_service.get_turbidity_data(*series_args())
 
 @bp.route('/filtered-turbidity-data', methods=['GET'])
 @limiter.exempt
@@ -69,7 +90,8 @@ def get_filtered_turbidity_data():
     filter_type = request.args.get('filter', 'date')
     selected_date = request.args.get('selected_date')
     selected_week_start = request.args.get('week_start')
-    return data_service.get_filtered_turbidity_data(filter_type, selected_date, selected_week_start)
+    stream = stream_arg()
+    return data_service.get_filtered_turbidity_data(filter_type, selected_date, selected_week_start, stream)
 
 # Add support for weekly filter
 def handle_weekly_filter(query, week_start):
@@ -1,48 +1,115 @@
-from flask import Blueprint, jsonify, request, Response
+from flask import Blueprint, jsonify, request, Response, url_for
 from app.services.report_service import ReportService
+from app.services.report_jobs import report_jobs
 from app import cache
 from datetime import datetime
+from werkzeug.datastructures import MultiDict
 
 bp = Blueprint('report', __name__)
 report_service = ReportService()
 
+# PDFs are built by the report job queue; the /print endpoints wait for the job
+report_jobs.register('data', report_service.print_data_report, report_service.data_report_window)
+report_jobs.register('dead_catfish', report_service.print_dead_catfish_report, report_service.dead_catfish_report_window)
+
+def _data_report_params(args):
+    """Validated print_data_report parameters, or an error response."""
+    time_filter = args.get('hours', default=0, type=int)
+    date_filter = args.get('date', default=None, type=str)
+
+    # Validate date format if provided
+    if date_filter:
+        try:
+            datetime.strptime(date_filter, "%Y-%m-%d")
+        except ValueError:
+            return None, (jsonify({
+                "error": "Invalid date format. Please use YYYY-MM-DD"
+            }), 400)
+
+    # Validate hours if provided
+    if time_filter < 0:
+        return None, (jsonify({
+            "error": "Hours filter must be a positive number"
+        }), 400)
+
+    return {'time_filter': time_filter, 'date_filter': date_filter}, None
+
 @bp.route('/check_dead_catfish', methods=['GET'])
 def check_dead_catfish():
     return report_service.check_dead_catfish()
 
 @bp.route('/check_dead_catfish/print/<alert_id>', methods=['GET'])
 def print_dead_catfish_report(alert_id):
-    return report_service.print_dead_catfish_report(alert_id)
+    return report_jobs.run('dead_catfish', {'alert_id': alert_id})
 
 @bp.route('/check_data/print', methods=['GET'])
 def print_data_report():
     try:
-        time_filter = request.args.get('hours', default=0, type=int)
-        date_filter = request.args.get('date', default=None, type=str)
-
-        # Validate date format if provided
-        if date_filter:
-            try:
-                datetime.strptime(date_filter, "%Y-%m-%d")
-            except ValueError:
-                return jsonify({
-                    "error": "Invalid date format. Please use YYYY-MM-DD"
-                }), 400
-
-        # Validate hours if provided
-        if time_filter < 0:
+        params, error = _data_report_params(request.args)
+        if error:
+            return error
+
+        return report_jobs.run('data', params)
+
+    except Exception as e:
+        return jsonify({
+            "error": "An error occurred while generating the report",
+            "details": str(e)
+        }), 500
+
+def _job_status(job):
+    return dict(
+        job,
+        status_url=url_for('report.get_report_job', job_id=job['id']),
+        download_url=url_for('report.download_report_job', job_id=job['id'])
+    )
+
+@bp.route('/reports/jobs', methods=['POST'])
+def submit_report_job():
+    """Queue a report: {"type": "data", "hours": 3} or {"type": "data", "date": "YYYY-MM-DD"},
+    {"type": "dead_catfish", "alert_id": ...}, {"type": "water_quality", "alert_id": ...}."""
+    try:
+        body = MultiDict(request.get_json(silent=True) or request.args)
+        report_type = body.get('type')
+
+        if report_type == 'data':
+            params, error = _data_report_params(body)
+            if error:
+                return error
+        elif report_type in ('dead_catfish', 'water_quality'):
+            if not body.get('alert_id'):
+                return jsonify({"error": "alert_id is required"}), 400
+            params = {'alert_id': str(body['alert_id'])}
+        else:
             return jsonify({
-                "error": "Hours filter must be a positive number"
+                "error": "Unknown report type",
+                "types": sorted(report_jobs.report_types)
             }), 400
 
-        return report_service.print_data_report(time_filter, date_filter)
+        job = report_jobs.submit(report_type, params)
+        return jsonify(_job_status(job)), 200 if job['status'] == 'done' else 202
 
     except Exception as e:
         return jsonify({
-            "error": "An error occurred while generating the report",
+            "error": "An error occurred while queueing the report",
             "details": str(e)
         }), 500
 
+@bp.route('/reports/jobs/<job_id>', methods=['GET'])
+def get_report_job(job_id):
+    job = report_jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Not found', 'message': 'Unknown or expired report job'}), 404
+    return jsonify(_job_status(job))
+
+@bp.route('/reports/jobs/<job_id>/download', methods=['GET'])
+def download_report_job(job_id):
+    return report_jobs.response(job_id)
+
+@bp.route('/reports/jobs/stats', methods=['GET'])
+def report_job_stats():
+    return jsonify(report_jobs.stats)
+
 # Add error handlers for the blueprint
 @bp.errorhandler(404)
 def handle_404(e):
@@ -1,41 +1,22 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from app.services.sensor_service import SensorService
+from app.services.current_state import current_state
 from app import cache, db
 from app.models import aquamans
 from app.utils.limiters import limiter
 from datetime import datetime
+import json
 import logging
-import time
 
 bp = Blueprint('sensor', __name__)
 sensor_service = SensorService()
 
-sensor_cache = {
-    'last_update': 0,
-    'data': None,
-    'cache_duration': 0.5  # 500ms cache
-}
-
 def get_cached_sensor_data():
-    current_time = time.time()
-    if (current_time - sensor_cache['last_update'] > sensor_cache['cache_duration'] 
-        or sensor_cache['data'] is None):
-        try:
-            latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-            sensor_cache['data'] = {
-                'temperature': latest_record.temperature,
-                'oxygen': latest_record.oxygen,
-                'phlevel': latest_record.phlevel,
-                'turbidity': latest_record.turbidity,
-                'catfish': latest_record.catfish,
-                'dead_catfish': latest_record.dead_catfish,
-                'timestamp': latest_record.timeData.isoformat()
-            }
-            sensor_cache['last_update'] = current_time
-        except Exception as e:
-            logging.error(f"Error fetching sensor data: {e}")
-            return None
-    return sensor_cache['data']
+    try:
+        return current_state.get()
+    except Exception as e:
+        logging.error(f"Error fetching sensor data: {e}")
+        return None
 
 @bp.route('/sensor-data', methods=['GET'])
 @limiter.exempt
@@ -82,6 +63,27 @@ def get_turbidity():
 def update_sensor_data():
     return sensor_service.update_sensor_data(request.json)
 
+@bp.route('/update_sensor_data/bulk', methods=['POST'])
+@limiter.limit("100/minute")
+def bulk_update_sensor_data():
+    """Accepts a JSON array of readings or an NDJSON body (one reading per line)."""
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            readings = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        else:
+            readings = request.get_json(silent=True)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid NDJSON: {e}'}), 400
+
+    if not isinstance(readings, list):
+        return jsonify({'status': 'error', 'message': 'Expected a JSON array or NDJSON body of readings'}), 400
+
+    max_rows = current_app.config.get('BULK_INGEST_MAX_ROWS', 10000)
+    if len(readings) > max_rows:
+        return jsonify({'status': 'error', 'message': f'Too many readings, at most {max_rows} per request'}), 413
+
+    return sensor_service.bulk_update_sensor_data(readings)
+
 @bp.route('/update_detection', methods=['POST'])
 @limiter.exempt
 def update_detection():
@@ -90,11 +92,13 @@ def update_detection():
         if not data:
             return jsonify({'status': 'error', 'message': 'No data received'}), 400
 
-        catfish_count = int(data.get('catfish', 0))
-        dead_catfish_count = int(data.get('dead_catfish', 0))
+        # Reporters send the newest counts of every active camera; the tank totals are their sum
+        updates = data if isinstance(data, list) else [data]
+        catfish_count = sum(int(update.get('catfish', 0)) for update in updates)
+        dead_catfish_count = sum(int(update.get('dead_catfish', 0)) for update in updates)
         
-        # Get the latest record
-        latest_record = aquamans.query.order_by(aquamans.id.desc()).first()
+        # Newest by reading time; a backfilled bulk batch can hold the highest ids
+        latest_record = aquamans.query.order_by(aquamans.timeData.desc(), aquamans.id.desc()).first()
         
         if latest_record:
             latest_record.catfish = catfish_count
@@ -119,11 +123,11 @@ def update_detection():
 @limiter.exempt
 def get_catfish():
     try:
-        latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-        if latest_record:
+        data = current_state.get()
+        if data:
             return jsonify({
                 'status': 'success',
-                'catfish': latest_record.catfish
+                'catfish': data['catfish']
             })
         return jsonify({
             'status': 'error',
@@ -140,11 +144,11 @@ def get_catfish():
 @limiter.exempt
 def get_dead_catfish():
     try:
-        latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-        if latest_record:
+        data = current_state.get()
+        if data:
             return jsonify({
                 'status': 'success',
-                'dead_catfish': latest_record.dead_catfish
+                'dead_catfish': data['dead_catfish']
             })
         return jsonify({
             'status': 'error',
@@ -1,22 +1,31 @@
 from flask import Blueprint, jsonify, request
 from app.extensions import db
 from app.services.water_quality_service import WaterQualityService
+from app.services.current_state import current_state
+from app.services.report_jobs import report_jobs
 from app.models import aquamans
 from datetime import datetime, timedelta
 
 bp = Blueprint('water_quality', __name__, url_prefix='/api/water-quality')
 water_quality_service = WaterQualityService()
 
+report_jobs.register(
+    'water_quality',
+    water_quality_service.print_water_quality_report,
+    water_quality_service.water_quality_report_window
+)
+
 @bp.route('/check', methods=['GET'])
 def check_water_quality():
     try:
-        # Get latest record
-        latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-        if not latest_record:
+        # Latest reading comes from the shared current-state cache
+        latest = current_state.get()
+        if not latest:
             return jsonify({"message": "No data available"})
+        latest_time = datetime.fromisoformat(latest['timestamp'])
 
         # Get historical data for trend analysis
-        three_hours_ago = latest_record.timeData - timedelta(hours=3)
+        three_hours_ago = latest_time - timedelta(hours=3)
         historical_data = (
             aquamans.query
             .filter(aquamans.timeData >= three_hours_ago)
@@ -31,19 +40,19 @@ def check_water_quality():
         turbidity_trend = calculate_trend([record.turbidity for record in historical_data])
 
         return jsonify({
-            "alert_id": f"wq_{latest_record.id}",
-            "time_detected": latest_record.timeData.isoformat(),
-            "temperature": latest_record.temperature,
-            "tempResult": latest_record.tempResult,
+            "alert_id": f"wq_{latest['id']}",
+            "time_detected": latest['timestamp'],
+            "temperature": latest['temperature'],
+            "tempResult": latest['tempResult'],
             "temperature_trend": temperature_trend,
-            "oxygen": latest_record.oxygen,
-            "oxygenResult": latest_record.oxygenResult,
+            "oxygen": latest['oxygen'],
+            "oxygenResult": latest['oxygenResult'],
             "oxygen_trend": oxygen_trend,
-            "phlevel": latest_record.phlevel,
-            "phResult": latest_record.phResult,
+            "phlevel": latest['phlevel'],
+            "phResult": latest['phResult'],
             "ph_trend": ph_trend,
-            "turbidity": latest_record.turbidity,
-            "turbidityResult": latest_record.turbidityResult,
+            "turbidity": latest['turbidity'],
+            "turbidityResult": latest['turbidityResult'],
             "turbidity_trend": turbidity_trend,
             "historical_data": {
                 "temperature": format_historical_data(historical_data, 'temperature'),
@@ -80,7 +89,7 @@ def format_historical_data(records, parameter):
 
 @bp.route('/print/<alert_id>', methods=['GET'])
 def print_water_quality_report(alert_id):
-    return water_quality_service.print_water_quality_report(alert_id)
+    return report_jobs.run('water_quality', {'alert_id': alert_id})
 
 @bp.route('/trends', methods=['GET'])
 def get_water_quality_trends():
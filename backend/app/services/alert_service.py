@@ -0,0 +1,214 @@
+# app/services/alert_service.py
+import logging
+import queue
+import threading
+from collections import deque
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, load_only
+from app.extensions import db
+from app.models import aquamans, Alert
+from app.utils.thresholds import evaluate_alerts
+from app.services.current_state import current_state
+from app.utils.job_lock import JobLock, load_state, save_state
+
+# Columns needed to evaluate thresholds; keeps image bytes out of the batch query
+READING_COLUMNS = (
+    aquamans.id, aquamans.temperature, aquamans.tempResult,
+    aquamans.oxygen, aquamans.oxygenResult, aquamans.phlevel, aquamans.phResult,
+    aquamans.turbidity, aquamans.turbidityResult
+)
+
+class AlertEvaluator:
+    """Generates water-quality alerts off the ingest path.
+
+    Committed `aquamans` inserts push their IDs onto a queue. A background
+    thread drains the queue, also sweeps for rows written outside the ORM
+    (serial scripts, bulk uploads), evaluates thresholds for the whole batch
+    and bulk-inserts the resulting `Alert` rows in one transaction.
+
+    Only the process holding the `alert_evaluator` job lock evaluates;
+    the others drop their queued IDs, which its sweep picks up. The sweep
+    watermark is committed with each batch's alerts in `background_job_state`,
+    so a restart resumes at the first unevaluated reading, and readings that
+    already have water-quality alerts are skipped.
+
+    Auto-increment ids can commit out of order (concurrent bulk uploads), so
+    each sweep also re-checks the `overlap` ids behind the watermark; the
+    recently evaluated set keeps that from evaluating a reading twice.
+    """
+
+    def __init__(self, batch_size=500, sweep_interval=5, recent_size=10000, overlap=1000):
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self.overlap = overlap
+        self.queue = queue.Queue()
+        self.lock = JobLock('aquamans_alert_evaluator')
+        self.watermark = None
+        self.recent = deque(maxlen=recent_size)
+        self.recent_set = set()
+        self.thread = None
+        self.stats = {'evaluated': 0, 'alerts': 0, 'batches': 0, 'duplicates': 0, 'errors': 0}
+
+    def init_app(self, app):
+        self.batch_size = app.config.get('ALERT_BATCH_SIZE', self.batch_size)
+        self.sweep_interval = app.config.get('ALERT_SWEEP_INTERVAL', self.sweep_interval)
+        self.overlap = app.config.get('ALERT_SWEEP_OVERLAP', self.overlap)
+        if self.thread is None and app.config.get('BACKGROUND_JOBS', True):
+            self.thread = threading.Thread(target=self._run, args=(app,), daemon=True)
+            self.thread.start()
+            logging.info("Alert evaluator started")
+
+    def enqueue(self, reading_ids):
+        for reading_id in reading_ids:
+            self.queue.put(reading_id)
+
+    def _run(self, app):
+        backlog = False
+        while True:
+            ids = set()
+            try:
+                # A full sweep means there is more to catch up on, so don't wait
+                ids.add(self.queue.get(timeout=0 if backlog else self.sweep_interval))
+                while len(ids) < self.batch_size:
+                    ids.add(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            with app.app_context():
+                try:
+                    if self.lock.held():
+                        backlog = self.process(ids)
+                    else:
+                        # The lock holder's sweep covers these rows
+                        self.watermark = None
+                        backlog = False
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logging.error(f"Error evaluating alerts: {e}")
+                    db.session.rollback()
+                    # Reload the committed watermark on the next pass
+                    self.watermark = None
+                    backlog = False
+                finally:
+                    db.session.remove()
+
+    def _load_watermark(self):
+        state = load_state('alert_evaluator')
+        if state is not None and state.last_id is not None:
+            return state.last_id
+        # First run: readings up to the newest alerted one were evaluated at insert time
+        last_alerted = (
+            db.session.query(func.max(Alert.reading_id))
+            .filter(Alert.alert_type == 'water_quality')
+            .scalar()
+        )
+        if last_alerted is not None:
+            return last_alerted
+        return db.session.query(func.max(aquamans.id)).scalar() or 0
+
+    def process(self, ids):
+        """Evaluate queued IDs plus anything committed past the watermark.
+
+        Returns True when the sweep filled a whole batch and more rows are waiting.
+        """
+        if self.watermark is None:
+            self.watermark = self._load_watermark()
+
+        swept = (
+            db.session.query(aquamans.id)
+            .filter(aquamans.id > self.watermark)
+            .order_by(aquamans.id)
+            .limit(self.batch_size)
+            .all()
+        )
+        # Late commits behind the watermark; rows already handled are in recent_set
+        behind = (
+            db.session.query(aquamans.id)
+            .filter(aquamans.id > self.watermark - self.overlap, aquamans.id <= self.watermark)
+            .all()
+        )
+        ids = (ids | {row.id for row in swept} | {row.id for row in behind}) - self.recent_set
+        if ids:
+            # Another process may have evaluated these before this one took the lock
+            already = {
+                row.reading_id for row in
+                db.session.query(Alert.reading_id)
+                .filter(Alert.reading_id.in_(ids), Alert.alert_type == 'water_quality')
+                .distinct()
+            }
+            self.stats['duplicates'] += len(already)
+            ids -= already
+            for reading_id in already:
+                self._remember(reading_id)
+        if not ids:
+            if swept:
+                self._advance(swept[-1].id)
+                db.session.commit()
+            return len(swept) == self.batch_size
+
+        readings = (
+            aquamans.query
+            .options(load_only(*READING_COLUMNS))
+            .filter(aquamans.id.in_(ids))
+            .all()
+        )
+
+        alert_rows = []
+        for reading, alerts in zip(readings, evaluate_alerts(readings)):
+            for alert_data in alerts:
+                alert_rows.append({
+                    'reading_id': reading.id,
+                    'alert_type': 'water_quality',
+                    'severity': alert_data['severity'],
+                    'parameter': alert_data['type'],
+                    'value': alert_data['value'],
+                    'message': alert_data['message']
+                })
+
+        if alert_rows:
+            db.session.bulk_insert_mappings(Alert, alert_rows)
+        # Only the sweep advances the watermark, so queued IDs never skip unswept rows;
+        # it is committed with the alerts so neither can be lost without the other
+        if swept:
+            self._advance(swept[-1].id)
+        db.session.commit()
+
+        for reading in readings:
+            self._remember(reading.id)
+        if swept:
+            # Rows written outside the ORM (serial scripts, raw inserts) reach the cache here
+            current_state.refresh()
+
+        self.stats['evaluated'] += len(readings)
+        self.stats['alerts'] += len(alert_rows)
+        self.stats['batches'] += 1
+        return len(swept) == self.batch_size
+
+    def _advance(self, last_id):
+        save_state('alert_evaluator', last_id=last_id)
+        self.watermark = last_id
+
+    def _remember(self, reading_id):
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_set.discard(self.recent[0])
+        self.recent.append(reading_id)
+        self.recent_set.add(reading_id)
+
+alert_evaluator = AlertEvaluator()
+
+# Collect IDs during flush, hand them over only once the rows are committed
+@event.listens_for(aquamans, 'after_insert')
+def collect_new_reading(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault('new_reading_ids', []).append(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def queue_committed_readings(session):
+    reading_ids = session.info.pop('new_reading_ids', None)
+    if reading_ids:
+        alert_evaluator.enqueue(reading_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_rolled_back_readings(session):
+    session.info.pop('new_reading_ids', None)
@@ -0,0 +1,416 @@
+# app/services/archive_service.py
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, text
+from app.extensions import db
+from app.models import aquamans
+from app.utils.job_lock import JobLock
+
+# Every aquamans column is archived; image bytes already live in catfish_image
+ARCHIVE_COLUMNS = (
+    'id', 'temperature', 'tempResult', 'oxygen', 'oxygenResult', 'phlevel', 'phResult',
+    'turbidity', 'turbidityResult', 'catfish', 'dead_catfish', 'timeData', 'image_id'
+)
+
+# aquamans has no tank column yet, so every reading goes to one partition
+ARCHIVE_TANK = 'default'
+
+DELETE_BATCH_SIZE = 1000
+
+def _day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _combine(current, value, pick):
+    return value if current is None else pick(current, value)
+
+def reading_dict(row):
+    """aquamans.to_dict() for rows read through ReadingArchive.readings()."""
+    data = {column: getattr(row, column) for column in ARCHIVE_COLUMNS if column != 'image_id'}
+    data['timeData'] = row.timeData.strftime('%Y-%m-%d %H:%M:%S') if row.timeData else None
+    return data
+
+class ReadingArchive:
+    """Cold tier for old aquamans readings, stored as Parquet.
+
+    The tiering pass moves whole days older than `after_days` (relative to
+    the newest reading) into `<archive_dir>/tank=<tank>/date=<YYYY-MM-DD>/`
+    files and deletes them from MySQL. Readings referenced by an alert stay
+    in MySQL so Alert.reading keeps resolving. A day's rollups are rebuilt
+    from the complete day before its first file is written; later readings
+    with timestamps on an archived day are archived too, but not rolled up.
+
+    A day's file is first written as `.pending` and only renamed to
+    `.parquet` once its rows are deleted from MySQL, so readers never see a
+    row in both tiers; a pending file left by a failed pass is settled
+    against MySQL at the start of the next one. One process tiers at a time.
+
+    `readings()` merges the hot and cold tiers by time, reading the archive
+    one day at a time, so callers read a window the same way wherever its
+    rows live. Only windows that start before `horizon` (the end of the
+    newest archived day, re-read from the archive directory every
+    `horizon_ttl` seconds) touch Parquet. pyarrow is imported on first use.
+    """
+
+    def __init__(self, archive_dir=None, after_days=None, interval=3600, horizon_ttl=5):
+        self.archive_dir = archive_dir
+        self.after_days = after_days
+        self.interval = interval
+        self.horizon_ttl = horizon_ttl
+        self._horizon = None
+        self._horizon_checked = None
+        self.lock = JobLock('aquamans_archive')
+        self.thread = None
+        self.stats = {
+            'passes': 0,
+            'days_archived': 0,
+            'rows_archived': 0,
+            'pending_settled': 0,
+            'cold_reads': 0,
+            'errors': 0,
+            'last_pass_ms': None
+        }
+
+    def init_app(self, app):
+        self.archive_dir = app.config.get('ARCHIVE_DIR') or os.path.join(os.path.dirname(app.root_path), 'archive')
+        self.after_days = app.config.get('ARCHIVE_AFTER_DAYS', self.after_days)
+        self.interval = app.config.get('ARCHIVE_INTERVAL', self.interval)
+        self.refresh_horizon()
+        if self.after_days and self.thread is None and app.config.get('BACKGROUND_JOBS', True):
+            self.thread = threading.Thread(target=self._run, args=(app,), daemon=True)
+            self.thread.start()
+            logging.info(f"Archive tiering started: readings older than {self.after_days} days go to {self.archive_dir}")
+
+    def _run(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    if self.lock.held():
+                        self.tier()
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logging.error(f"Error archiving readings: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval)
+
+    # Layout
+
+    def _tank_dir(self):
+        return os.path.join(self.archive_dir, f"tank={ARCHIVE_TANK}")
+
+    def _day_dir(self, day):
+        return os.path.join(self._tank_dir(), f"date={day.strftime('%Y-%m-%d')}")
+
+    def archived_days(self):
+        try:
+            names = os.listdir(self._tank_dir())
+        except OSError:
+            return []
+        return sorted(datetime.strptime(name[len('date='):], '%Y-%m-%d') for name in names if name.startswith('date='))
+
+    def _day_files(self, day, suffix='.parquet'):
+        day_dir = self._day_dir(day)
+        try:
+            names = os.listdir(day_dir)
+        except OSError:
+            return []
+        return [os.path.join(day_dir, name) for name in sorted(names) if name.endswith(suffix)]
+
+    @property
+    def horizon(self):
+        """End of the newest archived day, None without an archive.
+
+        Another process (the tiering worker or archive_readings.py) may have
+        archived more days since, so the directory is listed again once the
+        cached value is `horizon_ttl` seconds old.
+        """
+        if self._horizon_checked is None or time.monotonic() - self._horizon_checked >= self.horizon_ttl:
+            self.refresh_horizon()
+        return self._horizon
+
+    def refresh_horizon(self):
+        days = self.archived_days()
+        self._horizon = days[-1] + timedelta(days=1) if days else None
+        self._horizon_checked = time.monotonic()
+        return self._horizon
+
+    def covers(self, start):
+        """True if a window starting at `start` (None = all history) reaches archived days."""
+        horizon = self.horizon
+        return horizon is not None and (start is None or start < horizon)
+
+    # Tiering
+
+    def tier(self, cutoff=None):
+        """Archive every whole day before `cutoff` (default: newest reading minus after_days)."""
+        started = time.perf_counter()
+        if cutoff is None:
+            newest = db.session.query(db.func.max(aquamans.timeData)).scalar()
+            if newest is None or not self.after_days:
+                return 0
+            cutoff = newest - timedelta(days=self.after_days)
+        cutoff = _day(cutoff)
+
+        for day in self.archived_days():
+            for path in self._day_files(day, '.pending'):
+                logging.warning(f"Settling archive file left by an earlier pass: {path}")
+                self._settle(path)
+                self.stats['pending_settled'] += 1
+
+        oldest = db.session.query(db.func.min(aquamans.timeData)).filter(aquamans.timeData < cutoff).scalar()
+        archived = 0
+        day = _day(oldest) if oldest is not None else cutoff
+        while day < cutoff:
+            archived += self._archive_day(day)
+            day += timedelta(days=1)
+
+        self.refresh_horizon()
+        self.stats['passes'] += 1
+        self.stats['last_pass_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return archived
+
+    def _archive_day(self, day):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        from app.services.rollup_service import rollups
+
+        next_day = day + timedelta(days=1)
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        with db.engine.connect() as connection:
+            rows = connection.execute(text(
+                f"SELECT {columns} FROM aquamans "
+                "WHERE timeData >= :day AND timeData < :next_day "
+                "AND NOT EXISTS (SELECT 1 FROM alert WHERE alert.reading_id = aquamans.id) "
+                "ORDER BY timeData, id"
+            ), {'day': day, 'next_day': next_day}).all()
+        if not rows:
+            return 0
+
+        day_dir = self._day_dir(day)
+        if not os.path.isdir(day_dir):
+            # First batch for this day: MySQL still holds all of it
+            rollups.rebuild(day, next_day)
+        os.makedirs(day_dir, exist_ok=True)
+
+        table = pa.table(
+            {column: [row[index] for row in rows] for index, column in enumerate(ARCHIVE_COLUMNS)},
+            schema=self._schema()
+        )
+        pending = os.path.join(day_dir, f"part-{rows[0].id}-{rows[-1].id}.parquet.pending")
+        partial = pending[:-len('.pending')] + '.part'
+        pq.write_table(table, partial, compression='zstd')
+        if pq.read_metadata(partial).num_rows != len(rows):
+            os.remove(partial)
+            raise IOError(f"Archive file for {day:%Y-%m-%d} is incomplete")
+        os.replace(partial, pending)
+
+        ids = [row.id for row in rows]
+        with db.engine.begin() as connection:
+            delete = text(
+                "DELETE FROM aquamans WHERE id IN :ids "
+                "AND NOT EXISTS (SELECT 1 FROM alert WHERE alert.reading_id = aquamans.id)"
+            ).bindparams(bindparam('ids', expanding=True))
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                connection.execute(delete, {'ids': ids[start:start + DELETE_BATCH_SIZE]})
+        path, archived = self._settle(pending)
+
+        self.stats['days_archived'] += 1
+        self.stats['rows_archived'] += archived
+        logging.info(f"Archived {archived} readings from {day:%Y-%m-%d} to {path}")
+        return archived
+
+    def _settle(self, pending):
+        """Publish a pending file with only the rows that have left MySQL.
+
+        Rows still in MySQL (the delete failed, or an alert started to
+        reference the reading in between) stay hot and are dropped from the
+        file. Returns the published path (None if nothing moved) and row count.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(pending)
+        ids = table['id'].to_pylist()
+        query = text("SELECT id FROM aquamans WHERE id IN :ids").bindparams(bindparam('ids', expanding=True))
+        remaining = []
+        with db.engine.connect() as connection:
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                remaining += connection.execute(query, {'ids': ids[start:start + DELETE_BATCH_SIZE]}).scalars().all()
+
+        path = pending[:-len('.pending')]
+        if remaining:
+            table = table.filter(pc.invert(pc.is_in(table['id'], value_set=pa.array(remaining, pa.int64()))))
+            if table.num_rows:
+                partial = path + '.part'
+                pq.write_table(table, partial, compression='zstd')
+                os.replace(partial, path)
+            os.remove(pending)
+            if not table.num_rows:
+                try:
+                    # An empty day directory would still move the horizon
+                    os.rmdir(os.path.dirname(pending))
+                except OSError:
+                    pass
+                return None, 0
+        else:
+            os.replace(pending, path)
+        return path, table.num_rows
+
+    def _schema(self):
+        import pyarrow as pa
+        return pa.schema([
+            ('id', pa.int64()),
+            ('temperature', pa.float64()),
+            ('tempResult', pa.string()),
+            ('oxygen', pa.float64()),
+            ('oxygenResult', pa.string()),
+            ('phlevel', pa.float64()),
+            ('phResult', pa.string()),
+            ('turbidity', pa.float64()),
+            ('turbidityResult', pa.string()),
+            ('catfish', pa.float64()),
+            ('dead_catfish', pa.float64()),
+            ('timeData', pa.timestamp('us')),
+            ('image_id', pa.int64()),
+        ])
+
+    # Reads
+
+    def cold_batches(self, start, stop, columns=ARCHIVE_COLUMNS, chunk_size=1000):
+        """Yield pyarrow RecordBatches of archived rows with start <= timeData < stop, in time order.
+
+        Days are read one at a time and sorted on their own (a day's rows
+        never sort before an earlier day's), so memory stays bounded by one
+        day of readings however wide the window is.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(dict.fromkeys(list(columns) + ['timeData']))
+        filters = []
+        if start is not None:
+            filters.append(('timeData', '>=', start))
+        if stop is not None:
+            filters.append(('timeData', '<', stop))
+        order = [('timeData', 'ascending')] + ([('id', 'ascending')] if 'id' in columns else [])
+
+        self.stats['cold_reads'] += 1
+        for day in self.archived_days():
+            if (start is not None and day + timedelta(days=1) <= start) or (stop is not None and day >= stop):
+                continue
+            tables = [pq.read_table(path, columns=columns, filters=filters or None) for path in self._day_files(day)]
+            if tables:
+                yield from pa.concat_tables(tables).sort_by(order).to_batches(chunk_size)
+
+    def cold_table(self, start, stop, columns=ARCHIVE_COLUMNS):
+        """Archived rows with start <= timeData < stop (None = open) as one Table; for short windows."""
+        import pyarrow as pa
+
+        columns = list(dict.fromkeys(list(columns) + ['timeData']))
+        batches = list(self.cold_batches(start, stop, columns))
+        if not batches:
+            return self._schema().empty_table().select(columns)
+        return pa.Table.from_batches(batches)
+
+    def first_time(self):
+        """Earliest archived timeData, None without an archive."""
+        days = self.archived_days()
+        if not days:
+            return None
+        table = self.cold_table(days[0], days[0] + timedelta(days=1), ())
+        return table['timeData'][0].as_py() if table.num_rows else days[0]
+
+    def row_count(self):
+        """Number of archived rows, read from the Parquet footers."""
+        import pyarrow.parquet as pq
+
+        return sum(
+            pq.ParquetFile(path).metadata.num_rows
+            for day in self.archived_days() for path in self._day_files(day)
+        )
+
+    def newest(self, limit, before=None):
+        """Up to `limit` archived rows, newest (timeData, id) first.
+
+        With `before` as a (timeData, id) key only older rows are returned.
+        Days are read newest first, one at a time, until `limit` rows are found.
+        """
+        Reading = namedtuple('Reading', ARCHIVE_COLUMNS)
+        rows = []
+        for day in reversed(self.archived_days()):
+            if len(rows) >= limit:
+                break
+            if before is not None and day > before[0]:
+                continue
+            table = self.cold_table(day, day + timedelta(days=1))
+            day_rows = [Reading(*values) for values in zip(*[table.column(column).to_pylist() for column in ARCHIVE_COLUMNS])]
+            if before is not None:
+                day_rows = [row for row in day_rows if (row.timeData, row.id) < before]
+            rows += day_rows[::-1][:limit - len(rows)]
+        return rows
+
+    def aggregate(self, start, stop, columns):
+        """Row count and (min, max, sum, non-null count) per column for archived rows in [start, stop)."""
+        import pyarrow.compute as pc
+
+        count = 0
+        stats = {column: [None, None, None, 0] for column in columns}
+        for batch in self.cold_batches(start, stop, columns, chunk_size=65536):
+            count += batch.num_rows
+            for column in columns:
+                values = batch.column(column)
+                merged = stats[column]
+                if pc.count(values).as_py():
+                    merged[0] = _combine(merged[0], pc.min(values).as_py(), min)
+                    merged[1] = _combine(merged[1], pc.max(values).as_py(), max)
+                    merged[2] = _combine(merged[2], pc.sum(values).as_py(), lambda a, b: a + b)
+                    merged[3] += pc.count(values).as_py()
+
+        values = [count]
+        for column in columns:
+            values += stats[column]
+        return values
+
+    def readings(self, start, end, columns=ARCHIVE_COLUMNS, chunk_size=1000):
+        """Yield lists of rows with start <= timeData <= end from both tiers, ordered by time.
+
+        Rows are namedtuples with `columns` as fields (timeData is always
+        included); either bound may be None.
+        """
+        columns = tuple(dict.fromkeys(tuple(columns) + ('timeData',)))
+        Reading = namedtuple('Reading', columns)
+
+        query = db.session.query(*[getattr(aquamans, column) for column in columns])
+        if start is not None:
+            query = query.filter(aquamans.timeData >= start)
+        if end is not None:
+            query = query.filter(aquamans.timeData <= end)
+        hot = (Reading(*row) for row in query.order_by(aquamans.timeData).yield_per(chunk_size))
+
+        if self.covers(start):
+            stop = end + timedelta(microseconds=1) if end is not None else None
+            cold = (
+                Reading(*values)
+                for batch in self.cold_batches(start, stop, columns, chunk_size)
+                for values in zip(*[batch.column(column).to_pylist() for column in columns])
+            )
+            rows = heapq.merge(cold, hot, key=lambda row: row.timeData)
+        else:
+            rows = hot
+
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+archive = ReadingArchive()
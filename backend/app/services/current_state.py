@@ -0,0 +1,113 @@
+# app/services/current_state.py
+import logging
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import cache, db
+from app.models import aquamans
+from app.utils.event_bus import event_bus
+
+CURRENT_STATE_KEY = 'aquamans:current_state'
+
+STATE_FIELDS = [
+    'id', 'temperature', 'tempResult', 'oxygen', 'oxygenResult',
+    'phlevel', 'phResult', 'turbidity', 'turbidityResult',
+    'catfish', 'dead_catfish'
+]
+
+def state_from_record(record):
+    state = {field: getattr(record, field) for field in STATE_FIELDS}
+    state['timestamp'] = record.timeData.isoformat() if record.timeData else None
+    return state
+
+def _order_key(state):
+    timestamp = datetime.fromisoformat(state['timestamp']) if state.get('timestamp') else datetime.min
+    return timestamp, state.get('id') or 0
+
+class CurrentState:
+    """Write-through cache of the newest reading, shared by all workers.
+
+    Lives in the configured Flask-Caching backend (Redis in production), so
+    latest-value endpoints read it without touching the database. Ingest
+    paths publish new readings; a DB query only happens on a cold cache.
+    Every stored reading is also announced on the event bus as `reading`.
+    """
+
+    def get(self):
+        state = cache.get(CURRENT_STATE_KEY)
+        if state is None:
+            state = self.refresh()
+        return state
+
+    def refresh(self):
+        """Reload the newest reading from the database into the cache."""
+        latest_record = (
+            aquamans.query
+            .order_by(aquamans.timeData.desc(), aquamans.id.desc())
+            .first()
+        )
+        if latest_record is None:
+            return None
+        state = state_from_record(latest_record)
+        self._set(state)
+        return state
+
+    def publish(self, state):
+        """Store `state` unless the cache already holds a newer reading."""
+        cached = cache.get(CURRENT_STATE_KEY)
+        if cached is not None and _order_key(cached) > _order_key(state):
+            return cached
+        self._set(state)
+        return state
+
+    def _set(self, state):
+        cache.set(CURRENT_STATE_KEY, state, timeout=current_app.config.get('CURRENT_STATE_TIMEOUT', 60))
+        event_bus.publish('reading', state)
+
+current_state = CurrentState()
+
+def refresh_after_flush(app):
+    """`on_flush` callback for the serial ingest scripts.
+
+    They insert with MySQLdb, so their rows never reach the ORM hooks below;
+    the newest reading is reloaded into the cache after every batch instead,
+    and published as `reading` through the Redis event bus to the web
+    workers' WebSocket clients.
+    """
+    if event_bus.redis is None:
+        logging.warning("EVENT_BUS_REDIS_URL is not set; WebSocket clients get ingested "
+                        "readings only on the web app's alert sweep")
+
+    def refresh(rows):
+        with app.app_context():
+            try:
+                current_state.refresh()
+            finally:
+                db.session.remove()
+    return refresh
+
+# Snapshot readings at flush time; publish only after the commit succeeds
+@event.listens_for(aquamans, 'after_insert')
+@event.listens_for(aquamans, 'after_update')
+def collect_current_state(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    state = state_from_record(target)
+    pending = session.info.get('current_state')
+    if pending is None or _order_key(state) >= _order_key(pending):
+        session.info['current_state'] = state
+
+@event.listens_for(Session, 'after_commit')
+def publish_current_state(session):
+    state = session.info.pop('current_state', None)
+    if state is not None:
+        try:
+            current_state.publish(state)
+        except Exception as e:
+            logging.error(f"Error publishing current state: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def discard_current_state(session):
+    session.info.pop('current_state', None)
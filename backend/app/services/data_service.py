@@ -1,25 +1,66 @@
 
-from flask import jsonify, send_file
+from flask import jsonify, send_file, Response, current_app, stream_with_context
 from app.models import aquamans
 from app import db
+from app.extensions import cache
 from datetime import datetime, timedelta
-from sqlalchemy import text
+from sqlalchemy import text, or_, and_
+from app.utils.downsampling import lttb
+from app.services.rollup_service import rollups
+from app.services.archive_service import archive, reading_dict
 import base64
+from collections import namedtuple
 import logging
+import math
+import numpy as np
 from io import BytesIO
-from PIL import Image
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 
+SERIES_MODES = ('raw', 'bucket', 'lttb')
+# Only these columns are ever interpolated into series SQL
+SERIES_PARAMS = ('temperature', 'oxygen', 'phlevel', 'turbidity')
+DEFAULT_SERIES_POINTS = 500
+
+# Shape of raw series rows read through the archive
+SeriesPoint = namedtuple('SeriesPoint', ['id', 'value', 'date'])
+
+def _encode_cursor(record):
+    raw = f"{record.timeData.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        time_part, id_part = raw.rsplit('|', 1)
+        return datetime.fromisoformat(time_part), int(id_part)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def _parse_bound(value, end_of_day=False):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed
+
 class DataService:
-    def get_data(self, date_filter, page=1, per_page=10):
+    def get_data(self, date_filter, page=1, per_page=10, cursor=None, total_mode=None):
+        """Paginated readings, newest first.
+
+        With `cursor` (empty string for the first page) pagination is keyset
+        based on (timeData, id), so every page costs the same as page 1.
+        `total_mode` is 'exact', 'approx' or 'none'; offset pages default to
+        'exact' and cursor pages to 'none'.
+        """
         try:
             if date_filter:
                 try:
-                    filter_date = datetime.strptime(date_filter, "%Y-%m-%d").date()
+                    filter_date = datetime.strptime(date_filter, "%Y-%m-%d")
                 except ValueError:
                     return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
             else:
@@ -28,159 +69,374 @@ class DataService:
             query = aquamans.query
 
             if filter_date:
-                query = query.filter(db.func.date(aquamans.timeData) == filter_date)
+                # Range predicate instead of DATE(timeData) so the timeData index is used
+                query = query.filter(
+                    aquamans.timeData >= filter_date,
+                    aquamans.timeData < filter_date + timedelta(days=1)
+                )
+
+            if filter_date and archive.covers(filter_date):
+                return self._get_archived_page(filter_date, page, per_page, cursor)
+
+            if not filter_date and archive.covers(None):
+                return self._get_tiered_page(query, page, per_page, cursor, total_mode)
 
-            total_records = query.count()
+            if cursor is not None:
+                return self._get_data_page_after(query, date_filter, per_page, cursor, total_mode or 'none')
 
-            records = query.order_by(aquamans.timeData.desc())\
+            total_records = self._count_records(query, date_filter, total_mode or 'exact')
+
+            records = query.order_by(aquamans.timeData.desc(), aquamans.id.desc())\
                         .offset((page - 1) * per_page)\
                         .limit(per_page)\
                         .all()
 
-            data = []
-            for record in records:
-                record_dict = {
-                    'id': record.id,
-                    'temperature': record.temperature,
-                    'tempResult': record.tempResult,
-                    'oxygen': record.oxygen,
-                    'oxygenResult': record.oxygenResult,
-                    'phlevel': record.phlevel,
-                    'phResult': record.phResult,
-                    'turbidity': record.turbidity,
-                    'turbidityResult': record.turbidityResult,
-                    'catfish': record.catfish,
-                    'dead_catfish': record.dead_catfish,
-                    'timeData': record.timeData.strftime('%Y-%m-%d %H:%M:%S')
-                }
-                data.append(record_dict)
+            data = [record.to_dict() for record in records]
 
             return jsonify({
                 'data': data,
                 'total': total_records,
                 'page': page,
                 'per_page': per_page,
-                'total_pages': (total_records + per_page - 1) // per_page
+                'total_pages': (total_records + per_page - 1) // per_page if total_records is not None else None
             })
 
         except Exception as e:
             logging.error(f"Error fetching data: {e}")
             return jsonify({'error': str(e)}), 500
-    
-    def get_temperature_data(self):
+
+    def _get_data_page_after(self, query, date_filter, per_page, cursor, total_mode):
+        base_query = query
+        if cursor:
+            try:
+                after_time, after_id = _decode_cursor(cursor)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor."}), 400
+            query = query.filter(or_(
+                aquamans.timeData < after_time,
+                and_(aquamans.timeData == after_time, aquamans.id < after_id)
+            ))
+
+        records = query.order_by(aquamans.timeData.desc(), aquamans.id.desc())\
+                    .limit(per_page + 1)\
+                    .all()
+        has_more = len(records) > per_page
+        records = records[:per_page]
+
+        return jsonify({
+            'data': [record.to_dict() for record in records],
+            'per_page': per_page,
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(records[-1]) if has_more else None,
+            'total': self._count_records(base_query, date_filter, total_mode)
+        })
+
+    def _get_archived_page(self, filter_date, page, per_page, cursor):
+        """One day of readings merged from MySQL and the archive, paginated in memory."""
+        records = [
+            row for chunk in archive.readings(filter_date, filter_date + timedelta(days=1) - timedelta(microseconds=1))
+            for row in chunk
+        ]
+        records.sort(key=lambda row: (row.timeData, row.id), reverse=True)
+
+        if cursor is None:
+            page_records = records[(page - 1) * per_page:page * per_page]
+            return jsonify({
+                'data': [reading_dict(row) for row in page_records],
+                'total': len(records),
+                'page': page,
+                'per_page': per_page,
+                'total_pages': (len(records) + per_page - 1) // per_page
+            })
+
+        if cursor:
+            try:
+                after = _decode_cursor(cursor)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor."}), 400
+            records = [row for row in records if (row.timeData, row.id) < after]
+        has_more = len(records) > per_page
+        records = records[:per_page]
+        return jsonify({
+            'data': [reading_dict(row) for row in records],
+            'per_page': per_page,
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(records[-1]) if has_more else None,
+            'total': None
+        })
+
+    def _get_tiered_page(self, query, page, per_page, cursor, total_mode):
+        """All readings, newest first, merged from MySQL and the archive.
+
+        Archived rows are all older than the archive horizon, so pages of
+        newer readings are read from MySQL alone; older ones merge both tiers.
+        """
+        horizon = archive.horizon
+        order = (aquamans.timeData.desc(), aquamans.id.desc())
+
+        if cursor is None:
+            total_records = self._count_records(query, None, total_mode or 'exact')
+            recent = query.filter(aquamans.timeData >= horizon)
+            recent_count = recent.order_by(None).with_entities(db.func.count(aquamans.id)).scalar()
+            offset = (page - 1) * per_page
+            records = recent.order_by(*order).offset(offset).limit(per_page).all()
+            if len(records) < per_page:
+                skip = max(offset - recent_count, 0)
+                older = query.filter(aquamans.timeData < horizon)
+                records += self._merge_newest(older, skip + per_page - len(records))[skip:]
+            return jsonify({
+                'data': [self._row_dict(record) for record in records],
+                'total': total_records,
+                'page': page,
+                'per_page': per_page,
+                'total_pages': (total_records + per_page - 1) // per_page if total_records is not None else None
+            })
+
+        after = None
+        if cursor:
+            try:
+                after = _decode_cursor(cursor)
+            except ValueError:
+                return jsonify({"error": "Invalid cursor."}), 400
+        records = self._merge_newest(query, per_page + 1, after, horizon)
+        has_more = len(records) > per_page
+        records = records[:per_page]
+        return jsonify({
+            'data': [self._row_dict(record) for record in records],
+            'per_page': per_page,
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(records[-1]) if has_more else None,
+            'total': self._count_records(query, None, total_mode or 'none')
+        })
+
+    def _merge_newest(self, query, limit, after=None, horizon=None):
+        """Up to `limit` rows of `query` and the archive, newest first, older than `after`.
+
+        The archive is skipped when `limit` MySQL rows at or past `horizon` were found.
+        """
+        if after is not None:
+            query = query.filter(or_(
+                aquamans.timeData < after[0],
+                and_(aquamans.timeData == after[0], aquamans.id < after[1])
+            ))
+        records = query.order_by(aquamans.timeData.desc(), aquamans.id.desc()).limit(limit).all()
+        if horizon is not None and len(records) == limit and records[-1].timeData >= horizon:
+            return records
+        records += archive.newest(limit, after)
+        records.sort(key=lambda row: (row.timeData, row.id), reverse=True)
+        return records[:limit]
+
+    def _row_dict(self, record):
+        return record.to_dict() if isinstance(record, aquamans) else reading_dict(record)
+
+    def _count_records(self, query, date_filter, total_mode):
+        """Row count for pagination metadata; archived rows count when no date is filtered."""
+        if total_mode == 'none':
+            return None
+
+        total = self._count_hot_records(query, date_filter, total_mode)
+        if not date_filter and archive.covers(None):
+            total += archive.row_count()
+        return total
+
+    def _count_hot_records(self, query, date_filter, total_mode):
+        """MySQL row count, cached briefly per date filter."""
+        if total_mode == 'approx' and not date_filter:
+            # InnoDB's table statistics: instant, but only an estimate
+            estimate = db.session.execute(text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'aquamans'"
+            )).scalar()
+            if estimate is not None:
+                return int(estimate)
+
+        cache_key = f"aquamans_count:{date_filter or 'all'}"
+        if total_mode == 'approx':
+            total = cache.get(cache_key)
+            if total is not None:
+                return total
+
+        total = query.order_by(None).with_entities(db.func.count(aquamans.id)).scalar()
+        cache.set(cache_key, total, timeout=current_app.config.get('DATA_COUNT_CACHE_TIMEOUT', 30))
+        return total
+
+    def get_temperature_data(self, start=None, end=None, points=None, mode=None):
+        return self.get_series('temperature', start, end, points, mode)
+
+    def get_series(self, param, start=None, end=None, points=None, mode=None):
+        """Chart series for one parameter.
+
+        Modes: 'raw' (default) returns every row in the range as
+        {id, <param>, date}, the original response; 'bucket' returns
+        {date, <param>, min, max, count} per time bucket for about `points`
+        buckets, computed in SQL and from the rollups once buckets span a
+        minute or more; 'lttb' returns about `points` LTTB-selected raw rows.
+        """
+        if param not in SERIES_PARAMS:
+            raise ValueError(f"Unknown series parameter: {param}")
         try:
+            mode = mode or 'raw'
+            if mode not in SERIES_MODES:
+                return jsonify({'error': f"Invalid mode. Use one of: {', '.join(SERIES_MODES)}"}), 400
+            points = max(int(points or DEFAULT_SERIES_POINTS), 3)
+
+            try:
+                start = _parse_bound(start)
+                end = _parse_bound(end, end_of_day=True)
+            except ValueError:
+                return jsonify({'error': 'Invalid start/end. Use YYYY-MM-DD or ISO 8601.'}), 400
+
             with db.engine.connect() as connection:
-                result = connection.execute(text("SELECT id, temperature, timeData AS date FROM aquamans"))
-                columns = result.keys()
-                records = [dict(zip(columns, row)) for row in result]
-                return jsonify(records)
+                if start is None or end is None:
+                    first, last = connection.execute(
+                        text("SELECT MIN(timeData), MAX(timeData) FROM aquamans")
+                    ).one()
+                    if archive.covers(None):
+                        cold_first = archive.first_time()
+                        first = min(first, cold_first) if first else cold_first
+                        last = last or archive.horizon
+                    if first is None:
+                        return jsonify([])
+                    start = start or first
+                    end = end or last
+
+                if mode == 'bucket':
+                    width = max(math.ceil((end - start).total_seconds() / points), 1)
+                    # Minute-or-wider buckets come from the rollups, raw rows (and the archive) otherwise
+                    return jsonify(rollups.series(connection, param, start, end, width))
+
+                if archive.covers(start):
+                    columns = ['id', param, 'date']
+                    rows = [
+                        SeriesPoint(row.id, getattr(row, param), row.timeData)
+                        for chunk in archive.readings(start, end, ('id', param, 'timeData'))
+                        for row in chunk
+                    ]
+                else:
+                    result = connection.execute(text(
+                        f"SELECT id, {param}, timeData AS date FROM aquamans "
+                        "WHERE timeData BETWEEN :start AND :end ORDER BY timeData"
+                    ), {'start': start, 'end': end})
+                    columns = result.keys()
+                    rows = result.all()
+
+            if mode == 'lttb':
+                rows = [row for row in rows if row[1] is not None]
+            if mode == 'lttb' and len(rows) > points:
+                x = np.array([row.date.timestamp() for row in rows], dtype=float)
+                y = np.array([row[1] for row in rows], dtype=float)
+                rows = [rows[i] for i in lttb(x, y, points)]
+
+            return jsonify([dict(zip(columns, row)) for row in rows])
         except Exception as e:
-            logging.error(f"Error fetching temperature data: {e}")
-            return jsonify({'error': str(e)})
+            logging.error(f"Error fetching {param} series: {e}")
+            return jsonify({'error': str(e)}), 500
 
-    def get_filtered_data(self, query, filter_type, selected_date, selected_week_start):
+    def get_filtered_data(self, param, filter_type, selected_date, selected_week_start, stream=False):
+        if param not in SERIES_PARAMS:
+            raise ValueError(f"Unknown series parameter: {param}")
         try:
-            if selected_date:
-                selected_date = datetime.strptime(selected_date, '%Y-%m-%d')
-            
-            if selected_week_start:
-                selected_week_start = datetime.strptime(selected_week_start, '%Y-%m-%d')
-                end_of_week = selected_week_start + timedelta(days=6)
+            start = end = None
+            if filter_type == 'date' and selected_date:
+                start = datetime.strptime(selected_date, '%Y-%m-%d')
+                end = start.replace(hour=23, minute=59, second=59, microsecond=999999)
+            elif filter_type == 'week' and selected_week_start:
+                start = datetime.strptime(selected_week_start, '%Y-%m-%d')
+                end = start + timedelta(days=6)
 
-            with db.engine.connect() as connection:
-                result = connection.execute(text(query))
-                columns = result.keys()
-                records = [dict(zip(columns, row)) for row in result]
+            if archive.covers(start):
+                # Part of the window is in the Parquet archive
+                chunks = archive.readings(start, end, (param, 'timeData'))
+                if stream:
+                    return self._stream_chunks(chunks)
+                return jsonify([row._asdict() for chunk in chunks for row in chunk])
 
-                if filter_type == 'date' and selected_date:
-                    filtered_records = [
-                        record for record in records 
-                        if record['timeData'].date() == selected_date.date()
-                    ]
-                    return jsonify(filtered_records)
+            # The window is applied in SQL so the timeData index bounds the scan
+            query = f"SELECT {param}, timeData FROM aquamans"
+            params = {}
+            if start is not None:
+                query += " WHERE timeData BETWEEN :start AND :end"
+                params = {'start': start, 'end': end}
+            query += " ORDER BY timeData"
 
-                elif filter_type == 'week' and selected_week_start:
-                    filtered_records = [
-                        record for record in records 
-                        if selected_week_start <= record['timeData'] <= end_of_week
-                    ]
-                    return jsonify(filtered_records)
+            if stream:
+                return self._stream_rows(text(query), params)
 
-                return jsonify(records)
+            with db.engine.connect() as connection:
+                result = connection.execute(text(query), params)
+                columns = result.keys()
+                return jsonify([dict(zip(columns, row)) for row in result])
 
         except Exception as e:
             logging.error(f"Error fetching filtered data: {e}")
             return jsonify({'error': str(e)})
 
-    def get_filtered_temperature_data(self, filter_type, selected_date, selected_week_start):
+    def _stream_rows(self, query, params, chunk_size=1000):
+        """Stream a JSON array row by row with a server-side cursor."""
+        def chunks():
+            with db.engine.connect() as connection:
+                result = connection.execution_options(stream_results=True).execute(query, params)
+                columns = list(result.keys())
+                for rows in result.partitions(chunk_size):
+                    yield [dict(zip(columns, row)) for row in rows]
+        return self._stream_chunks(chunks())
+
+    def _stream_chunks(self, chunks):
+        """Stream a JSON array from lists of rows (dicts or namedtuples)."""
+        def generate():
+            yield '['
+            first = True
+            for rows in chunks:
+                chunk = ','.join(
+                    current_app.json.dumps(row if isinstance(row, dict) else row._asdict()) for row in rows
+                )
+                if chunk:
+                    yield chunk if first else ',' + chunk
+                    first = False
+            yield ']'
+        return Response(stream_with_context(generate()), mimetype='application/json')
+
+    def get_filtered_temperature_data(self, filter_type, selected_date, selected_week_start, stream=False):
         return self.get_filtered_data(
-            "SELECT temperature, timeData FROM aquamans",
-            filter_type, selected_date, selected_week_start
+            'temperature', filter_type, selected_date, selected_week_start, stream
         )
 
-    def get_oxygen_data(self):
-        try:
-            with db.engine.connect() as connection:
-                result = connection.execute(text("SELECT id, oxygen, timeData AS date FROM aquamans"))
-                columns = result.keys()
-                records = [dict(zip(columns, row)) for row in result]
-                return jsonify(records)
-        except Exception as e:
-            logging.error(f"Error fetching oxygen data: {e}")
-            return jsonify({'error': str(e)})
+    def get_oxygen_data(self, start=None, end=None, points=None, mode=None):
+        return self.get_series('oxygen', start, end, points, mode)
 
-    def get_filtered_oxygen_data(self, filter_type, selected_date, selected_week_start):
+    def get_filtered_oxygen_data(self, filter_type, selected_date, selected_week_start, stream=False):
         return self.get_filtered_data(
-            "SELECT oxygen, timeData FROM aquamans",
-            filter_type, selected_date, selected_week_start
+            'oxygen', filter_type, selected_date, selected_week_start, stream
         )
 
-    def get_phlevel_data(self):
-        try:
-            with db.engine.connect() as connection:
-                result = connection.execute(text("SELECT id, phlevel, timeData AS date FROM aquamans"))
-                columns = result.keys()
-                records = [dict(zip(columns, row)) for row in result]
-                return jsonify(records)
-        except Exception as e:
-            logging.error(f"Error fetching pH level data: {e}")
-            return jsonify({'error': str(e)})
+    def get_phlevel_data(self, start=None, end=None, points=None, mode=None):
+        return self.get_series('phlevel', start, end, points, mode)
 
-    def get_filtered_phlevel_data(self, filter_type, selected_date, selected_week_start):
+    def get_filtered_phlevel_data(self, filter_type, selected_date, selected_week_start, stream=False):
         return self.get_filtered_data(
-            "SELECT phlevel, timeData FROM aquamans",
-            filter_type, selected_date, selected_week_start
+            'phlevel', filter_type, selected_date, selected_week_start, stream
         )
 
-    def get_turbidity_data(self):
-        try:
-            with db.engine.connect() as connection:
-                result = connection.execute(text("SELECT id, turbidity, timeData AS date FROM aquamans"))
-                columns = result.keys()
-                records = [dict(zip(columns, row)) for row in result]
-                return jsonify(records)
-        except Exception as e:
-            logging.error(f"Error fetching turbidity data: {e}")
-            return jsonify({'error': str(e)})
+    def get_turbidity_data(self, start=None, end=None, points=None, mode=None):
+        return self.get_series('turbidity', start, end, points, mode)
 
-    def get_filtered_turbidity_data(self, filter_type, selected_date, selected_week_start):
+    def get_filtered_turbidity_data(self, filter_type, selected_date, selected_week_start, stream=False):
         return self.get_filtered_data(
-            "SELECT turbidity, timeData FROM aquamans",
-            filter_type, selected_date, selected_week_start
+            'turbidity', filter_type, selected_date, selected_week_start, stream
         )
 
     def get_latest_image(self):
         try:
-            record = aquamans.query.filter(aquamans.dead_catfish_image != None).order_by(aquamans.id.desc()).first()
+            record = aquamans.query.filter(aquamans.image_id != None).order_by(aquamans.id.desc()).first()
 
-            if record and record.dead_catfish_image:
-                image_data = record.dead_catfish_image
-                image = Image.open(BytesIO(image_data))
-                img_io = BytesIO()
-                image.save(img_io, 'JPEG')
-                img_io.seek(0)
-                return send_file(img_io, mimetype='image/jpeg')
+            if record and record.image:
+                # Stored bytes are already JPEG; the content hash doubles as the ETag
+                return send_file(
+                    BytesIO(record.image.data),
+                    mimetype=record.image.content_type or 'image/jpeg',
+                    etag=record.image.sha256
+                )
 
             return jsonify({'message': 'No image available'}), 404
         except Exception as e:
-            return jsonify({'error': str(e)}), 500
\ No newline at end of file
+            return jsonify({'error': str(e)}), 500
@@ -0,0 +1,255 @@
+# app/services/detection_scheduler.py
+import logging
+import os
+import threading
+import time
+import cv2
+from app.utils.motion_gate import MotionGate
+
+logger = logging.getLogger(__name__)
+
+def _ema(previous, value, alpha=0.2):
+    return value if previous is None else previous + alpha * (value - previous)
+
+class FrameSource:
+    """Keeps only the newest frame of one camera, IP stream or video file.
+
+    A reader thread drains the capture continuously so the scheduler never
+    runs inference on a stale, buffered frame. USB cameras are given as an
+    index (0 or "0"), IP cameras as URLs, recordings as file paths; files
+    are played at their own frame rate and optionally looped.
+    """
+
+    def __init__(self, name, uri, target_fps=5.0, loop=True, reconnect_delay=5.0, gate=None):
+        self.name = name
+        self.uri = int(uri) if str(uri).isdigit() else uri
+        self.is_file = isinstance(self.uri, str) and os.path.isfile(self.uri)
+        self.loop = loop
+        self.reconnect_delay = reconnect_delay
+        self.gate = gate
+        self.last_result = None
+        self.base_interval = 1.0 / target_fps
+        self.interval = self.base_interval
+        self.lock = threading.Lock()
+        self.thread = None
+        self.running = False
+        self.frame = None
+        self.frame_id = 0
+        self.captured_at = None
+        self.taken_id = 0
+        self.last_inferred = 0.0
+        self.stats = {
+            'captured': 0,
+            'inferred': 0,
+            'reused': 0,
+            'skipped': 0,
+            'read_errors': 0,
+            'capture_fps': 0.0,
+            'inference_fps': 0.0,
+            'latency_ms_last': 0.0,
+            'latency_ms_avg': None
+        }
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._read_loop, name=f"source-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.uri)
+        if not capture.isOpened():
+            logger.error(f"Could not open source {self.name} ({self.uri})")
+            return None
+        if isinstance(self.uri, int):
+            capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+            capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        return capture
+
+    def _read_loop(self):
+        capture = None
+        last_frame_at = None
+        while self.running:
+            if capture is None:
+                capture = self._open()
+                if capture is None:
+                    time.sleep(self.reconnect_delay)
+                    continue
+                file_delay = 1.0 / (capture.get(cv2.CAP_PROP_FPS) or 25) if self.is_file else 0
+
+            ret, frame = capture.read()
+            if not ret:
+                if self.is_file and self.loop:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                self.stats['read_errors'] += 1
+                capture.release()
+                capture = None
+                if self.is_file:
+                    logger.info(f"Source {self.name} reached end of file")
+                    break
+                time.sleep(self.reconnect_delay)
+                continue
+
+            now = time.monotonic()
+            with self.lock:
+                self.frame = frame
+                self.frame_id += 1
+                self.captured_at = now
+            self.stats['captured'] += 1
+            if last_frame_at is not None:
+                self.stats['capture_fps'] = round(_ema(self.stats['capture_fps'] or None, 1.0 / max(now - last_frame_at, 1e-6)), 2)
+            last_frame_at = now
+
+            if file_delay:
+                time.sleep(file_delay)
+
+        if capture is not None:
+            capture.release()
+        self.running = False
+
+    def take(self, now):
+        """Return (frame, captured_at) if a new frame is due for inference, else None."""
+        if now - self.last_inferred < self.interval:
+            return None
+        with self.lock:
+            if self.frame_id == self.taken_id:
+                return None
+            self.stats['skipped'] += self.frame_id - self.taken_id - 1
+            self.taken_id = self.frame_id
+            frame, captured_at = self.frame, self.captured_at
+        if self.last_inferred:
+            self.stats['inference_fps'] = round(_ema(self.stats['inference_fps'] or None, 1.0 / max(now - self.last_inferred, 1e-6)), 2)
+        self.last_inferred = now
+        return frame, captured_at
+
+    def record_latency(self, captured_at, now):
+        latency_ms = (now - captured_at) * 1000
+        self.stats['inferred'] += 1
+        self.stats['latency_ms_last'] = round(latency_ms, 1)
+        self.stats['latency_ms_avg'] = round(_ema(self.stats['latency_ms_avg'], latency_ms), 1)
+
+class DetectionScheduler:
+    """Batches frames from many sources into single `detect` calls.
+
+    Each source asks for `target_fps`; when the measured inference capacity
+    cannot serve the total demand, every source's interval is stretched by
+    the same factor (adaptive frame skipping) and relaxed again once there
+    is headroom. Sources with a motion gate reuse their previous result for
+    static frames without using a batch slot. `on_result(source, frame,
+    detections, fresh)` is called per frame; `fresh` is False when the
+    detections were reused from an earlier frame.
+    """
+
+    def __init__(self, model, sources, on_result, max_batch=8, conf=0.25, iou=0.5,
+                 min_fps=0.2, headroom=0.7):
+        self.model = model
+        self.sources = list(sources)
+        self.on_result = on_result
+        self.max_batch = max_batch
+        self.conf = conf
+        self.iou = iou
+        self.max_interval = 1.0 / min_fps
+        self.headroom = headroom
+        self.capacity_fps = None
+        self.stats = {'batches': 0, 'frames': 0, 'batch_ms_last': 0.0, 'batch_size_avg': None}
+
+    def start(self):
+        for source in self.sources:
+            source.start()
+
+    def stop(self):
+        for source in self.sources:
+            source.stop()
+
+    def step(self):
+        """Run inference on one batch of due frames; return how many were processed."""
+        now = time.monotonic()
+        due = []
+        reused = 0
+        # Most overdue sources first so a full batch cannot starve the rest
+        for source in sorted(self.sources, key=lambda s: s.last_inferred + s.interval):
+            taken = source.take(now)
+            if taken is None:
+                continue
+            frame, captured_at = taken
+            if (source.gate is not None and source.last_result is not None
+                    and not source.gate.should_infer(frame, now)):
+                source.stats['reused'] += 1
+                self._deliver(source, frame, source.last_result, False)
+                reused += 1
+                continue
+            due.append((source, frame, captured_at))
+            if len(due) >= self.max_batch:
+                break
+
+        if not due:
+            if not reused:
+                time.sleep(0.005)
+            return reused
+
+        started = time.perf_counter()
+        results = self.model.detect([frame for _, frame, _ in due], conf=self.conf, iou=self.iou)
+        batch_seconds = time.perf_counter() - started
+
+        finished = time.monotonic()
+        for (source, frame, captured_at), result in zip(due, results):
+            source.record_latency(captured_at, finished)
+            source.last_result = result
+            self._deliver(source, frame, result, True)
+
+        self.stats['batches'] += 1
+        self.stats['frames'] += len(due)
+        self.stats['batch_ms_last'] = round(batch_seconds * 1000, 1)
+        self.stats['batch_size_avg'] = round(_ema(self.stats['batch_size_avg'], len(due)), 2)
+        self._adapt(len(due) / max(batch_seconds, 1e-6))
+        return len(due) + reused
+
+    def _deliver(self, source, frame, result, fresh):
+        try:
+            self.on_result(source, frame, result, fresh)
+        except Exception as e:
+            logger.error(f"Error handling result for {source.name}: {e}")
+
+    def _adapt(self, batch_fps):
+        self.capacity_fps = _ema(self.capacity_fps, batch_fps)
+        demand = sum(1.0 / source.interval for source in self.sources if source.running)
+        if not demand:
+            return
+        if demand > self.capacity_fps:
+            factor = demand / self.capacity_fps
+        elif demand < self.headroom * self.capacity_fps:
+            factor = 0.9
+        else:
+            return
+        for source in self.sources:
+            source.interval = min(max(source.interval * factor, source.base_interval), self.max_interval)
+
+    def source_stats(self):
+        return {
+            source.name: {
+                'uri': str(source.uri),
+                'running': source.running,
+                'interval_s': round(source.interval, 3),
+                **source.stats,
+                'motion_gate': source.gate.stats if source.gate is not None else None
+            }
+            for source in self.sources
+        }
+
+def sources_from_config(config):
+    """FrameSources (each with its own motion gate) for DETECTION_SOURCES in `config`."""
+    return [
+        FrameSource(
+            source['name'],
+            source['uri'],
+            target_fps=source.get('target_fps', config.get('DETECTION_TARGET_FPS', 5)),
+            gate=MotionGate(
+                threshold=config.get('MOTION_GATE_THRESHOLD', 4.0),
+                refresh_interval=config.get('MOTION_GATE_REFRESH', 5.0)
+            )
+        )
+        for source in config.get('DETECTION_SOURCES', [{'name': 'camera0', 'uri': 0}])
+    ]
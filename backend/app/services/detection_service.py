@@ -1,40 +1,65 @@
 import threading
-import cv2
 import time
 from datetime import datetime, timedelta
 import logging
 from app import db
 from app.models import aquamans
-from ultralytics import YOLO
+from flask import current_app
+from app.services.detection_scheduler import DetectionScheduler, sources_from_config
+from app.services.model_registry import model_registry
+from app.utils.tracker import DetectionTracker
 
 class DetectionService:
     def __init__(self):
         self.is_running = False
-        self.camera = None
+        self.app = None
+        self.scheduler = None
         self.detection_thread = None
-        self.model = YOLO("C:/Users/ADMIN/AquaAutoManS/machine_learning/weights/best1.pt")
-        self.class_names = ["catfish", "dead_catfish"]
         self.start_time = None
-        
-    def start_detection(self):
+        self.last_db_update = 0
+        self.trackers = {}
+        self.latest_counts = {}
+
+    def start_detection(self, app=None):
+        """Watch every source in DETECTION_SOURCES with one batched model.
+
+        `app` defaults to the current app, so existing start_detection()
+        calls made inside a request or app context keep working.
+        """
         if not self.is_running:
+            self.app = app or current_app._get_current_object()
+            app = self.app
+            sources = sources_from_config(app.config)
+            self.scheduler = DetectionScheduler(
+                model_registry.get(),
+                sources,
+                self._handle_result,
+                max_batch=app.config.get('DETECTION_BATCH_SIZE', 8)
+            )
+            self.scheduler.start()
+
             self.is_running = True
             self.start_time = datetime.now()
             self.detection_thread = threading.Thread(target=self._detection_loop)
             self.detection_thread.daemon = True
             self.detection_thread.start()
-            logging.info("Detection service started")
-            
+            logging.info(f"Detection service started with {len(sources)} sources")
+
     def stop_detection(self):
         self.is_running = False
-        if self.camera:
-            self.camera.release()
+        if self.scheduler:
+            self.scheduler.stop()
         logging.info("Detection service stopped")
-        
+
+    def get_stats(self):
+        if self.scheduler is None:
+            return {}
+        return {
+            'scheduler': self.scheduler.stats,
+            'sources': self.scheduler.source_stats()
+        }
+
     def _detection_loop(self):
-        self.camera = cv2.VideoCapture(0)
-        last_db_update = time.time()
-        
         while self.is_running:
             try:
                 # Check for hourly rest
@@ -45,59 +70,55 @@ class DetectionService:
                     self.start_time = datetime.now()
                     continue
 
-                ret, frame = self.camera.read()
-                if not ret:
-                    continue
-
-                # Process frame
-                results = self.model.predict(frame, conf=0.25, iou=0.5)
-                catfish_count = 0
-                dead_catfish_count = 0
-
-                for result in results:
-                    for box in result.boxes:
-                        cls = int(box.cls[0])
-                        if cls == 0:
-                            catfish_count += 1
-                        else:
-                            dead_catfish_count += 1
-
-                # Update database every 20 seconds
-                current_time = time.time()
-                if current_time - last_db_update >= 20:
-                    self._update_database(frame, catfish_count, dead_catfish_count)
-                    last_db_update = current_time
+                self.scheduler.step()
 
             except Exception as e:
                 logging.error(f"Error in detection loop: {str(e)}")
                 time.sleep(1)
 
-        if self.camera:
-            self.camera.release()
+    def _handle_result(self, source, frame, detections, fresh):
+        tracker = self.trackers.setdefault(source.name, DetectionTracker(dead_frames=5))
+        # Reused detections must not count as more consecutive dead frames
+        tracked = tracker.update(detections) if fresh else tracker.current()
+        self.latest_counts[source.name] = (tracked.catfish, tracked.dead_catfish)
 
-    def _update_database(self, frame, catfish_count, dead_catfish_count):
-        try:
-            latest_data = db.session.query(aquamans).order_by(aquamans.id.desc()).first()
-            if latest_data:
-                new_record = aquamans(
-                    temperature=latest_data.temperature,
-                    tempResult=latest_data.tempResult,
-                    oxygen=latest_data.oxygen,
-                    oxygenResult=latest_data.oxygenResult,
-                    phlevel=latest_data.phlevel,
-                    phResult=latest_data.phResult,
-                    turbidity=latest_data.turbidity,
-                    turbidityResult=latest_data.turbidityResult,
-                    catfish=catfish_count,
-                    dead_catfish=dead_catfish_count,
-                    timeData=datetime.now()
+        # One row for the whole tank every 20 seconds, or at once when a dead fish
+        # is confirmed; the cameras' counts are summed so readings are never duplicated
+        current_time = time.time()
+        if tracked.dead_events or current_time - self.last_db_update >= 20:
+            catfish_count = sum(counts[0] for counts in self.latest_counts.values())
+            dead_catfish_count = sum(counts[1] for counts in self.latest_counts.values())
+            self._update_database(catfish_count, dead_catfish_count)
+            self.last_db_update = current_time
+
+    def _update_database(self, catfish_count, dead_catfish_count):
+        with self.app.app_context():
+            try:
+                latest_data = (
+                    db.session.query(aquamans)
+                    .order_by(aquamans.timeData.desc(), aquamans.id.desc())
+                    .first()
                 )
-                db.session.add(new_record)
-                db.session.commit()
-                logging.info(f"Database updated - Live: {catfish_count}, Dead: {dead_catfish_count}")
-        except Exception as e:
-            logging.error(f"Database update error: {str(e)}")
-            db.session.rollback()
+                if latest_data:
+                    new_record = aquamans(
+                        temperature=latest_data.temperature,
+                        tempResult=latest_data.tempResult,
+                        oxygen=latest_data.oxygen,
+                        oxygenResult=latest_data.oxygenResult,
+                        phlevel=latest_data.phlevel,
+                        phResult=latest_data.phResult,
+                        turbidity=latest_data.turbidity,
+                        turbidityResult=latest_data.turbidityResult,
+                        catfish=catfish_count,
+                        dead_catfish=dead_catfish_count,
+                        timeData=datetime.now()
+                    )
+                    db.session.add(new_record)
+                    db.session.commit()
+                    logging.info(f"Database updated from {len(self.latest_counts)} sources - Live: {catfish_count}, Dead: {dead_catfish_count}")
+            except Exception as e:
+                logging.error(f"Database update error: {str(e)}")
+                db.session.rollback()
 
 # Create global instance
-detection_service = DetectionService()
\ No newline at end of file
+detection_service = DetectionService()
@@ -0,0 +1,191 @@
+# app/services/live_updates.py
+import logging
+import threading
+import time
+from flask import request
+from flask_socketio import join_room, leave_room
+from app.utils.event_bus import event_bus
+from app.utils.delta_codec import DeltaEncoder
+
+DEFAULT_TANK = 'default'
+METRICS = ['temperature', 'oxygen', 'phlevel', 'turbidity', 'catfish', 'dead_catfish']
+
+def sensor_payload(state):
+    payload = {metric: state.get(metric) for metric in METRICS}
+    payload['timestamp'] = state.get('timestamp')
+    return payload
+
+class LiveBroadcaster:
+    """Pushes readings to WebSocket clients when ingest publishes them.
+
+    Nothing is sent while no new readings arrive. Clients join the room of
+    their tank and receive `sensor_update` as soon as a changed reading is
+    published. A client can `subscribe` with `metrics` to also get per-metric
+    `metric_update` events, and with `min_interval` to be throttled: it then
+    gets at most one update per interval, always the newest. With `compact`
+    it gets binary `sensor_frame` deltas (see app.utils.delta_codec) instead
+    of JSON `sensor_update` events, and can emit `resync` to force a keyframe.
+    """
+
+    def __init__(self):
+        self.socketio = None
+        self.last_payload = None
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.keyframe_interval = 30
+
+    def init_app(self, app, socketio):
+        self.socketio = socketio
+        self.keyframe_interval = app.config.get('LIVE_KEYFRAME_INTERVAL', 30)
+        socketio.on_event('connect', self._on_connect)
+        socketio.on_event('disconnect', self._on_disconnect)
+        socketio.on_event('subscribe', self._on_subscribe)
+        socketio.on_event('resync', self._on_resync)
+        event_bus.subscribe('reading', self.on_reading)
+
+    def on_reading(self, state):
+        payload = sensor_payload(state)
+        with self.lock:
+            previous = self.last_payload
+            if payload == previous:
+                return
+            self.last_payload = payload
+            individual = [(sid, client) for sid, client in self.clients.items() if self._is_individual(client)]
+
+        tank = state.get('tank', DEFAULT_TANK)
+        self.socketio.emit('sensor_update', payload, to=f'tank:{tank}')
+        logging.debug(f"Broadcasting sensor data: {payload}")
+
+        for metric in METRICS:
+            if previous is None or previous.get(metric) != payload[metric]:
+                self.socketio.emit('metric_update', {
+                    'tank': tank,
+                    'metric': metric,
+                    'value': payload[metric],
+                    'timestamp': payload['timestamp']
+                }, to=f'metric:{tank}:{metric}')
+
+        for sid, client in individual:
+            if client['tank'] != tank:
+                continue
+            if client['min_interval'] > 0:
+                self._send_throttled(sid, client, payload)
+            else:
+                self._deliver(sid, client, payload)
+
+    @staticmethod
+    def _is_individual(client):
+        # Throttled and compact clients are served one by one instead of through the tank room
+        return client['min_interval'] > 0 or client['encoder'] is not None
+
+    def _deliver(self, sid, client, payload):
+        encoder = client['encoder']
+        if encoder is None:
+            self.socketio.emit('sensor_update', payload, to=sid)
+            return
+        with self.lock:
+            frame = encoder.encode(payload)
+        if frame is not None:
+            self.socketio.emit('sensor_frame', frame, to=sid)
+
+    def _send_throttled(self, sid, client, payload):
+        with self.lock:
+            client['pending'] = payload
+            wait = client['last_sent'] + client['min_interval'] - time.monotonic()
+            if client['scheduled']:
+                return
+            client['scheduled'] = True
+        self.socketio.start_background_task(self._flush_client, sid, client, max(wait, 0))
+
+    def _flush_client(self, sid, client, wait):
+        if wait:
+            self.socketio.sleep(wait)
+        with self.lock:
+            payload, client['pending'] = client['pending'], None
+            client['scheduled'] = False
+            client['last_sent'] = time.monotonic()
+        if payload is not None and sid in self.clients:
+            self._deliver(sid, client, payload)
+
+    def _on_connect(self, auth=None):
+        sid = request.sid
+        with self.lock:
+            self.clients[sid] = {
+                'tank': DEFAULT_TANK,
+                'min_interval': 0,
+                'last_sent': 0,
+                'pending': None,
+                'scheduled': False,
+                'encoder': None
+            }
+        join_room(f'tank:{DEFAULT_TANK}')
+
+        # New dashboards get the current reading immediately instead of waiting for the next one
+        from app.services.current_state import current_state
+        state = current_state.get()
+        if state:
+            self.socketio.emit('sensor_update', sensor_payload(state), to=sid)
+
+    def _on_disconnect(self, *args):
+        with self.lock:
+            self.clients.pop(request.sid, None)
+
+    def _on_subscribe(self, data):
+        sid = request.sid
+        data = data or {}
+        client = self.clients.get(sid)
+        if client is None:
+            return {'status': 'error', 'message': 'Not connected'}
+
+        tank = str(data.get('tank', client['tank']))
+        metrics = [m for m in data.get('metrics', []) if m in METRICS]
+        try:
+            min_interval = max(float(data.get('min_interval', client['min_interval'])), 0)
+        except (TypeError, ValueError):
+            return {'status': 'error', 'message': 'min_interval must be a number of seconds'}
+        compact = bool(data.get('compact', client['encoder'] is not None))
+
+        leave_room(f'tank:{client["tank"]}')
+        with self.lock:
+            client['tank'] = tank
+            client['min_interval'] = min_interval
+            if not compact:
+                client['encoder'] = None
+            elif client['encoder'] is None:
+                client['encoder'] = DeltaEncoder(METRICS, self.keyframe_interval)
+        if not self._is_individual(client):
+            join_room(f'tank:{tank}')
+        for metric in METRICS:
+            room = f'metric:{tank}:{metric}'
+            if metric in metrics:
+                join_room(room)
+            else:
+                leave_room(room)
+
+        if compact:
+            self._on_resync()
+        return {
+            'status': 'success',
+            'tank': tank,
+            'metrics': metrics,
+            'min_interval': min_interval,
+            'compact': compact,
+            'fields': METRICS if compact else None
+        }
+
+    def _on_resync(self, *args):
+        """Send a keyframe of the newest reading to a compact client."""
+        client = self.clients.get(request.sid)
+        if client is None or client['encoder'] is None:
+            return
+        with self.lock:
+            client['encoder'].reset()
+        payload = self.last_payload
+        if payload is None:
+            from app.services.current_state import current_state
+            state = current_state.get()
+            payload = sensor_payload(state) if state else None
+        if payload is not None:
+            self._deliver(request.sid, client, payload)
+
+live_broadcaster = LiveBroadcaster()
@@ -0,0 +1,175 @@
+# app/services/model_registry.py
+import logging
+import os
+import threading
+import time
+from multiprocessing.connection import Client
+from flask import current_app, has_app_context
+from app.utils.detections import MIN_BOX_SIZE, extract_detections
+
+logger = logging.getLogger(__name__)
+
+class LocalModel:
+    """YOLO weights loaded on first use and shared by every caller in the process.
+
+    With `export_format` ('onnx', 'openvino') the weights are exported once
+    next to the .pt file and the exported model is loaded instead.
+    """
+
+    def __init__(self, path, export_format=None, retry_after=60, min_box_size=MIN_BOX_SIZE):
+        self.path = path
+        self.min_box_size = min_box_size
+        self.export_format = export_format
+        self.retry_after = retry_after
+        self.model = None
+        self.failed_at = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.model is not None:
+                return self.model
+            if self.failed_at is not None and time.monotonic() - self.failed_at < self.retry_after:
+                raise RuntimeError(f"Model {self.path} failed to load recently")
+            try:
+                from ultralytics import YOLO
+                started = time.perf_counter()
+                model = YOLO(self.path)
+                if self.export_format:
+                    model = YOLO(self._exported_path(model), task='detect')
+                self.model = model
+                self.failed_at = None
+                logger.info(f"Loaded model {self.path} in {time.perf_counter() - started:.1f}s")
+                return self.model
+            except Exception as e:
+                self.failed_at = time.monotonic()
+                logger.error(f"Failed to load model {self.path}: {e}")
+                raise
+
+    def _exported_path(self, model):
+        base = os.path.splitext(self.path)[0]
+        exported = {'onnx': base + '.onnx', 'openvino': base + '_openvino_model'}.get(self.export_format)
+        if exported is None or not os.path.exists(exported):
+            exported = model.export(format=self.export_format)
+        return exported
+
+    def detect(self, frames, conf=0.25, iou=0.5):
+        """Return one list of (x1, y1, x2, y2, conf, cls) detections per frame."""
+        model = self.load()
+        with self.lock:
+            results = model.predict(list(frames), conf=conf, iou=iou, verbose=False)
+        return [extract_detections([result], self.min_box_size) for result in results]
+
+class RemoteModel:
+    """Client for inference_server.py, which keeps a single model loaded for all workers."""
+
+    def __init__(self, address, authkey, name='catfish'):
+        self.address = address
+        self.authkey = authkey
+        self.name = name
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def detect(self, frames, conf=0.25, iou=0.5):
+        request = ('detect', self.name, list(frames), conf, iou)
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.connection is None:
+                        self.connection = Client(self.address, authkey=self.authkey)
+                    self.connection.send(request)
+                    status, payload = self.connection.recv()
+                    break
+                except (OSError, EOFError) as e:
+                    self._close()
+                    if attempt:
+                        raise RuntimeError(f"Inference server unavailable: {e}")
+        if status != 'ok':
+            raise RuntimeError(payload)
+        return payload
+
+    def _close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+        self.connection = None
+
+class ModelRegistry:
+    """Hands out detection models by name without loading anything at import time.
+
+    Models are local to the process unless INFERENCE_SERVER_ADDRESS is set,
+    in which case every worker talks to the shared inference server.
+    DETECTION_MODEL_FORMAT='onnxruntime' selects the ONNX Runtime backend.
+
+    Weights paths come only from the DETECTION_MODELS setting: init_app()
+    or configure() must run first, or the registry is used inside an app
+    context and reads current_app.config.
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.paths = {}
+        self.config = None
+        self.server_address = None
+        self.server_authkey = None
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        self.configure(app.config)
+
+    def configure(self, config):
+        self.config = config
+        self.paths = dict(config.get('DETECTION_MODELS') or {})
+        self.server_address = config.get('INFERENCE_SERVER_ADDRESS')
+        self.server_authkey = config.get('INFERENCE_SERVER_AUTHKEY')
+
+    def _ensure_configured(self):
+        if self.config is not None:
+            return
+        if not has_app_context():
+            raise RuntimeError("Model registry is not configured; call init_app(app) or configure(config) first")
+        self.configure(current_app.config)
+
+    def _create_local(self, name):
+        if name not in self.paths:
+            raise RuntimeError(f"No weights configured for model {name!r}; add it to DETECTION_MODELS")
+        export_format = self.config.get('DETECTION_MODEL_FORMAT')
+        min_box_size = self.config.get('DETECTION_MIN_BOX_SIZE', MIN_BOX_SIZE)
+        if export_format == 'onnxruntime':
+            from app.services.onnx_detector import OnnxModel
+            return OnnxModel(
+                self.paths[name],
+                int8=self.config.get('DETECTION_MODEL_INT8', False),
+                intra_op_threads=self.config.get('ONNX_INTRA_OP_THREADS', 0),
+                inter_op_threads=self.config.get('ONNX_INTER_OP_THREADS', 1),
+                min_box_size=min_box_size
+            )
+        return LocalModel(self.paths[name], export_format, min_box_size=min_box_size)
+
+    def get(self, name='catfish'):
+        with self.lock:
+            self._ensure_configured()
+            model = self.models.get(name)
+            if model is None:
+                if self.server_address:
+                    if not self.server_authkey:
+                        raise RuntimeError("INFERENCE_SERVER_ADDRESS is set but AQUAMANS_INFERENCE_AUTHKEY is not")
+                    model = RemoteModel(tuple(self.server_address), self.server_authkey, name)
+                else:
+                    model = self._create_local(name)
+                self.models[name] = model
+            return model
+
+    def local(self, name='catfish'):
+        """Always return an in-process model; used by the inference server itself."""
+        with self.lock:
+            self._ensure_configured()
+            model = self.models.get(name)
+            if model is None or isinstance(model, RemoteModel):
+                model = self._create_local(name)
+                self.models[name] = model
+            return model
+
+model_registry = ModelRegistry()
@@ -0,0 +1,210 @@
+# app/services/onnx_detector.py
+import logging
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from app.utils.detections import MIN_BOX_SIZE
+
+logger = logging.getLogger(__name__)
+
+def onnx_path_for(pt_path, int8=False):
+    base = os.path.splitext(pt_path)[0]
+    return base + ('-int8.onnx' if int8 else '.onnx')
+
+def export_onnx(pt_path, imgsz=640, int8=False, calibration_frames=None):
+    """Export YOLO weights to ONNX (dynamic batch) and optionally quantize to INT8.
+
+    With `calibration_frames` the INT8 model is statically quantized
+    (activations too, best speedup); without them only weights are.
+    """
+    from ultralytics import YOLO
+    fp32_path = onnx_path_for(pt_path)
+    if not os.path.exists(fp32_path):
+        fp32_path = YOLO(pt_path).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    if not int8:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic, quantize_static, CalibrationDataReader
+    int8_path = onnx_path_for(pt_path, int8=True)
+    if calibration_frames:
+        class FrameReader(CalibrationDataReader):
+            def __init__(self, input_name):
+                self.batches = iter(
+                    {input_name: preprocess(frame, imgsz)[0][None]} for frame in calibration_frames
+                )
+
+            def get_next(self):
+                return next(self.batches, None)
+
+        import onnxruntime
+        input_name = onnxruntime.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+        quantize_static(fp32_path, int8_path, FrameReader(input_name),
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    else:
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+def preprocess(frame, imgsz):
+    """Letterbox a BGR frame to imgsz x imgsz; return (CHW float32 tensor, scale, pad_x, pad_y)."""
+    height, width = frame.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_width, new_height = round(width * scale), round(height * scale)
+    pad_x, pad_y = (imgsz - new_width) // 2, (imgsz - new_height) // 2
+
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = cv2.resize(
+        frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+    )
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor), scale, pad_x, pad_y
+
+def decode(output, frame_shape, scale, pad_x, pad_y, conf, iou, max_det=300, min_size=MIN_BOX_SIZE):
+    """Turn one (4 + classes, anchors) YOLOv8 output into detection tuples."""
+    predictions = output.T
+    scores = predictions[:, 4:]
+    classes = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), classes]
+
+    keep = confidences >= conf
+    boxes, confidences, classes = predictions[keep, :4], confidences[keep], classes[keep]
+    if not len(boxes):
+        return []
+
+    top_left = boxes[:, :2] - boxes[:, 2:] / 2
+    # Offset boxes per class so one NMS call never suppresses across classes
+    offset = classes[:, None] * 4096.0
+    nms_boxes = np.column_stack([top_left + offset, boxes[:, 2:]])
+    indices = np.array(cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidences.tolist(), conf, iou)).reshape(-1)[:max_det]
+
+    height, width = frame_shape[:2]
+    detections = []
+    for index in indices:
+        x, y = (top_left[index] - (pad_x, pad_y)) / scale
+        w, h = boxes[index, 2:] / scale
+        x1, y1 = int(np.clip(x, 0, width)), int(np.clip(y, 0, height))
+        x2, y2 = int(np.clip(x + w, 0, width)), int(np.clip(y + h, 0, height))
+        if (x2 - x1) < min_size or (y2 - y1) < min_size:
+            continue
+        detections.append((x1, y1, x2, y2, float(confidences[index]), int(classes[index])))
+    return detections
+
+class OnnxModel:
+    """Catfish detector running an exported ONNX model on onnxruntime's CPU provider.
+
+    Same detect() interface as LocalModel. The ONNX file is exported from
+    the .pt weights on first load if it does not exist yet.
+    """
+
+    def __init__(self, pt_path, int8=False, imgsz=640, intra_op_threads=0, inter_op_threads=1,
+                 retry_after=60, min_box_size=MIN_BOX_SIZE):
+        self.pt_path = pt_path
+        self.min_box_size = min_box_size
+        self.int8 = int8
+        self.imgsz = imgsz
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.retry_after = retry_after
+        self.session = None
+        self.input_name = None
+        self.dynamic_batch = False
+        self.failed_at = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.session is not None:
+                return self.session
+            if self.failed_at is not None and time.monotonic() - self.failed_at < self.retry_after:
+                raise RuntimeError(f"ONNX model for {self.pt_path} failed to load recently")
+            try:
+                import onnxruntime
+                path = onnx_path_for(self.pt_path, self.int8)
+                if not os.path.exists(path):
+                    path = export_onnx(self.pt_path, self.imgsz, self.int8)
+
+                options = onnxruntime.SessionOptions()
+                options.intra_op_num_threads = self.intra_op_threads  # 0 = one per physical core
+                options.inter_op_num_threads = self.inter_op_threads
+                options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+                options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+                model_input = self.session.get_inputs()[0]
+                self.input_name = model_input.name
+                self.dynamic_batch = not isinstance(model_input.shape[0], int)
+                self.failed_at = None
+                logger.info(f"Loaded ONNX model {path}")
+                return self.session
+            except Exception as e:
+                self.failed_at = time.monotonic()
+                logger.error(f"Failed to load ONNX model for {self.pt_path}: {e}")
+                raise
+
+    def detect(self, frames, conf=0.25, iou=0.5):
+        session = self.load()
+        frames = list(frames)
+        prepared = [preprocess(frame, self.imgsz) for frame in frames]
+        tensors = np.stack([tensor for tensor, *_ in prepared])
+
+        if self.dynamic_batch:
+            outputs = session.run(None, {self.input_name: tensors})[0]
+        else:
+            outputs = np.concatenate([
+                session.run(None, {self.input_name: tensor[None]})[0] for tensor in tensors
+            ])
+
+        return [
+            decode(output, frame.shape, scale, pad_x, pad_y, conf, iou, min_size=self.min_box_size)
+            for output, frame, (_, scale, pad_x, pad_y) in zip(outputs, frames, prepared)
+        ]
+
+def _iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union else 0.0
+
+def parity_check(reference, candidate, frames, conf=0.25, iou=0.5, match_iou=0.5):
+    """Compare a candidate backend with the PyTorch reference on the same frames.
+
+    Boxes are matched greedily per class by IoU. Returns match rate, mean
+    IoU and confidence drift of matched boxes, count mismatches per frame
+    and the speed of both backends.
+    """
+    started = time.perf_counter()
+    expected = reference.detect(frames, conf, iou)
+    reference_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = candidate.detect(frames, conf, iou)
+    candidate_seconds = time.perf_counter() - started
+
+    matched, total, ious, conf_drift, count_mismatches = 0, 0, [], [], 0
+    for expected_boxes, actual_boxes in zip(expected, actual):
+        total += len(expected_boxes)
+        if len(expected_boxes) != len(actual_boxes):
+            count_mismatches += 1
+        unused = list(actual_boxes)
+        for box in sorted(expected_boxes, key=lambda b: -b[4]):
+            candidates = [(b, _iou(box, b)) for b in unused if b[5] == box[5]]
+            if not candidates:
+                continue
+            best, best_iou = max(candidates, key=lambda c: c[1])
+            if best_iou >= match_iou:
+                unused.remove(best)
+                matched += 1
+                ious.append(best_iou)
+                conf_drift.append(abs(best[4] - box[4]))
+
+    return {
+        'frames': len(frames),
+        'reference_boxes': total,
+        'match_rate': round(matched / total, 4) if total else 1.0,
+        'mean_iou': round(float(np.mean(ious)), 4) if ious else None,
+        'max_conf_drift': round(max(conf_drift), 4) if conf_drift else None,
+        'count_mismatch_frames': count_mismatches,
+        'reference_fps': round(len(frames) / reference_seconds, 2),
+        'candidate_fps': round(len(frames) / candidate_seconds, 2)
+    }
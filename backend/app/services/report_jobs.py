@@ -0,0 +1,253 @@
+# app/services/report_jobs.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from flask import jsonify, send_file
+from sqlalchemy import func
+from werkzeug.http import parse_options_header
+from app.extensions import db
+from app.models import aquamans, Alert
+
+ReportType = namedtuple('ReportType', ['build', 'window'])
+
+class ReportJobQueue:
+    """Builds PDF reports on a worker pool and keeps the finished files.
+
+    A job is keyed by report type, parameters, the time window the report
+    reads and a watermark of the data in that window (newest id, row count
+    and detection sums, which change when the latest row is updated in
+    place, plus the count, newest id and acknowledgement state of the
+    alerts on those readings). The key doubles as the job id: submitting a report whose data
+    has not changed returns the cached file at once, and submitting one
+    that is still building joins the running job.
+
+    Report types are registered with the service method behind their
+    synchronous endpoint, so the PDF layout lives in one place. The method
+    runs in a request context on a worker thread and its response is
+    spooled to the cache directory.
+    """
+
+    def __init__(self, workers=2, cache_dir=None, ttl=86400, max_files=200):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_files = max_files
+        self.report_types = {}
+        self.jobs = {}
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        self.app = None
+        self.stats = {
+            'submitted': 0,
+            'cache_hits': 0,
+            'joined': 0,
+            'built': 0,
+            'failed': 0,
+            'evicted': 0,
+            'build_ms_avg': None
+        }
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('REPORT_JOB_WORKERS', self.workers)
+        self.cache_dir = app.config.get('REPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'aquamans_reports')
+        self.ttl = app.config.get('REPORT_CACHE_TTL', self.ttl)
+        self.max_files = app.config.get('REPORT_CACHE_MAX_FILES', self.max_files)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-job')
+            logging.info(f"Report job queue started with {self.workers} workers, cache in {self.cache_dir}")
+
+    def register(self, report_type, build, window):
+        """`build(**params)` returns the report's Flask response; `window(**params)`
+        returns the (start, end) of the rows it reads, either end may be None."""
+        self.report_types[report_type] = ReportType(build, window)
+
+    def _watermark(self, start, end):
+        readings = db.session.query(
+            func.max(aquamans.id),
+            func.count(aquamans.id),
+            func.sum(aquamans.catfish),
+            func.sum(aquamans.dead_catfish)
+        )
+        alerts = db.session.query(
+            func.max(Alert.id),
+            func.count(Alert.id),
+            func.count(Alert.acknowledged_at),
+            func.max(Alert.acknowledged_at)
+        ).join(aquamans, Alert.reading_id == aquamans.id)
+        values = []
+        for query in (readings, alerts):
+            if start is not None:
+                query = query.filter(aquamans.timeData >= start)
+            if end is not None:
+                query = query.filter(aquamans.timeData <= end)
+            values += [str(value) for value in query.one()]
+        return values
+
+    def job_key(self, report_type, params):
+        window = self.report_types[report_type].window(**params)
+        if window is None:
+            # Nothing to report on; the build returns the same message every time
+            window, watermark = (None, None), None
+        else:
+            watermark = self._watermark(*window)
+        raw = json.dumps([report_type, params, [str(bound) for bound in window], watermark], sort_keys=True)
+        return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+    def _path(self, key, extension):
+        return os.path.join(self.cache_dir, f"{key}.{extension}")
+
+    def status(self, key):
+        """Job state as a dict, or None for an unknown (or evicted) job."""
+        try:
+            with open(self._path(key, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            job = self.jobs.get(key)
+            return dict(job) if job else None
+
+    def submit(self, report_type, params):
+        if report_type not in self.report_types:
+            raise KeyError(f"Unknown report type {report_type}")
+
+        key = self.job_key(report_type, params)
+        with self.lock:
+            self.stats['submitted'] += 1
+            if os.path.exists(self._path(key, 'json')):
+                self.stats['cache_hits'] += 1
+            elif self.jobs.get(key, {}).get('status') in ('queued', 'running'):
+                self.stats['joined'] += 1
+            else:
+                self.jobs[key] = {
+                    'id': key,
+                    'type': report_type,
+                    'params': params,
+                    'status': 'queued',
+                    'submitted_at': time.time()
+                }
+                self.futures[key] = self.executor.submit(self._run, key, report_type, params)
+        return self.status(key)
+
+    def run(self, report_type, params):
+        """Submit and wait for the result; backs the original synchronous endpoints.
+
+        These always answer with the PDF (or the build's own error), as
+        their clients save the body as a file; use submit() to poll instead.
+        """
+        job = self.submit(report_type, params)
+        with self.lock:
+            future = self.futures.get(job['id'])
+        if future is not None:
+            future.result()
+        return self.response(job['id'])
+
+    def response(self, key):
+        """Flask response for a job: the PDF when done, its state otherwise."""
+        job = self.status(key)
+        if job is None:
+            return jsonify({'error': 'Not found', 'message': 'Unknown or expired report job'}), 404
+        if job['status'] == 'done':
+            return send_file(
+                self._path(key, 'pdf'),
+                as_attachment=True,
+                download_name=job['filename'],
+                mimetype="application/pdf"
+            )
+        if job['status'] == 'failed':
+            return jsonify(job['result']), job['status_code']
+        return jsonify(job), 202
+
+    def _run(self, key, report_type, params):
+        with self.lock:
+            job = self.jobs[key]
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+
+        started = time.perf_counter()
+        try:
+            with self.app.test_request_context():
+                response = self.app.make_response(self.report_types[report_type].build(**params))
+                try:
+                    if response.status_code == 200 and response.mimetype == 'application/pdf':
+                        self._store(key, job, response)
+                    else:
+                        # "No records" and error messages are passed through, not cached
+                        self._fail(key, response.get_json(silent=True) or {}, response.status_code)
+                finally:
+                    response.close()
+        except Exception as e:
+            logging.error(f"Report job {key} ({report_type}) failed: {e}")
+            self._fail(key, {'error': str(e)}, 500)
+        finally:
+            with self.lock:
+                self.futures.pop(key, None)
+
+        build_ms = (time.perf_counter() - started) * 1000
+        previous = self.stats['build_ms_avg']
+        self.stats['build_ms_avg'] = round(build_ms if previous is None else previous + 0.2 * (build_ms - previous), 1)
+
+    def _store(self, key, job, response):
+        partial = self._path(key, 'pdf.part')
+        size = 0
+        with open(partial, 'wb') as f:
+            # send_file responses are passthrough iterables over the spooled report
+            for chunk in response.response:
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(partial, self._path(key, 'pdf'))
+
+        _, options = parse_options_header(response.headers.get('Content-Disposition', ''))
+        done = dict(job, status='done', finished_at=time.time(), size=size,
+                    filename=options.get('filename', f"{job['type']}_report.pdf"))
+        with open(self._path(key, 'json.part'), 'w') as f:
+            json.dump(done, f)
+        with self.lock:
+            os.replace(self._path(key, 'json.part'), self._path(key, 'json'))
+            self.jobs.pop(key, None)
+            self.stats['built'] += 1
+        logging.info(f"Report job {key} ({job['type']}) built, {size} bytes")
+        self._prune()
+
+    def _fail(self, key, result, status_code):
+        with self.lock:
+            self.jobs[key].update(status='failed', finished_at=time.time(), result=result, status_code=status_code)
+            self.stats['failed'] += 1
+
+    def _prune(self):
+        """Drop cached reports past their TTL, then the oldest beyond max_files."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), name[:-len('.json')]))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+
+        for index, (modified, key) in enumerate(entries):
+            if index >= self.max_files or now - modified > self.ttl:
+                for extension in ('json', 'pdf'):
+                    try:
+                        os.remove(self._path(key, extension))
+                    except OSError:
+                        pass
+                self.stats['evicted'] += 1
+
+        with self.lock:
+            for key, job in list(self.jobs.items()):
+                if job['status'] == 'failed' and now - job['finished_at'] > self.ttl:
+                    del self.jobs[key]
+
+report_jobs = ReportJobQueue()
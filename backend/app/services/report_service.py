@@ -1,13 +1,177 @@
 from flask import jsonify, send_file
 from app.models import aquamans
 from app import db
+from sqlalchemy import func
 from datetime import datetime, timedelta
 import logging
-from io import BytesIO
+import tempfile
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib import colors
+import numpy as np
+from app.utils.thresholds import REPORT_STATUS, INCIDENTS
+from app.utils.pdf_stream import StreamingStory, paginated_tables
+from app.services.rollup_service import rollups
+from app.services.archive_service import archive
+
+# Unit suffix for each column checked in the critical incident analysis
+INCIDENT_UNITS = {
+    'temperature': '°C',
+    'oxygen': ' mg/L',
+    'phlevel': '',
+    'turbidity': ' NTU',
+}
+
+# Data report: columns read, rows fetched per chunk and rows per table page
+REPORT_COLUMNS = (
+    'timeData', 'temperature', 'tempResult', 'oxygen', 'oxygenResult',
+    'phlevel', 'phResult', 'turbidity', 'turbidityResult', 'catfish', 'dead_catfish'
+)
+REPORT_CHUNK_SIZE = 1000
+REPORT_ROWS_PER_TABLE = 25  # about one landscape page
+
+# Rollup column summed for the findings -> key in the totals
+REPORT_TOTAL_COLUMNS = {
+    'temperature': 'temperature',
+    'oxygen': 'oxygen',
+    'phlevel': 'phlevel',
+    'turbidity': 'turbidity',
+    'catfish': 'alive_catfish',
+    'dead_catfish': 'dead_catfish',
+}
+
+REPORT_TABLE_HEADER = ["Time", "Temperature", "Result", "Oxygen", "Result",
+                       "pH Level", "Result", "Turbidity", "Result",
+                       "Alive Catfish", "Dead Catfish"]
+
+DEAD_CATFISH_TABLE_HEADER = ["Time", "Temperature (°C)", "Result", "Oxygen (mg/L)", "Result",
+                             "pH Level", "Result", "Turbidity (NTU)", "Result",
+                             "Alive Catfish", "Dead Catfish"]
+
+REPORT_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+    ("BACKGROUND", (0, 1), (-1, -1), colors.white),
+    ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+    ("FONTSIZE", (0, 1), (-1, -1), 7),
+    ("GRID", (0, 0), (-1, -1), 1, colors.black),
+])
+
+INCIDENT_DETAILS = {
+    'cold_temp': {
+        'parameter': "Temperature",
+        'status': "Cold Temperature",
+        'causes': [
+            "Cold Temperature in Environment of the Aquarium",
+            "Cold Water was used",
+            "Cold Wind"
+        ]
+    },
+    'below_avg_temp': {
+        'parameter': "Temperature",
+        'status': "Below Average Temperature",
+        'causes': [
+            "Sub Par Cold Temperature in Environment",
+            "Cold Water was used"
+        ]
+    },
+    'above_avg_temp': {
+        'parameter': "Temperature",
+        'status': "Above Average Temperature",
+        'causes': [
+            "Hot Temperature in Environment",
+            "Lukewarm Water was used",
+            "Slightly Exposed to Sunlight"
+        ]
+    },
+    'hot_temp': {
+        'parameter': "Temperature",
+        'status': "Hot Temperature",
+        'causes': [
+            "Very Hot Temperature in Environment",
+            "Boiling Water was used",
+            "Full Exposure to Sunlight"
+        ]
+    },
+    'very_low_oxygen': {
+        'parameter': "Oxygen",
+        'status': "Very Low Oxygen",
+        'causes': [
+            "Overstocking of Catfish",
+            "Stagnant Water",
+            "No Ventilation",
+            "Overfeeding"
+        ]
+    },
+    'low_oxygen': {
+        'parameter': "Oxygen",
+        'status': "Low Oxygen",
+        'causes': [
+            "High Volumes of Catfish",
+            "Low Movement of Water",
+            "Little Ventilation"
+        ]
+    },
+    'high_oxygen': {
+        'parameter': "Oxygen",
+        'status': "High Oxygen",
+        'causes': [
+            "Over-aeration of Water",
+            "Chemicals",
+            "Hyperoxygenation"
+        ]
+    },
+    'very_acidic': {
+        'parameter': "pH Level",
+        'status': "Very Acidic",
+        'causes': [
+            "Presence of Strong Acids",
+            "Acid Rain",
+            "Vinegar Contamination"
+        ]
+    },
+    'acidic': {
+        'parameter': "pH Level",
+        'status': "Acidic",
+        'causes': [
+            "Acidic Products",
+            "Coffee Contamination"
+        ]
+    },
+    'very_alkaline': {
+        'parameter': "pH Level",
+        'status': "Very Alkaline",
+        'causes': [
+            "Dishwashing Liquid",
+            "Ammonia Solution",
+            "Bleach",
+            "Soap Contamination"
+        ]
+    },
+    'high_turbidity': {
+        'parameter': "Turbidity",
+        'status': "Dirty",
+        'causes': [
+            "High Particle Content",
+            "Poor Filtration",
+            "Excess Waste"
+        ]
+    },
+    'medium_turbidity': {
+        'parameter': "Turbidity",
+        'status': "Cloudy",
+        'causes': [
+            "Suspended Particles",
+            "Organic Matter",
+            "Moderate Waste Build-up"
+        ]
+    },
+}
 
 class ReportService:
     def check_dead_catfish(self):
@@ -156,68 +320,20 @@ class ReportService:
             if not latest_dead_record:
                 return jsonify({"message": "No dead catfish detected in the system."})
 
-            # Get data from 3 hours before the incident
+            # Data from 3 hours before the incident is read chunk by chunk while the PDF is built
             three_hours_ago = latest_dead_record.timeData - timedelta(hours=3)
-            recent_data = (
-                aquamans.query.filter(
-                    aquamans.timeData.between(three_hours_ago, latest_dead_record.timeData)
-                )
-                .order_by(aquamans.timeData)
-                .all()
-            )
-
-            logging.info(f"Found {len(recent_data)} records in the 3-hour window")
-
-            # Initialize totals for analysis
-            totals = {
-                'temperature': 0,
-                'oxygen': 0,
-                'phlevel': 0,
-                'turbidity': 0,
-                'count': 0,
-                'alive_catfish': 0,
-                'dead_catfish': 0
-            }
 
-            # Prepare data table
-            data = [["Time", "Temperature (°C)", "Result", "Oxygen (mg/L)", "Result", 
-                    "pH Level", "Result", "Turbidity (NTU)", "Result", 
-                    "Alive Catfish", "Dead Catfish"]]
-
-            # Process data
-            for record in recent_data:
-                time_str = record.timeData.strftime("%Y-%m-%d %H:%M:%S")
-                data.append([
-                    time_str,
-                    f"{record.temperature:.2f}",
-                    record.tempResult,
-                    f"{record.oxygen:.2f}",
-                    record.oxygenResult,
-                    f"{record.phlevel:.2f}",
-                    record.phResult,
-                    f"{record.turbidity:.2f}",
-                    record.turbidityResult,
-                    str(record.catfish),
-                    str(record.dead_catfish)
-                ])
-
-                # Update totals
-                totals['temperature'] += float(record.temperature or 0)
-                totals['oxygen'] += float(record.oxygen or 0)
-                totals['phlevel'] += float(record.phlevel or 0)
-                totals['turbidity'] += float(record.turbidity or 0)
-                totals['alive_catfish'] += float(record.catfish or 0)
-                totals['dead_catfish'] += float(record.dead_catfish or 0)
-                totals['count'] += 1
+            # Totals for analysis come from the rollups
+            totals = self._window_totals(three_hours_ago, latest_dead_record.timeData)
 
             # Calculate mortality rate
             total_catfish = totals['alive_catfish'] + totals['dead_catfish']
             mortality_rate = (totals['dead_catfish'] / total_catfish * 100) if total_catfish > 0 else 0
 
-            # Create PDF
-            buffer = BytesIO()
+            # Create PDF, spooled to a temp file
+            output = tempfile.TemporaryFile()
             doc = SimpleDocTemplate(
-                buffer,
+                output,
                 pagesize=landscape(letter),
                 rightMargin=36,
                 leftMargin=36,
@@ -405,32 +521,27 @@ class ReportService:
                     story.append(Paragraph(factor, normal_style))
                     story.append(Spacer(1, 8))
 
-            # Add detailed data table
-            story.append(PageBreak())
-            story.append(Paragraph("Detailed Data Log", heading2_style))
-            story.append(Spacer(1, 12))
-            
-            table = Table(data, repeatRows=1)
-            table.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, 0), 8),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                ("BACKGROUND", (0, 1), (-1, -1), colors.white),
-                ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                ("FONTSIZE", (0, 1), (-1, -1), 7),
-                ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(table)
+            def build_story():
+                yield from story
+
+                # Add detailed data table, one chunk of rows at a time
+                yield PageBreak()
+                yield Paragraph("Detailed Data Log", heading2_style)
+                yield Spacer(1, 12)
+
+                rendered = 0
+                for chunk in self._report_chunks(three_hours_ago, latest_dead_record.timeData):
+                    rendered += len(chunk)
+                    rows = [self._format_report_row(row) for row in chunk]
+                    yield from paginated_tables(DEAD_CATFISH_TABLE_HEADER, rows, REPORT_ROWS_PER_TABLE, REPORT_TABLE_STYLE)
+                logging.info(f"Rendered {rendered} records in the 3-hour window")
 
             # Build PDF
-            doc.build(story)
-            buffer.seek(0)
+            doc.build(StreamingStory(build_story()))
+            output.seek(0)
 
             return send_file(
-                buffer,
+                output,
                 as_attachment=True,
                 download_name=f"dead_catfish_report_{latest_dead_record.timeData.strftime('%Y%m%d_%H%M%S')}.pdf",
                 mimetype="application/pdf"
@@ -499,46 +610,16 @@ class ReportService:
         )
         
     def _get_temp_status(self, temp):
-        if 26 <= temp <= 32:
-            return "Normal"
-        elif 20 < temp < 26:
-            return "Below Average"
-        elif temp <= 20:
-            return "Cold"
-        elif 32 <= temp < 35:
-            return "Above Average"
-        else:
-            return "Hot"
+        return REPORT_STATUS.classify_one('temperature', temp)
 
     def _get_oxygen_status(self, oxy):
-        if oxy == 0:
-            return "Very Low"
-        elif oxy < 1.5:
-            return "Low"
-        elif 1.5 <= oxy <= 5:
-            return "Normal"
-        else:
-            return "High"
+        return REPORT_STATUS.classify_one('oxygen', oxy)
 
     def _get_ph_status(self, ph):
-        if ph < 4:
-            return "Very Acidic"
-        elif 4 <= ph < 6:
-            return "Acidic"
-        elif 6 <= ph <= 7.5:
-            return "Normal"
-        elif 7.5 < ph <= 9:
-            return "Alkaline"
-        else:
-            return "Very Alkaline"
+        return REPORT_STATUS.classify_one('phlevel', ph)
 
     def _get_turbidity_status(self, turb):
-        if turb < 20:
-            return "Clean"
-        elif 20 <= turb < 50:
-            return "Cloudy"
-        else:
-            return "Dirty"
+        return REPORT_STATUS.classify_one('turbidity', turb)
         
     def _get_temperature_causes(self, temp):
         if temp <= 20:
@@ -809,385 +890,222 @@ class ReportService:
         return None
 
 
+    def _find_first_incidents(self, records):
+        """First occurrence of each incident type across time-ordered records."""
+        found = []
+        for order, (column, unit) in enumerate(INCIDENT_UNITS.items()):
+            values = np.array([getattr(record, column) for record in records], dtype=float)
+            keys = INCIDENTS.classify(column, values)
+            for key in np.unique(keys[keys != '']):
+                first = int(np.argmax(keys == key))
+                found.append((first, order, str(key), f"{values[first]:.2f}{unit}"))
+
+        # Same ordering as a record-by-record scan: by record, then by parameter
+        incidents = {}
+        for first, _, key, value in sorted(found):
+            incidents[key] = {
+                'time': records[first].timeData.strftime("%Y-%m-%d %H:%M:%S"),
+                'value': value,
+                **INCIDENT_DETAILS[key]
+            }
+        return incidents
+
+    def _report_chunks(self, start_time, end_time, chunk_size=REPORT_CHUNK_SIZE):
+        """Yield lists of report rows from MySQL and the Parquet archive, ordered by time."""
+        return archive.readings(start_time, end_time, REPORT_COLUMNS, chunk_size)
+
+    def _window_totals(self, start_time, end_time):
+        """Report totals for start_time <= timeData <= end_time, read from the rollups."""
+        summary = rollups.summary(start_time, end_time)
+        totals = {key: summary[f"{column}_sum"] or 0.0 for column, key in REPORT_TOTAL_COLUMNS.items()}
+        totals['count'] = summary['count']
+        return totals
+
+    def _format_report_row(self, record):
+        return [
+            record.timeData.strftime("%Y-%m-%d %H:%M:%S"),
+            f"{record.temperature:.2f}",
+            record.tempResult,
+            f"{record.oxygen:.2f}",
+            record.oxygenResult,
+            f"{record.phlevel:.2f}",
+            record.phResult,
+            f"{record.turbidity:.2f}",
+            record.turbidityResult,
+            str(record.catfish),
+            str(record.dead_catfish)
+        ]
+
+    def _report_findings(self, totals, critical_incidents, heading2_style, normal_style):
+        """Summary statistics and first critical incidents for the data report."""
+        if totals['count'] > 0:
+            yield Paragraph("Data Findings", heading2_style)
+            
+            avg_temp = totals['temperature']/totals['count']
+            avg_oxy = totals['oxygen']/totals['count']
+            avg_ph = totals['phlevel']/totals['count']
+            avg_turb = totals['turbidity']/totals['count']
+            avg_alive = totals['alive_catfish']/totals['count']
+            avg_dead = totals['dead_catfish']/totals['count']
+
+            summary_data = [
+                ["Parameter", "Average Value", "Status"],
+                ["Temperature", f"{avg_temp:.2f}°C", self._get_temp_status(avg_temp)],
+                ["Oxygen", f"{avg_oxy:.2f} mg/L", self._get_oxygen_status(avg_oxy)],
+                ["pH Level", f"{avg_ph:.2f}", self._get_ph_status(avg_ph)],
+                ["Turbidity", f"{avg_turb:.2f} NTU", self._get_turbidity_status(avg_turb)],
+                ["Alive Catfish", f"{avg_alive:.2f}", "Average Count"],
+                ["Dead Catfish", f"{avg_dead:.2f}", "Average Count"]
+            ]
+            
+            summary_table = Table(summary_data)
+            summary_table.setStyle(TableStyle([
+                ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+                ("GRID", (0, 0), (-1, -1), 1, colors.black),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ]))
+            yield summary_table
+            yield Spacer(1, 20)
+            
+            yield Paragraph("Critical Incidents Analysis", heading2_style)
+        yield Spacer(1, 12)
+
+        # Display critical incidents
+        if critical_incidents:
+            yield Paragraph("First Occurrences of Critical Incidents:", normal_style)
+            yield Spacer(1, 12)
+            
+            # Sort incidents by time
+            sorted_incidents = sorted(critical_incidents.values(), key=lambda x: x['time'])
+            
+            for incident in sorted_incidents:
+                yield Paragraph(
+                    f"<b>{incident['time']}</b> - {incident['parameter']}: {incident['value']} ({incident['status']})",
+                    normal_style
+                )
+                yield Paragraph("Possible causes:", normal_style)
+                for cause in incident['causes']:
+                    yield Paragraph(f"• {cause}", normal_style)
+                yield Spacer(1, 8)
+            
+            yield Spacer(1, 12)
+            yield Paragraph(
+                "<b>Note:</b> These conditions may cause stress to the catfish and should be addressed promptly.",
+                normal_style
+            )
+        else:
+            yield Paragraph(
+                "No critical incidents detected during this period. All parameters were within normal ranges.",
+                normal_style
+            )
+
+    def data_report_window(self, time_filter, date_filter, filter_date=None):
+        """(start, end) of the rows print_data_report reads."""
+        if filter_date is None:
+            filter_date = datetime.strptime(date_filter, "%Y-%m-%d") if date_filter else datetime.now()
+
+        if time_filter > 0:
+            # "Last N hours" ends on the current minute (the rollup bucket), so repeated
+            # requests share a window and the report job key stays the same
+            start_time = filter_date.replace(second=0, microsecond=0) - timedelta(hours=time_filter)
+        else:
+            start_time = filter_date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        end_time = filter_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+        return start_time, end_time
+
+    def dead_catfish_report_window(self, alert_id):
+        """(start, end) of the rows print_dead_catfish_report reads, None without a dead catfish record."""
+        latest_dead_time = (
+            db.session.query(func.max(aquamans.timeData))
+            .filter(aquamans.dead_catfish > 0)
+            .scalar()
+        )
+        if latest_dead_time is None:
+            return None
+        return latest_dead_time - timedelta(hours=3), latest_dead_time
+
     def print_data_report(self, time_filter, date_filter):
         try:
             logging.info(f"Starting report generation with time_filter: {time_filter}, date_filter: {date_filter}")
             
-            if time_filter > 0:
-                if date_filter:
-                    filter_date = datetime.strptime(date_filter, "%Y-%m-%d")
-                    if filter_date.date() != datetime.today().date():
-                        return jsonify({"message": "3 hours report only works with today's date."}), 400
-                else:
-                    filter_date = datetime.now()
+            if date_filter:
+                filter_date = datetime.strptime(date_filter, "%Y-%m-%d")
+                if time_filter > 0 and filter_date.date() != datetime.today().date():
+                    return jsonify({"message": "3 hours report only works with today's date."}), 400
             else:
-                if date_filter:
-                    filter_date = datetime.strptime(date_filter, "%Y-%m-%d")
-                else:
-                    filter_date = datetime.now()
+                filter_date = datetime.now()
 
-            if time_filter > 0:
-                start_time = filter_date - timedelta(hours=time_filter)
-            else:
-                start_time = filter_date.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            end_time = filter_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+            start_time, end_time = self.data_report_window(time_filter, date_filter, filter_date)
 
             logging.info(f"Querying data from {start_time} to {end_time}")
 
-            recent_data = (
-                aquamans.query.filter(
-                    aquamans.timeData >= start_time,
-                    aquamans.timeData <= end_time
-                )
-                .order_by(aquamans.timeData)
-                .all()
+            has_records = (
+                db.session.query(aquamans.id)
+                .filter(aquamans.timeData >= start_time, aquamans.timeData <= end_time)
+                .first()
+            ) or (
+                archive.covers(start_time)
+                and archive.cold_table(start_time, end_time + timedelta(microseconds=1), ('id',)).num_rows
             )
-
-            if not recent_data:
+            if not has_records:
                 return jsonify({"message": "No records found in the selected time range."})
 
-            logging.info(f"Found {len(recent_data)} records")
-
-            # Prepare data for PDF
-            data = [["Time", "Temperature", "Result", "Oxygen", "Result", 
-                    "pH Level", "Result", "Turbidity", "Result", 
-                    "Alive Catfish", "Dead Catfish"]]
-
-            totals = {
-                'temperature': 0,
-                'oxygen': 0,
-                'phlevel': 0,
-                'turbidity': 0,
-                'count': 0,
-                'alive_catfish': 0,
-                'dead_catfish': 0
-            }
-
-            # Process data
-            for record in recent_data:
-                time_str = record.timeData.strftime("%Y-%m-%d %H:%M:%S")
-                data.append([
-                    time_str,
-                    f"{record.temperature:.2f}",
-                    record.tempResult,
-                    f"{record.oxygen:.2f}",
-                    record.oxygenResult,
-                    f"{record.phlevel:.2f}",
-                    record.phResult,
-                    f"{record.turbidity:.2f}",
-                    record.turbidityResult,
-                    str(record.catfish),
-                    str(record.dead_catfish)
-                ])
-
-                totals['temperature'] += float(record.temperature or 0)
-                totals['oxygen'] += float(record.oxygen or 0)
-                totals['phlevel'] += float(record.phlevel or 0)
-                totals['turbidity'] += float(record.turbidity or 0)
-                totals['alive_catfish'] += float(record.catfish or 0)
-                totals['dead_catfish'] += float(record.dead_catfish or 0)
-                totals['count'] += 1
-
-            logging.info("Creating PDF document")
-
-            # Create PDF
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(
-                buffer,
-                pagesize=landscape(letter),
-                rightMargin=36,
-                leftMargin=36,
-                topMargin=36,
-                bottomMargin=36
-            )
-
             # Define styles
             styles = getSampleStyleSheet()
             title_style = styles["Heading1"]
             heading2_style = styles["Heading2"]
             normal_style = styles["Normal"]
 
-            # Create story for PDF
-            story = []
-
-            # Add title
-            title = "Aquamans Data Report"
-            story.append(Paragraph(title, title_style))
-            story.append(Spacer(1, 12))
-
-            # Add date/time range info
             if time_filter > 0:
                 period = f"Last {time_filter} Hours"
             else:
                 period = f"Date: {filter_date.strftime('%Y-%m-%d')}"
-            story.append(Paragraph(f"Period: {period}", normal_style))
-            story.append(Spacer(1, 12))
-
-            # Add data table
-            table = Table(data, repeatRows=1)
-            table.setStyle(TableStyle([
-                ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, 0), 8),
-                ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                ("BACKGROUND", (0, 1), (-1, -1), colors.white),
-                ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                ("FONTSIZE", (0, 1), (-1, -1), 7),
-                ("GRID", (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            story.append(table)
-            story.append(PageBreak())
-
-            # Add summary statistics
-            if totals['count'] > 0:
-                story.append(Paragraph("Data Findings", heading2_style))
-                
-                avg_temp = totals['temperature']/totals['count']
-                avg_oxy = totals['oxygen']/totals['count']
-                avg_ph = totals['phlevel']/totals['count']
-                avg_turb = totals['turbidity']/totals['count']
-                avg_alive = totals['alive_catfish']/totals['count']
-                avg_dead = totals['dead_catfish']/totals['count']
-
-                summary_data = [
-                    ["Parameter", "Average Value", "Status"],
-                    ["Temperature", f"{avg_temp:.2f}°C", self._get_temp_status(avg_temp)],
-                    ["Oxygen", f"{avg_oxy:.2f} mg/L", self._get_oxygen_status(avg_oxy)],
-                    ["pH Level", f"{avg_ph:.2f}", self._get_ph_status(avg_ph)],
-                    ["Turbidity", f"{avg_turb:.2f} NTU", self._get_turbidity_status(avg_turb)],
-                    ["Alive Catfish", f"{avg_alive:.2f}", "Average Count"],
-                    ["Dead Catfish", f"{avg_dead:.2f}", "Average Count"]
-                ]
-                
-                summary_table = Table(summary_data)
-                summary_table.setStyle(TableStyle([
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.black),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 8),
-                ]))
-                story.append(summary_table)
-                story.append(Spacer(1, 20))
-                
-                story.append(Paragraph("Critical Incidents Analysis", heading2_style))
-            story.append(Spacer(1, 12))
-
-            # Track first occurrences of incidents
-            critical_incidents = {}
-
-            # Analyze all records
-            for record in recent_data:
-                time_str = record.timeData.strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Temperature incidents
-                temp = float(record.temperature)
-                if temp <= 20:
-                    if 'cold_temp' not in critical_incidents:
-                        critical_incidents['cold_temp'] = {
-                            'time': time_str,
-                            'value': f"{temp:.2f}°C",
-                            'parameter': "Temperature",
-                            'status': "Cold Temperature",
-                            'causes': [
-                                "Cold Temperature in Environment of the Aquarium",
-                                "Cold Water was used",
-                                "Cold Wind"
-                            ]
-                        }
-                elif 20 < temp < 26:
-                    if 'below_avg_temp' not in critical_incidents:
-                        critical_incidents['below_avg_temp'] = {
-                            'time': time_str,
-                            'value': f"{temp:.2f}°C",
-                            'parameter': "Temperature",
-                            'status': "Below Average Temperature",
-                            'causes': [
-                                "Sub Par Cold Temperature in Environment",
-                                "Cold Water was used"
-                            ]
-                        }
-                elif 32 <= temp < 35:
-                    if 'above_avg_temp' not in critical_incidents:
-                        critical_incidents['above_avg_temp'] = {
-                            'time': time_str,
-                            'value': f"{temp:.2f}°C",
-                            'parameter': "Temperature",
-                            'status': "Above Average Temperature",
-                            'causes': [
-                                "Hot Temperature in Environment",
-                                "Lukewarm Water was used",
-                                "Slightly Exposed to Sunlight"
-                            ]
-                        }
-                elif temp >= 35:
-                    if 'hot_temp' not in critical_incidents:
-                        critical_incidents['hot_temp'] = {
-                            'time': time_str,
-                            'value': f"{temp:.2f}°C",
-                            'parameter': "Temperature",
-                            'status': "Hot Temperature",
-                            'causes': [
-                                "Very Hot Temperature in Environment",
-                                "Boiling Water was used",
-                                "Full Exposure to Sunlight"
-                            ]
-                        }
-
-                # Oxygen incidents
-                oxy = float(record.oxygen)
-                if oxy <= 0.8:
-                    if 'very_low_oxygen' not in critical_incidents:
-                        critical_incidents['very_low_oxygen'] = {
-                            'time': time_str,
-                            'value': f"{oxy:.2f} mg/L",
-                            'parameter': "Oxygen",
-                            'status': "Very Low Oxygen",
-                            'causes': [
-                                "Overstocking of Catfish",
-                                "Stagnant Water",
-                                "No Ventilation",
-                                "Overfeeding"
-                            ]
-                        }
-                elif oxy < 1.5:
-                    if 'low_oxygen' not in critical_incidents:
-                        critical_incidents['low_oxygen'] = {
-                            'time': time_str,
-                            'value': f"{oxy:.2f} mg/L",
-                            'parameter': "Oxygen",
-                            'status': "Low Oxygen",
-                            'causes': [
-                                "High Volumes of Catfish",
-                                "Low Movement of Water",
-                                "Little Ventilation"
-                            ]
-                        }
-                elif oxy > 5:
-                    if 'high_oxygen' not in critical_incidents:
-                        critical_incidents['high_oxygen'] = {
-                            'time': time_str,
-                            'value': f"{oxy:.2f} mg/L",
-                            'parameter': "Oxygen",
-                            'status': "High Oxygen",
-                            'causes': [
-                                "Over-aeration of Water",
-                                "Chemicals",
-                                "Hyperoxygenation"
-                            ]
-                        }
-
-                # pH incidents
-                ph = float(record.phlevel)
-                if ph < 4:
-                    if 'very_acidic' not in critical_incidents:
-                        critical_incidents['very_acidic'] = {
-                            'time': time_str,
-                            'value': f"{ph:.2f}",
-                            'parameter': "pH Level",
-                            'status': "Very Acidic",
-                            'causes': [
-                                "Presence of Strong Acids",
-                                "Acid Rain",
-                                "Vinegar Contamination"
-                            ]
-                        }
-                elif 4 <= ph < 6:
-                    if 'acidic' not in critical_incidents:
-                        critical_incidents['acidic'] = {
-                            'time': time_str,
-                            'value': f"{ph:.2f}",
-                            'parameter': "pH Level",
-                            'status': "Acidic",
-                            'causes': [
-                                "Acidic Products",
-                                "Coffee Contamination"
-                            ]
-                        }
-                elif ph > 9:
-                    if 'very_alkaline' not in critical_incidents:
-                        critical_incidents['very_alkaline'] = {
-                            'time': time_str,
-                            'value': f"{ph:.2f}",
-                            'parameter': "pH Level",
-                            'status': "Very Alkaline",
-                            'causes': [
-                                "Dishwashing Liquid",
-                                "Ammonia Solution",
-                                "Bleach",
-                                "Soap Contamination"
-                            ]
-                        }
 
-                # Turbidity incidents
-                turb = float(record.turbidity)
-                if turb >= 50:
-                    if 'high_turbidity' not in critical_incidents:
-                        critical_incidents['high_turbidity'] = {
-                            'time': time_str,
-                            'value': f"{turb:.2f} NTU",
-                            'parameter': "Turbidity",
-                            'status': "Dirty",
-                            'causes': [
-                                "High Particle Content",
-                                "Poor Filtration",
-                                "Excess Waste"
-                            ]
-                        }
-                elif 20 <= turb < 50:
-                    if 'medium_turbidity' not in critical_incidents:
-                        critical_incidents['medium_turbidity'] = {
-                            'time': time_str,
-                            'value': f"{turb:.2f} NTU",
-                            'parameter': "Turbidity",
-                            'status': "Cloudy",
-                            'causes': [
-                                "Suspended Particles",
-                                "Organic Matter",
-                                "Moderate Waste Build-up"
-                            ]
-                        }
-
-            # Display critical incidents
-            if critical_incidents:
-                story.append(Paragraph("First Occurrences of Critical Incidents:", normal_style))
-                story.append(Spacer(1, 12))
-                
-                # Sort incidents by time
-                sorted_incidents = sorted(critical_incidents.values(), key=lambda x: x['time'])
-                
-                for incident in sorted_incidents:
-                    story.append(Paragraph(
-                        f"<b>{incident['time']}</b> - {incident['parameter']}: {incident['value']} ({incident['status']})",
-                        normal_style
-                    ))
-                    story.append(Paragraph("Possible causes:", normal_style))
-                    for cause in incident['causes']:
-                        story.append(Paragraph(f"• {cause}", normal_style))
-                    story.append(Spacer(1, 8))
-                
-                story.append(Spacer(1, 12))
-                story.append(Paragraph(
-                    "<b>Note:</b> These conditions may cause stress to the catfish and should be addressed promptly.",
-                    normal_style
-                ))
-            else:
-                story.append(Paragraph(
-                    "No critical incidents detected during this period. All parameters were within normal ranges.",
-                    normal_style
-                ))
+            def build_story():
+                # Add title and date/time range info
+                yield Paragraph("Aquamans Data Report", title_style)
+                yield Spacer(1, 12)
+                yield Paragraph(f"Period: {period}", normal_style)
+                yield Spacer(1, 12)
+
+                # Data table, one chunk of rows at a time
+                rendered = 0
+                critical_incidents = {}
+                for chunk in self._report_chunks(start_time, end_time):
+                    rendered += len(chunk)
+                    # Earlier chunks hold the earlier occurrences
+                    for key, incident in self._find_first_incidents(chunk).items():
+                        critical_incidents.setdefault(key, incident)
+
+                    rows = [self._format_report_row(row) for row in chunk]
+                    yield from paginated_tables(REPORT_TABLE_HEADER, rows, REPORT_ROWS_PER_TABLE, REPORT_TABLE_STYLE)
+
+                logging.info(f"Rendered {rendered} records")
+                totals = self._window_totals(start_time, end_time)
+                yield PageBreak()
+                yield from self._report_findings(totals, critical_incidents, heading2_style, normal_style)
 
             logging.info("Building PDF")
-            doc.build(story)
-            buffer.seek(0)
+            # Spool to a temp file; rows are read and rendered chunk by chunk
+            output = tempfile.TemporaryFile()
+            doc = SimpleDocTemplate(
+                output,
+                pagesize=landscape(letter),
+                rightMargin=36,
+                leftMargin=36,
+                topMargin=36,
+                bottomMargin=36
+            )
+            doc.build(StreamingStory(build_story()))
+            output.seek(0)
 
             logging.info("Sending PDF file")
             return send_file(
-                buffer,
+                output,
                 as_attachment=True,
                 download_name=f"aquamans_report_{filter_date.strftime('%Y%m%d')}.pdf",
                 mimetype="application/pdf"
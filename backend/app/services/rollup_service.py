@@ -0,0 +1,347 @@
+# app/services/rollup_service.py
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+from sqlalchemy import text
+from app.extensions import db
+from app.services.archive_service import archive
+from app.utils.job_lock import JobLock, load_state, save_state
+
+# Reading columns aggregated into every bucket
+ROLLUP_COLUMNS = ('temperature', 'oxygen', 'phlevel', 'turbidity', 'catfish', 'dead_catfish')
+
+# Finest first; each level is rebuilt from the one before it
+RESOLUTIONS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+BUCKET_FORMATS = {
+    'minute': '%Y-%m-%d %H:%i:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+}
+
+# Longest span rebuilt in one transaction while catching up on history
+COMPACT_STEP = timedelta(days=1)
+
+ROLLUP_FIELDS = ['count', 'alert_count'] + [
+    f"{column}_{stat}" for column in ROLLUP_COLUMNS for stat in ('min', 'max', 'sum', 'count')
+]
+
+RAW_AGGREGATES = ', '.join(
+    ["COUNT(*)", "SUM((SELECT COUNT(*) FROM alert WHERE alert.reading_id = aquamans.id))"]
+    + [f"{stat}({column})" for column in ROLLUP_COLUMNS for stat in ('MIN', 'MAX', 'SUM', 'COUNT')]
+)
+
+ROLLUP_AGGREGATES = ', '.join(
+    ["SUM(count)", "SUM(alert_count)"]
+    + [f"{stat}({column}_{field})" for column in ROLLUP_COLUMNS
+       for stat, field in (('MIN', 'min'), ('MAX', 'max'), ('SUM', 'sum'), ('SUM', 'count'))]
+)
+
+def floor_time(value, resolution):
+    if resolution == 'minute':
+        return value.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def ceil_time(value, resolution):
+    floored = floor_time(value, resolution)
+    return floored if floored == value else floored + RESOLUTIONS[resolution]
+
+def split_window(start, stop, resolutions=('day', 'hour', 'minute')):
+    """Split [start, stop) into aligned buckets, coarsest in the middle.
+
+    Returns (resolution, lo, hi) segments; whatever no bucket covers is a
+    'raw' segment at the edges, shorter than the finest resolution.
+    """
+    if start >= stop:
+        return []
+    if not resolutions:
+        return [('raw', start, stop)]
+    resolution, finer = resolutions[0], resolutions[1:]
+    first, last = ceil_time(start, resolution), floor_time(stop, resolution)
+    if first >= last:
+        return split_window(start, stop, finer)
+    return split_window(start, first, finer) + [(resolution, first, last)] + split_window(last, stop, finer)
+
+SeriesSlot = namedtuple('SeriesSlot', ['slot', 'date', 'min', 'max', 'total', 'samples'])
+
+def _merge_stat(current, value, combine):
+    if value is None:
+        return current
+    return value if current is None else combine(current, value)
+
+class ReadingRollups:
+    """Minute, hour and day aggregates of aquamans for reports and charts.
+
+    A background pass rebuilds the minute buckets touched since the last
+    pass in SQL (plus `late_window` seconds, which picks up the detection
+    counts written into the newest row and alerts generated after the
+    insert), then the hour and day buckets above them. Only complete
+    minutes are rolled up; `compacted_until` marks where that stops.
+
+    Readers split a window into the coarsest buckets that fit and read raw
+    rows only for the partial minutes at the edges and anything newer than
+    `compacted_until`.
+
+    Only the process holding the `rollup_compactor` job lock compacts; the
+    watermark (`compacted_until` and the newest id rolled up) is stored in
+    `background_job_state`, where the other processes read it each pass.
+    """
+
+    def __init__(self, interval=60, late_window=300):
+        self.interval = interval
+        self.late_window = late_window
+        self.compacted_until = None
+        self.last_id = None
+        self.lock = JobLock('aquamans_rollup_compactor')
+        self.thread = None
+        self.stats = {
+            'passes': 0,
+            'errors': 0,
+            'last_pass_ms': None,
+            'summaries': 0,
+            'series': 0,
+            'rollup_segments': 0,
+            'raw_segments': 0
+        }
+
+    def init_app(self, app):
+        self.interval = app.config.get('ROLLUP_INTERVAL', self.interval)
+        self.late_window = app.config.get('ROLLUP_LATE_WINDOW', self.late_window)
+        if self.thread is None and app.config.get('BACKGROUND_JOBS', True):
+            self.thread = threading.Thread(target=self._run, args=(app,), daemon=True)
+            self.thread.start()
+            logging.info("Rollup compactor started")
+
+    def _run(self, app):
+        while True:
+            with app.app_context():
+                try:
+                    if self.lock.held():
+                        self.compact()
+                    else:
+                        self.load_watermark()
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    logging.error(f"Error compacting rollups: {e}")
+                    db.session.rollback()
+                    # Resume from the stored watermark on the next pass
+                    self.last_id = None
+                finally:
+                    db.session.remove()
+            time.sleep(self.interval)
+
+    def load_watermark(self):
+        """Read where the compacting process has got to."""
+        state = load_state('rollup_compactor')
+        if state is not None:
+            self.compacted_until, self.last_id = state.last_time, state.last_id
+        return self.compacted_until
+
+    def compact(self):
+        """Roll up readings added or changed since the last pass."""
+        started = time.perf_counter()
+        if self.last_id is None:
+            # First pass in this process, or after an error
+            self.load_watermark()
+        with db.engine.connect() as connection:
+            last_id, last_time = connection.execute(
+                text("SELECT MAX(id), MAX(timeData) FROM aquamans")
+            ).one()
+            if last_id is None:
+                return None
+
+            if self.compacted_until is not None:
+                lo = self.compacted_until - timedelta(seconds=self.late_window)
+            else:
+                # No stored watermark: resume after the newest stored minute, or start from the first reading
+                newest = connection.execute(text(
+                    "SELECT MAX(bucket_start) FROM aquamans_rollup WHERE resolution = 'minute'"
+                )).scalar()
+                if newest is not None:
+                    lo = newest - timedelta(seconds=self.late_window)
+                else:
+                    lo = connection.execute(text("SELECT MIN(timeData) FROM aquamans")).scalar()
+
+            if self.last_id is not None:
+                # Bulk uploads can insert readings older than the watermark
+                earliest_new = connection.execute(
+                    text("SELECT MIN(timeData) FROM aquamans WHERE id > :last_id"),
+                    {'last_id': self.last_id}
+                ).scalar()
+                if earliest_new is not None:
+                    lo = min(lo, earliest_new)
+
+        lo = floor_time(lo, 'minute')
+        if archive.horizon is not None:
+            # Archived days were rolled up before they left MySQL
+            lo = max(lo, archive.horizon)
+        hi = floor_time(last_time, 'minute')
+        self.rebuild(lo, hi)
+
+        compacted_until = hi if self.compacted_until is None else max(hi, self.compacted_until)
+        save_state('rollup_compactor', last_id=last_id, last_time=compacted_until)
+        db.session.commit()
+        self.last_id, self.compacted_until = last_id, compacted_until
+        self.stats['passes'] += 1
+        self.stats['last_pass_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return self.compacted_until
+
+    def rebuild(self, lo, hi):
+        """Recompute every bucket between lo and hi from the readings in MySQL."""
+        while lo < hi:
+            step_hi = min(lo + COMPACT_STEP, hi)
+            self._compact_range(lo, step_hi)
+            lo = step_hi
+
+    def _compact_range(self, lo, hi):
+        with db.engine.begin() as connection:
+            finer = None
+            for resolution in RESOLUTIONS:
+                self._rebuild(connection, resolution, finer, floor_time(lo, resolution), ceil_time(hi, resolution))
+                finer = resolution
+
+    def _rebuild(self, connection, resolution, finer, lo, hi):
+        params = {'resolution': resolution, 'finer': finer, 'bucket': BUCKET_FORMATS[resolution], 'lo': lo, 'hi': hi}
+        connection.execute(text(
+            "DELETE FROM aquamans_rollup "
+            "WHERE resolution = :resolution AND bucket_start >= :lo AND bucket_start < :hi"
+        ), params)
+
+        if finer is None:
+            source = (f"SELECT :resolution, DATE_FORMAT(timeData, :bucket) AS bucket, {RAW_AGGREGATES} "
+                      "FROM aquamans WHERE timeData >= :lo AND timeData < :hi")
+        else:
+            source = (f"SELECT :resolution, DATE_FORMAT(bucket_start, :bucket) AS bucket, {ROLLUP_AGGREGATES} "
+                      "FROM aquamans_rollup "
+                      "WHERE resolution = :finer AND bucket_start >= :lo AND bucket_start < :hi")
+        connection.execute(text(
+            f"INSERT INTO aquamans_rollup (resolution, bucket_start, {', '.join(ROLLUP_FIELDS)}) "
+            f"{source} GROUP BY bucket"
+        ), params)
+
+    def _segments(self, start, end, resolutions=('day', 'hour', 'minute')):
+        """Segments covering start <= timeData <= end; raw beyond `compacted_until`."""
+        stop = end + timedelta(microseconds=1)
+        covered = max(min(stop, self.compacted_until or start), start)
+        segments = split_window(start, covered, resolutions)
+        if covered < stop:
+            if segments and segments[-1][0] == 'raw':
+                segments[-1] = ('raw', segments[-1][1], stop)
+            else:
+                segments.append(('raw', covered, stop))
+
+        for resolution, _, _ in segments:
+            self.stats['raw_segments' if resolution == 'raw' else 'rollup_segments'] += 1
+        return segments
+
+    def summary(self, start, end):
+        """Count, alert count and min/max/sum/count per column for start <= timeData <= end.
+
+        Keys follow the rollup columns ('temperature_sum', 'catfish_max', ...),
+        plus '<column>_mean' over the non-null values.
+        """
+        totals = dict.fromkeys(ROLLUP_FIELDS)
+        totals['count'] = totals['alert_count'] = 0
+
+        with db.engine.connect() as connection:
+            for resolution, lo, hi in self._segments(start, end):
+                if resolution == 'raw':
+                    query = f"SELECT {RAW_AGGREGATES} FROM aquamans WHERE timeData >= :lo AND timeData < :hi"
+                else:
+                    query = (f"SELECT {ROLLUP_AGGREGATES} FROM aquamans_rollup "
+                             "WHERE resolution = :resolution AND bucket_start >= :lo AND bucket_start < :hi")
+                rows = [connection.execute(text(query), {'resolution': resolution, 'lo': lo, 'hi': hi}).one()]
+                if resolution == 'raw' and archive.covers(lo):
+                    # Archived readings have no alerts; those stay in MySQL
+                    cold = archive.aggregate(lo, hi, ROLLUP_COLUMNS)
+                    rows.append(cold[:1] + [0] + cold[1:])
+
+                for field, value in (pair for row in rows for pair in zip(ROLLUP_FIELDS, row)):
+                    if field.endswith('_min'):
+                        totals[field] = _merge_stat(totals[field], value, min)
+                    elif field.endswith('_max'):
+                        totals[field] = _merge_stat(totals[field], value, max)
+                    elif field.endswith('_sum'):
+                        totals[field] = _merge_stat(totals[field], float(value) if value is not None else None, lambda a, b: a + b)
+                    else:
+                        totals[field] = (totals[field] or 0) + int(value or 0)
+
+        for column in ROLLUP_COLUMNS:
+            count = totals[f"{column}_count"]
+            totals[f"{column}_mean"] = totals[f"{column}_sum"] / count if count else None
+        self.stats['summaries'] += 1
+        return totals
+
+    def series(self, connection, param, start, end, width):
+        """Chart buckets of `width` seconds (date, mean, min, max, count) for `param`.
+
+        Until the compactor has run, or for buckets narrower than a minute,
+        every bucket is aggregated from raw rows, archived ones included.
+        """
+        if param not in ROLLUP_COLUMNS:
+            raise ValueError(f"Unknown rollup column: {param}")
+        if self.compacted_until is None or width < RESOLUTIONS['minute'].total_seconds():
+            segments = [('raw', start, end + timedelta(microseconds=1))]
+        else:
+            resolutions = tuple(
+                resolution for resolution in ('day', 'hour', 'minute')
+                if RESOLUTIONS[resolution].total_seconds() <= width
+            )
+            segments = self._segments(start, end, resolutions)
+
+        slots = {}
+        for resolution, lo, hi in segments:
+            if resolution == 'raw':
+                query = (f"SELECT FLOOR(UNIX_TIMESTAMP(timeData) / :width) AS slot, MIN(timeData) AS date, "
+                         f"MIN({param}) AS min, MAX({param}) AS max, SUM({param}) AS total, COUNT({param}) AS samples "
+                         "FROM aquamans WHERE timeData >= :lo AND timeData < :hi GROUP BY slot")
+            else:
+                query = (f"SELECT FLOOR(UNIX_TIMESTAMP(bucket_start) / :width) AS slot, MIN(bucket_start) AS date, "
+                         f"MIN({param}_min) AS min, MAX({param}_max) AS max, SUM({param}_sum) AS total, "
+                         f"SUM({param}_count) AS samples FROM aquamans_rollup "
+                         "WHERE resolution = :resolution AND bucket_start >= :lo AND bucket_start < :hi GROUP BY slot")
+            result = connection.execute(text(query), {'width': width, 'resolution': resolution, 'lo': lo, 'hi': hi}).all()
+            if resolution == 'raw' and archive.covers(lo):
+                result += self._cold_slots(param, lo, hi, width)
+
+            for row in result:
+                slot = slots.setdefault(row.slot, {'date': row.date, 'min': None, 'max': None, 'total': 0.0, 'count': 0})
+                slot['date'] = min(slot['date'], row.date)
+                slot['min'] = _merge_stat(slot['min'], row.min, min)
+                slot['max'] = _merge_stat(slot['max'], row.max, max)
+                slot['total'] += float(row.total or 0)
+                slot['count'] += int(row.samples or 0)
+
+        self.stats['series'] += 1
+        return [
+            {
+                'date': slot['date'],
+                param: slot['total'] / slot['count'] if slot['count'] else None,
+                'min': slot['min'],
+                'max': slot['max'],
+                'count': slot['count']
+            }
+            for _, slot in sorted(slots.items())
+        ]
+
+    def _cold_slots(self, param, lo, hi, width):
+        """Archived rows in [lo, hi) grouped like the raw series query."""
+        slots = {}
+        table = archive.cold_table(lo, hi, (param,))
+        for value, date in zip(table[param].to_pylist(), table['timeData'].to_pylist()):
+            slot = slots.setdefault(int(date.timestamp() // width), [date, None, None, 0.0, 0])
+            if value is not None:
+                slot[1] = _merge_stat(slot[1], value, min)
+                slot[2] = _merge_stat(slot[2], value, max)
+                slot[3] += value
+                slot[4] += 1
+        return [SeriesSlot(key, *values) for key, values in slots.items()]
+
+rollups = ReadingRollups()
@@ -2,16 +2,20 @@
 from flask import jsonify
 from app.models import aquamans
 from app import db
+from app.utils.validators import RequestValidator, parse_time_data
+from app.services.current_state import current_state
 from datetime import datetime
 import logging
 
+RESULT_FIELDS = ['tempResult', 'oxygenResult', 'phResult', 'turbidityResult']
+
 class SensorService:
     def get_temperature(self):
         try:
-            latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-            if latest_record:
-                logging.debug(f"Latest temperature record: {latest_record.temperature}")
-                return jsonify({'temperature': latest_record.temperature})
+            latest = current_state.get()
+            if latest:
+                logging.debug(f"Latest temperature record: {latest['temperature']}")
+                return jsonify({'temperature': latest['temperature']})
             return jsonify({'temperature': 'N/A'})
         except Exception as e:
             logging.error(f"Error fetching temperature: {e}")
@@ -19,10 +23,10 @@ class SensorService:
 
     def get_oxygen(self):
         try:
-            latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-            if latest_record:
-                logging.debug(f"Latest oxygen record: {latest_record.oxygen}")
-                return jsonify({'oxygen': latest_record.oxygen})
+            latest = current_state.get()
+            if latest:
+                logging.debug(f"Latest oxygen record: {latest['oxygen']}")
+                return jsonify({'oxygen': latest['oxygen']})
             return jsonify({'oxygen': 'N/A'})
         except Exception as e:
             logging.error(f"Error fetching oxygen: {e}")
@@ -30,10 +34,10 @@ class SensorService:
 
     def get_phlevel(self):
         try:
-            latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-            if latest_record:
-                logging.debug(f"Latest pH level record: {latest_record.phlevel}")
-                return jsonify({'phlevel': latest_record.phlevel})
+            latest = current_state.get()
+            if latest:
+                logging.debug(f"Latest pH level record: {latest['phlevel']}")
+                return jsonify({'phlevel': latest['phlevel']})
             return jsonify({'phlevel': 'N/A'})
         except Exception as e:
             logging.error(f"Error fetching pH level: {e}")
@@ -41,10 +45,10 @@ class SensorService:
 
     def get_turbidity(self):
         try:
-            latest_record = aquamans.query.order_by(aquamans.timeData.desc()).first()
-            if latest_record:
-                logging.debug(f"Latest turbidity record: {latest_record.turbidity}")
-                return jsonify({'turbidity': latest_record.turbidity})
+            latest = current_state.get()
+            if latest:
+                logging.debug(f"Latest turbidity record: {latest['turbidity']}")
+                return jsonify({'turbidity': latest['turbidity']})
             return jsonify({'turbidity': 'N/A'})
         except Exception as e:
             logging.error(f"Error fetching turbidity: {e}")
@@ -67,12 +71,57 @@ class SensorService:
             logging.error(f"Error updating sensor data: {e}")
             return jsonify({'status': 'failure', 'error': str(e)})
 
+    def bulk_update_sensor_data(self, readings):
+        """Insert a batch of readings in one transaction with per-row status."""
+        try:
+            errors = RequestValidator.validate_sensor_batch(readings)
+            now = datetime.utcnow()
+
+            rows = []
+            results = []
+            for index, (reading, row_errors) in enumerate(zip(readings, errors)):
+                if row_errors:
+                    results.append({'index': index, 'status': 'error', 'errors': row_errors})
+                    continue
+
+                row = {
+                    'temperature': float(reading['temperature']),
+                    'oxygen': float(reading['oxygen']),
+                    'phlevel': float(reading['phlevel']),
+                    'turbidity': float(reading['turbidity']),
+                    'timeData': parse_time_data(reading.get('timeData')) or now
+                }
+                for field in RESULT_FIELDS:
+                    row[field] = reading.get(field)
+                rows.append(row)
+                results.append({'index': index, 'status': 'ok'})
+
+            if rows:
+                # One executemany and one commit for the whole batch
+                db.session.bulk_insert_mappings(aquamans, rows)
+                db.session.commit()
+                # Bulk inserts skip ORM events, so reload the newest reading once per batch
+                current_state.refresh()
+
+            rejected = len(readings) - len(rows)
+            logging.debug(f"Bulk sensor upload: {len(rows)} inserted, {rejected} rejected")
+            return jsonify({
+                'status': 'success' if rejected == 0 else 'partial',
+                'inserted': len(rows),
+                'rejected': rejected,
+                'results': results
+            })
+        except Exception as e:
+            logging.error(f"Error in bulk sensor upload: {e}")
+            db.session.rollback()
+            return jsonify({'status': 'failure', 'error': str(e)}), 500
+
     def update_detection(self, data):
         try:
             catfish_count = int(data.get('catfish', 0))
             dead_catfish_count = int(data.get('dead_catfish', 0))
 
-            latest_record = aquamans.query.order_by(aquamans.id.desc()).first()
+            latest_record = aquamans.query.order_by(aquamans.timeData.desc(), aquamans.id.desc()).first()
             if latest_record:
                 latest_record.catfish = catfish_count
                 latest_record.dead_catfish = dead_catfish_count
@@ -0,0 +1,159 @@
+# app/services/video_pipeline.py
+import logging
+import threading
+import time
+from collections import deque
+import cv2
+from app.services.detection_scheduler import DetectionScheduler
+
+logger = logging.getLogger(__name__)
+
+class FrameBuffer:
+    """Ring buffer of the most recent encoded frames.
+
+    The producer publishes JPEG bytes; any number of viewers wait for a
+    sequence number newer than the one they last sent. Slow viewers skip
+    frames instead of holding up the producer.
+    """
+
+    def __init__(self, capacity=4):
+        self.frames = deque(maxlen=capacity)
+        self.sequence = 0
+        self.condition = threading.Condition()
+
+    def publish(self, jpeg):
+        with self.condition:
+            self.sequence += 1
+            self.frames.append((self.sequence, jpeg, time.time()))
+            self.condition.notify_all()
+            return self.sequence
+
+    def latest(self):
+        with self.condition:
+            return self.frames[-1] if self.frames else None
+
+    def wait_for(self, after_sequence, timeout=None):
+        """Return the newest frame with a sequence above `after_sequence`, or None on timeout."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > after_sequence, timeout)
+            if self.sequence > after_sequence:
+                return self.frames[-1]
+            return None
+
+class VideoPipeline:
+    """One capture -> batched inference -> annotate -> encode loop shared by all viewers.
+
+    The loop starts with the first viewer and stops `idle_timeout` seconds
+    after the last one leaves, releasing the cameras. It drives a
+    DetectionScheduler over the configured sources; `handle_result(source,
+    frame, detections, fresh)` runs tracking and draws on each frame, which is then
+    published to that source's buffer. `before_capture` may block (e.g. for
+    the overheating rest period).
+    """
+
+    def __init__(self, make_sources, get_model, handle_result, before_capture=None,
+                 buffer_size=4, idle_timeout=10.0, jpeg_quality=80, max_batch=8):
+        self.make_sources = make_sources
+        self.get_model = get_model
+        self.handle_result = handle_result
+        self.before_capture = before_capture
+        self.buffer_size = buffer_size
+        self.buffers = {}
+        self.idle_timeout = idle_timeout
+        self.max_batch = max_batch
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.scheduler = None
+        self.viewers = 0
+        self.last_viewer_left = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {'frames': 0, 'encode_errors': 0, 'frame_ms_last': 0.0}
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    def buffer(self, name):
+        with self.lock:
+            if name not in self.buffers:
+                self.buffers[name] = FrameBuffer(self.buffer_size)
+            return self.buffers[name]
+
+    def frames(self, source, wait_timeout=5.0):
+        """Yield multipart MJPEG chunks of one source for one viewer."""
+        buffer = self.buffer(source)
+        self._add_viewer()
+        try:
+            sequence = 0
+            while True:
+                item = buffer.wait_for(sequence, wait_timeout)
+                if item is None:
+                    if not self.running:
+                        break
+                    continue
+                sequence, jpeg, _ = item
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            self._remove_viewer()
+
+    def source_stats(self):
+        scheduler = self.scheduler
+        return scheduler.source_stats() if scheduler is not None else {}
+
+    def _add_viewer(self):
+        with self.lock:
+            self.viewers += 1
+            if not self.running:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def _remove_viewer(self):
+        with self.lock:
+            self.viewers -= 1
+            if self.viewers == 0:
+                self.last_viewer_left = time.monotonic()
+
+    def _should_stop(self):
+        # Checked and cleared under the lock so a viewer arriving now starts a new loop
+        with self.lock:
+            if (self.viewers == 0 and self.last_viewer_left is not None
+                    and time.monotonic() - self.last_viewer_left >= self.idle_timeout):
+                self.thread = None
+                return True
+            return False
+
+    def _publish(self, source, frame, detections, fresh):
+        started = time.perf_counter()
+        try:
+            frame = self.handle_result(source, frame, detections, fresh)
+        except Exception as e:
+            logger.error(f"Error processing frame from {source.name}: {str(e)}")
+        ret, buffer = cv2.imencode('.jpg', frame, self.encode_params)
+        if not ret:
+            self.stats['encode_errors'] += 1
+            return
+        self.buffer(source.name).publish(buffer.tobytes())
+        self.stats['frames'] += 1
+        self.stats['frame_ms_last'] = round((time.perf_counter() - started) * 1000, 1)
+
+    def _run(self):
+        scheduler = None
+        try:
+            scheduler = DetectionScheduler(self.get_model(), self.make_sources(), self._publish, max_batch=self.max_batch)
+            scheduler.start()
+            self.scheduler = scheduler
+            logger.info(f"Video pipeline started with {len(scheduler.sources)} sources")
+            while not self._should_stop():
+                if self.before_capture is not None:
+                    self.before_capture()
+                scheduler.step()
+        except Exception as e:
+            logger.error(f"Error in video pipeline: {str(e)}")
+        finally:
+            if scheduler is not None:
+                scheduler.stop()
+            with self.lock:
+                if self.thread is threading.current_thread():
+                    self.thread = None
+            logger.info("Video pipeline stopped")
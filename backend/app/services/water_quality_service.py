@@ -9,6 +9,7 @@ import numpy as np
 from scipy import stats
 from sklearn.linear_model import LinearRegression
 import pandas as pd
+from app.utils.thresholds import band_classifier, BAND_SEVERITY
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -49,6 +50,7 @@ class WaterQualityService:
                 'critical': 100
             }
         }
+        self.classifier = band_classifier(self.parameter_thresholds)
 
     def check_water_quality(self):
         try:
@@ -235,24 +237,12 @@ class WaterQualityService:
         }
 
     def _get_parameter_status(self, param, value):
-        thresholds = self.parameter_thresholds[param]
-        
-        if param != 'turbidity':
-            if value <= thresholds['critical_low'] or value >= thresholds['critical_high']:
-                return 'Critical', 'critical'
-            elif value <= thresholds['warning_low'] or value >= thresholds['warning_high']:
-                return 'Warning', 'warning'
-            elif thresholds['normal_low'] <= value <= thresholds['normal_high']:
-                return 'Normal', 'normal'
-            else:
-                return 'Abnormal', 'warning'
-        else:
-            if value >= thresholds['critical']:
-                return 'Critical', 'critical'
-            elif value >= thresholds['warning']:
-                return 'Warning', 'warning'
-            else:
-                return 'Normal', 'normal'
+        status = self.classifier.classify_one(param, value)
+        return status, BAND_SEVERITY.get(status, 'warning')
+
+    def _get_parameter_statuses(self, param, values):
+        """Vectorized `_get_parameter_status` for a whole column of readings."""
+        return self.classifier.classify(param, values)
 
     def _generate_recommendations(self, param, value, status, trend):
         recommendations = []
@@ -407,6 +397,18 @@ class WaterQualityService:
         stability = 1.0 - min(1.0, std_dev / mean_val)
         return round(stability, 2)
 
+    def water_quality_report_window(self, alert_id):
+        """(start, end) of the rows print_water_quality_report reads, None for an unknown alert."""
+        alert_time = (
+            db.session.query(aquamans.timeData)
+            .filter(aquamans.id == alert_id.replace('wq_', ''))
+            .scalar()
+        )
+        if alert_time is None:
+            return None
+        # The report reads everything from 3 hours before the alert onwards
+        return alert_time - timedelta(hours=3), None
+
     def print_water_quality_report(self, alert_id):
         """Generate detailed PDF report for water quality"""
         try:
@@ -552,11 +554,11 @@ class WaterQualityService:
                 story.append(Paragraph("Predictions (Next 6 Hours)", heading2_style))
                 for param, pred_values in predictions.items():
                     if pred_values:
+                        pred_statuses = self._get_parameter_statuses(param, pred_values)
                         pred_data = [
                             ["Hour", "Predicted Value", "Status"],
-                            *[(f"+{i+1}h", f"{value:.2f}", 
-                            self._get_parameter_status(param, value)[0])
-                            for i, value in enumerate(pred_values)]
+                            *[(f"+{i+1}h", f"{value:.2f}", str(status))
+                            for i, (value, status) in enumerate(zip(pred_values, pred_statuses))]
                         ]
                         
                         story.append(Paragraph(f"{param.title()} Predictions:", normal_style))
@@ -0,0 +1,125 @@
+# app/utils/db_pool.py
+import logging
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import pooling
+
+class ConnectionPool:
+    """Shared mysql.connector pool for the detection scripts and video routes.
+
+    Connections are opened once and reused, so detection-time queries skip
+    the TCP and auth handshake. A connection idle for longer than
+    `health_check_interval` is pinged (and reconnected if needed) before
+    it is handed out. When every connection is busy, callers wait up to
+    `acquire_timeout` seconds.
+    """
+
+    def __init__(self, db_config, pool_name, pool_size=5, health_check_interval=30, acquire_timeout=5):
+        self.db_config = db_config
+        self.pool_name = pool_name
+        self.pool_size = pool_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.pool = None
+        self.last_used = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            'acquired': 0,
+            'in_use': 0,
+            'waits': 0,
+            'health_checks': 0,
+            'reconnects': 0,
+            'errors': 0,
+            'acquire_ms_avg': None
+        }
+
+    def _get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = pooling.MySQLConnectionPool(
+                    pool_name=self.pool_name,
+                    pool_size=self.pool_size,
+                    pool_reset_session=True,
+                    **self.db_config
+                )
+            return self.pool
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        delay = 0.05
+        while True:
+            try:
+                return self._get_pool().get_connection()
+            except pooling.PoolError:
+                # Pool exhausted; wait for a connection to be returned
+                if time.monotonic() >= deadline:
+                    raise
+                with self.lock:
+                    self.stats['waits'] += 1
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+
+    def _key(self, connection):
+        return id(getattr(connection, '_cnx', connection))
+
+    def _check_health(self, connection):
+        key = self._key(connection)
+        with self.lock:
+            idle_since = self.last_used.get(key)
+        if idle_since is None or time.monotonic() - idle_since < self.health_check_interval:
+            return
+        with self.lock:
+            self.stats['health_checks'] += 1
+        if not connection.is_connected():
+            with self.lock:
+                self.stats['reconnects'] += 1
+                self.last_used.pop(key, None)
+            connection.reconnect(attempts=3, delay=1)
+
+    def _released(self, connection, failed):
+        """Record when the connection went idle; forget it if it failed."""
+        key = self._key(connection)
+        with self.lock:
+            self.stats['in_use'] -= 1
+            if failed:
+                # The pool may replace it, and id() values get reused
+                self.last_used.pop(key, None)
+            else:
+                self.last_used[key] = time.monotonic()
+            if len(self.last_used) > 2 * self.pool_size:
+                # Connections the pool replaced without telling us; the oldest entries are theirs
+                for stale in sorted(self.last_used, key=self.last_used.get)[:len(self.last_used) - self.pool_size]:
+                    del self.last_used[stale]
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it goes back to the pool when the block exits."""
+        started = time.perf_counter()
+        try:
+            connection = self._acquire()
+            self._check_health(connection)
+        except mysql.connector.Error as e:
+            with self.lock:
+                self.stats['errors'] += 1
+            logging.error(f"Could not get a pooled database connection: {e}")
+            raise
+
+        acquire_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            previous = self.stats['acquire_ms_avg']
+            self.stats['acquire_ms_avg'] = round(acquire_ms if previous is None else previous + 0.2 * (acquire_ms - previous), 2)
+            self.stats['acquired'] += 1
+            self.stats['in_use'] += 1
+        failed = False
+        try:
+            yield connection
+        except mysql.connector.Error:
+            failed = True
+            with self.lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            self._released(connection, failed)
+            connection.close()
@@ -0,0 +1,90 @@
+# app/utils/delta_codec.py
+import math
+import struct
+from datetime import datetime, timezone
+
+# Frame layout (little endian):
+#   uint8   flags      bit 0 set on keyframes
+#   uint32  sequence   increments per frame, lets clients detect gaps
+#   float64 timestamp  reading time, seconds since the Unix epoch (NaN if unknown)
+#   uint8   mask       bit i set when field i is present
+#   float32 * popcount(mask) values in field order, NaN for None
+FRAME_HEADER = struct.Struct('<BIdB')
+KEYFRAME = 0x01
+
+def _to_epoch(timestamp):
+    if not timestamp:
+        return math.nan
+    # Readings are stored as naive UTC; never read them as server-local time
+    value = datetime.fromisoformat(timestamp)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _to_float(value):
+    return math.nan if value is None else float(value)
+
+class DeltaEncoder:
+    """Encodes successive payloads as packed binary deltas.
+
+    Only fields that changed since the previous frame are sent. Every
+    `keyframe_interval` frames, and after `reset()`, all fields are sent
+    so a client that missed frames converges again.
+    """
+
+    def __init__(self, fields, keyframe_interval=30):
+        if len(fields) > 8:
+            raise ValueError("A frame mask holds at most 8 fields")
+        self.fields = list(fields)
+        self.keyframe_interval = keyframe_interval
+        self.last = None
+        self.last_timestamp = None
+        self.sequence = 0
+        self.since_keyframe = 0
+
+    def reset(self):
+        self.last = None
+
+    def encode(self, payload):
+        """Return the frame for `payload`, or None if nothing changed."""
+        keyframe = self.last is None or self.since_keyframe >= self.keyframe_interval
+        values = [_to_float(payload.get(field)) for field in self.fields]
+        # Compare at float32 precision so values that encode the same are not resent
+        values = list(struct.unpack(f'<{len(values)}f', struct.pack(f'<{len(values)}f', *values)))
+
+        mask = 0
+        changed = []
+        for index, value in enumerate(values):
+            previous = None if self.last is None else self.last[index]
+            same = previous is not None and (previous == value or (math.isnan(previous) and math.isnan(value)))
+            if keyframe or not same:
+                mask |= 1 << index
+                changed.append(value)
+
+        # A new reading with unchanged values still gets a header-only frame
+        timestamp = payload.get('timestamp')
+        if not changed and timestamp == self.last_timestamp:
+            return None
+
+        self.last = values
+        self.last_timestamp = timestamp
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self.since_keyframe = 0 if keyframe else self.since_keyframe + 1
+        flags = KEYFRAME if keyframe else 0
+        header = FRAME_HEADER.pack(flags, self.sequence, _to_epoch(timestamp), mask)
+        return header + struct.pack(f'<{len(changed)}f', *changed)
+
+def decode_frame(frame, fields, previous=None):
+    """Apply `frame` to `previous` and return (payload, is_keyframe, sequence)."""
+    flags, sequence, timestamp, mask = FRAME_HEADER.unpack_from(frame)
+    present = [index for index in range(len(fields)) if mask & (1 << index)]
+    values = struct.unpack_from(f'<{len(present)}f', frame, FRAME_HEADER.size)
+
+    payload = {} if flags & KEYFRAME or previous is None else dict(previous)
+    for index, value in zip(present, values):
+        payload[fields[index]] = None if math.isnan(value) else value
+    payload['timestamp'] = (
+        None if math.isnan(timestamp)
+        else datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+    )
+    return payload, bool(flags & KEYFRAME), sequence
@@ -0,0 +1,126 @@
+# app/utils/detection_reporter.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+import requests
+
+class DetectionReporter:
+    """Sends detection counts to /update_detection from a background thread.
+
+    `report()` never blocks the frame loop: it only records the newest
+    counts per camera (older unsent counts for that camera are replaced).
+    When any camera has new counts, the sender thread posts the latest
+    counts of every camera heard from in the last `stale_after` seconds as
+    one JSON list, at most every `interval` seconds, because the server
+    sums each batch into the tank totals. Failed sends are retried with
+    exponential backoff.
+    """
+
+    def __init__(self, url, interval=1.0, timeout=5, max_cameras=32, max_backoff=30, stale_after=60):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.max_cameras = max_cameras
+        self.max_backoff = max_backoff
+        self.stale_after = stale_after
+        self.session = requests.Session()
+        self.pending = OrderedDict()
+        self.latest = OrderedDict()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.consecutive_failures = 0
+        self.stats = {
+            'reported': 0,
+            'coalesced': 0,
+            'dropped': 0,
+            'batches': 0,
+            'sent': 0,
+            'failures': 0,
+            'latency_ms_last': 0.0,
+            'latency_ms_avg': None,
+            'last_error': None
+        }
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='detection-reporter', daemon=True)
+                self.thread.start()
+        return self
+
+    def report(self, catfish, dead_catfish, camera='camera0'):
+        update = {
+            'camera': camera,
+            'catfish': int(catfish),
+            'dead_catfish': int(dead_catfish),
+            'detected_at': time.time()
+        }
+        with self.lock:
+            self.stats['reported'] += 1
+            if camera in self.pending:
+                del self.pending[camera]
+                self.stats['coalesced'] += 1
+            elif len(self.pending) >= self.max_cameras:
+                self.pending.popitem(last=False)
+                self.stats['dropped'] += 1
+            self.pending[camera] = update
+            self.latest.pop(camera, None)
+            if len(self.latest) >= self.max_cameras:
+                self.latest.popitem(last=False)
+            self.latest[camera] = update
+        self.start()
+        self.wakeup.set()
+        return True
+
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            with self.lock:
+                changed, self.pending = list(self.pending.values()), OrderedDict()
+                batch = self._snapshot() if changed else []
+            if batch and not self._send(batch):
+                self._requeue(changed)
+
+            delay = self.interval
+            if self.consecutive_failures:
+                delay = min(self.interval * 2 ** self.consecutive_failures, self.max_backoff)
+            time.sleep(delay)
+
+    def _send(self, batch):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json=batch, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.consecutive_failures += 1
+            self.stats['failures'] += 1
+            self.stats['last_error'] = str(e)
+            logging.error(f"Error sending detection data to Flask API: {e}")
+            return False
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.consecutive_failures = 0
+        self.stats['batches'] += 1
+        self.stats['sent'] += len(batch)
+        self.stats['latency_ms_last'] = round(latency_ms, 1)
+        previous = self.stats['latency_ms_avg']
+        self.stats['latency_ms_avg'] = round(latency_ms if previous is None else previous + 0.2 * (latency_ms - previous), 1)
+        logging.debug(f"Detection data sent: {batch}")
+        return True
+
+    def _snapshot(self):
+        """Latest counts of every camera that reported recently."""
+        cutoff = time.time() - self.stale_after
+        return [update for update in self.latest.values() if update['detected_at'] >= cutoff]
+
+    def _requeue(self, batch):
+        with self.lock:
+            for update in batch:
+                # Newer counts reported while sending win over the failed ones
+                if update['camera'] not in self.pending and len(self.pending) < self.max_cameras:
+                    self.pending[update['camera']] = update
+                    self.pending.move_to_end(update['camera'], last=False)
+        self.wakeup.set()
@@ -0,0 +1,30 @@
+# app/utils/detections.py
+import cv2
+
+CLASS_NAMES = ["catfish", "dead_catfish"]
+CLASS_COLORS = [(0, 255, 0), (0, 0, 255)]
+MIN_BOX_SIZE = 0  # pixels; DETECTION_MIN_BOX_SIZE drops smaller boxes as noise, 0 keeps every box
+
+def extract_detections(results, min_size=MIN_BOX_SIZE):
+    """Flatten YOLO results into (x1, y1, x2, y2, conf, cls) tuples, dropping boxes under min_size."""
+    detections = []
+    for result in results:
+        for box in result.boxes:
+            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
+            if (x2 - x1) < min_size or (y2 - y1) < min_size:
+                continue
+            detections.append((x1, y1, x2, y2, float(box.conf[0]), int(box.cls[0])))
+    return detections
+
+def count_detections(detections):
+    """Return (catfish_count, dead_catfish_count)."""
+    dead = sum(1 for detection in detections if detection[5] == 1)
+    return len(detections) - dead, dead
+
+def draw_detections(frame, detections):
+    for x1, y1, x2, y2, conf, cls in detections:
+        color = CLASS_COLORS[cls]
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{CLASS_NAMES[cls]} {conf:.2f}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    return frame
@@ -0,0 +1,91 @@
+# app/utils/event_bus.py
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+CHANNEL_PREFIX = 'aquamans:'
+
+class EventBus:
+    """Minimal publish/subscribe for ingest events.
+
+    In-process by default: `publish` calls the handlers directly. With
+    EVENT_BUS_REDIS_URL set, events go through Redis pub/sub, so every worker
+    process (each with its own WebSocket clients) receives them. The listener
+    resubscribes with backoff after a Redis error; until it is back, this
+    process also delivers its own events locally.
+    """
+
+    def __init__(self, max_backoff=30):
+        self.handlers = defaultdict(list)
+        self.redis = None
+        self.listener = None
+        self.subscribed = False
+        self.max_backoff = max_backoff
+
+    def init_app(self, app):
+        url = app.config.get('EVENT_BUS_REDIS_URL')
+        if url and self.redis is None:
+            import redis
+            self.redis = redis.Redis.from_url(url)
+            # Scripts (serial ingest, maintenance) only publish; the app delivers events to handlers
+            if app.config.get('BACKGROUND_JOBS', True):
+                self.listener = threading.Thread(target=self._listen, daemon=True)
+                self.listener.start()
+            logging.info("Event bus using Redis pub/sub")
+
+    def subscribe(self, topic, handler):
+        self.handlers[topic].append(handler)
+
+    def publish(self, topic, payload):
+        if self.redis is not None:
+            try:
+                self.redis.publish(CHANNEL_PREFIX + topic, json.dumps(payload, default=str))
+                if self.subscribed or self.listener is None:
+                    return
+                # Our own listener is reconnecting and would miss this event
+            except Exception as e:
+                logging.error(f"Redis publish failed, delivering locally: {e}")
+        self._dispatch(topic, payload)
+
+    def _dispatch(self, topic, payload):
+        for handler in self.handlers.get(topic, []):
+            try:
+                handler(payload)
+            except Exception as e:
+                logging.error(f"Error in {topic} event handler: {e}")
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(CHANNEL_PREFIX + '*')
+                self.subscribed = True
+                backoff = 1
+                for message in pubsub.listen():
+                    self._receive(message)
+            except Exception as e:
+                logging.error(f"Redis event listener lost its subscription, retrying in {backoff}s: {e}")
+            finally:
+                self.subscribed = False
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _receive(self, message):
+        channel = message['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        try:
+            payload = json.loads(message['data'])
+        except (TypeError, ValueError) as e:
+            logging.error(f"Dropping malformed event on {channel}: {e}")
+            return
+        self._dispatch(channel[len(CHANNEL_PREFIX):], payload)
+
+event_bus = EventBus()
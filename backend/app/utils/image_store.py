@@ -0,0 +1,21 @@
+# app/utils/image_store.py
+import hashlib
+
+# Works with any MySQL DB-API cursor (mysql.connector, PyMySQL, MySQLdb)
+INSERT_IMAGE = """
+INSERT INTO catfish_image (sha256, data, size, content_type, created_at)
+VALUES (%s, %s, %s, %s, NOW())
+ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id)
+"""
+
+def image_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def store_image(cursor, data, content_type='image/jpeg'):
+    """Store image bytes once by content hash and return the row id.
+
+    Identical snapshots map to the same row; LAST_INSERT_ID(id) makes the
+    duplicate case return the existing id. The caller owns the transaction.
+    """
+    cursor.execute(INSERT_IMAGE, (image_hash(data), data, len(data), content_type))
+    return cursor.lastrowid
@@ -0,0 +1,80 @@
+# app/utils/job_lock.py
+import logging
+from sqlalchemy import text
+from app.extensions import db
+from app.models import JobState
+
+class JobLock:
+    """Elects one process to run a background job with a named MySQL lock.
+
+    Every web worker, the reloader child and any script that builds the app
+    starts the same background threads; each loop calls `held()` before doing
+    work and skips the pass when another process owns the lock. GET_LOCK is
+    tied to the session, so the lock is taken on a connection kept checked
+    out of the pool and is released by MySQL if this process dies, letting a
+    waiting process take over on its next pass.
+
+    Backends without named locks (SQLite in development) are assumed to be
+    used by a single process and always hold the lock.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.connection = None
+
+    def held(self):
+        """True while this process owns the lock, taking it if it is free."""
+        if db.engine.dialect.name != 'mysql':
+            return True
+        try:
+            if self.connection is not None:
+                # Confirms the session holding the lock is still alive
+                self.connection.execute(text("SELECT 1"))
+                self.connection.commit()
+                return True
+
+            self.connection = db.engine.connect()
+            acquired = self.connection.execute(text("SELECT GET_LOCK(:name, 0)"), {'name': self.name}).scalar()
+            self.connection.commit()
+            if acquired != 1:
+                self.connection.close()
+                self.connection = None
+                return False
+            logging.info(f"Took job lock {self.name}")
+            return True
+        except Exception as e:
+            logging.warning(f"Lost job lock {self.name}: {e}")
+            self._discard()
+            return False
+
+    def release(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': self.name})
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+        except Exception:
+            self._discard()
+
+    def _discard(self):
+        # Never hand a connection that may still own the lock back to the pool
+        if self.connection is not None:
+            try:
+                self.connection.invalidate()
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+def load_state(name):
+    return db.session.get(JobState, name)
+
+def save_state(name, last_id=None, last_time=None):
+    """Stage the job's watermark in the current session; the caller commits."""
+    state = db.session.get(JobState, name) or JobState(name=name)
+    state.last_id = last_id
+    state.last_time = last_time
+    db.session.add(state)
+    return state
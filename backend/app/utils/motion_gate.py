@@ -0,0 +1,46 @@
+# app/utils/motion_gate.py
+import time
+import cv2
+
+class MotionGate:
+    """Cheap change detector that decides whether a frame needs inference.
+
+    Frames are shrunk to a small blurred grayscale thumbnail and compared
+    with the thumbnail of the last frame that was sent to the model. When
+    the mean absolute difference stays under `threshold` (0-255 scale) the
+    previous detections can be reused. Inference is forced at least every
+    `refresh_interval` seconds so slow changes are never missed for long.
+    """
+
+    def __init__(self, threshold=4.0, refresh_interval=5.0, size=(64, 48)):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.size = size
+        self.reference = None
+        self.last_refresh = 0.0
+        self.stats = {'inferred': 0, 'skipped': 0, 'score_last': 0.0}
+
+    def thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def should_infer(self, frame, now=None):
+        now = time.monotonic() if now is None else now
+        thumbnail = self.thumbnail(frame)
+
+        if self.reference is not None and now - self.last_refresh < self.refresh_interval:
+            score = float(cv2.absdiff(thumbnail, self.reference).mean())
+            self.stats['score_last'] = round(score, 2)
+            if score < self.threshold:
+                self.stats['skipped'] += 1
+                return False
+
+        self.reference = thumbnail
+        self.last_refresh = now
+        self.stats['inferred'] += 1
+        return True
+
+    def reset(self):
+        self.reference = None
@@ -0,0 +1,34 @@
+# app/utils/pdf_stream.py
+from reportlab.platypus import Table
+
+class StreamingStory(list):
+    """Story list that pulls flowables from an iterator as ReportLab consumes them.
+
+    SimpleDocTemplate.build() checks len() before handling each flowable
+    and deletes it afterwards, so only a few flowables (and the rows behind
+    them) are alive at any time instead of the whole report.
+    """
+
+    def __init__(self, flowables, lookahead=4):
+        super().__init__()
+        self.source = iter(flowables)
+        self.lookahead = lookahead
+
+    def __len__(self):
+        while list.__len__(self) < self.lookahead:
+            try:
+                self.append(next(self.source))
+            except StopIteration:
+                break
+        return list.__len__(self)
+
+def paginated_tables(header, rows, rows_per_table, style):
+    """Yield page-sized Tables for `rows`, each with the header row repeated.
+
+    Many small tables lay out in linear time; one huge Table is re-split on
+    every page, which gets slow and memory hungry for long reports.
+    """
+    for start in range(0, len(rows), rows_per_table):
+        table = Table([header] + rows[start:start + rows_per_table], repeatRows=1)
+        table.setStyle(style)
+        yield table
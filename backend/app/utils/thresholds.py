@@ -0,0 +1,155 @@
+# app/utils/thresholds.py
+import numpy as np
+
+def _always(v):
+    return np.ones(v.shape, dtype=bool)
+
+class ThresholdClassifier:
+    """Classifies whole columns of readings in one NumPy pass.
+
+    `rules` maps a parameter to an ordered list of `(label, predicate)` pairs,
+    evaluated like an if/elif chain: the first predicate that holds wins and
+    `default` covers the final else. Missing values (None/NaN) get `missing`.
+    """
+
+    def __init__(self, rules, default='normal', missing='N/A', aliases=None):
+        self.rules = rules
+        self.default = default
+        self.missing = missing
+        self.aliases = aliases or {}
+
+    def classify(self, param, values):
+        param = self.aliases.get(param, param)
+        values = np.asarray(values, dtype=float)
+        rules = self.rules[param]
+
+        with np.errstate(invalid='ignore'):
+            conditions = [predicate(values) for _, predicate in rules]
+        labels = np.select(conditions, [label for label, _ in rules], default=self.default)
+        return np.where(np.isnan(values), self.missing, labels)
+
+    def classify_one(self, param, value):
+        return str(self.classify(param, [value])[0])
+
+    def classify_all(self, columns):
+        return {param: self.classify(param, values) for param, values in columns.items()}
+
+# Alert severities raised for a reading
+ALERT_LEVELS = ThresholdClassifier({
+    'temperature': [
+        ('critical', lambda v: (v <= 20) | (v >= 35)),
+        ('warning', lambda v: ((v > 20) & (v < 26)) | ((v >= 32) & (v < 35))),
+    ],
+    'oxygen': [
+        ('critical', lambda v: v <= 0.8),
+        ('warning', lambda v: v < 1.5),
+    ],
+    'phlevel': [
+        ('critical', lambda v: (v < 4) | (v > 9)),
+        ('warning', lambda v: ((v >= 4) & (v < 6)) | ((v > 7.5) & (v <= 9))),
+    ],
+    'turbidity': [
+        ('critical', lambda v: v >= 50),
+        ('warning', lambda v: (v >= 20) & (v < 50)),
+    ],
+}, default='normal', missing='normal', aliases={'ph': 'phlevel'})
+
+# Human-readable status shown in reports
+REPORT_STATUS = ThresholdClassifier({
+    'temperature': [
+        ('Normal', lambda v: (v >= 26) & (v <= 32)),
+        ('Below Average', lambda v: (v > 20) & (v < 26)),
+        ('Cold', lambda v: v <= 20),
+        ('Above Average', lambda v: (v >= 32) & (v < 35)),
+        ('Hot', _always),
+    ],
+    'oxygen': [
+        ('Very Low', lambda v: v == 0),
+        ('Low', lambda v: v < 1.5),
+        ('Normal', lambda v: (v >= 1.5) & (v <= 5)),
+        ('High', _always),
+    ],
+    'phlevel': [
+        ('Very Acidic', lambda v: v < 4),
+        ('Acidic', lambda v: (v >= 4) & (v < 6)),
+        ('Normal', lambda v: (v >= 6) & (v <= 7.5)),
+        ('Alkaline', lambda v: (v > 7.5) & (v <= 9)),
+        ('Very Alkaline', _always),
+    ],
+    'turbidity': [
+        ('Clean', lambda v: v < 20),
+        ('Cloudy', lambda v: (v >= 20) & (v < 50)),
+        ('Dirty', _always),
+    ],
+}, aliases={'ph': 'phlevel'})
+
+# Incident keys used by the data report's critical incident analysis
+INCIDENTS = ThresholdClassifier({
+    'temperature': [
+        ('cold_temp', lambda v: v <= 20),
+        ('below_avg_temp', lambda v: (v > 20) & (v < 26)),
+        ('above_avg_temp', lambda v: (v >= 32) & (v < 35)),
+        ('hot_temp', lambda v: v >= 35),
+    ],
+    'oxygen': [
+        ('very_low_oxygen', lambda v: v <= 0.8),
+        ('low_oxygen', lambda v: v < 1.5),
+        ('high_oxygen', lambda v: v > 5),
+    ],
+    'phlevel': [
+        ('very_acidic', lambda v: v < 4),
+        ('acidic', lambda v: (v >= 4) & (v < 6)),
+        ('very_alkaline', lambda v: v > 9),
+    ],
+    'turbidity': [
+        ('high_turbidity', lambda v: v >= 50),
+        ('medium_turbidity', lambda v: (v >= 20) & (v < 50)),
+    ],
+}, default='', missing='', aliases={'ph': 'phlevel'})
+
+def band_classifier(thresholds):
+    """Build a classifier from WaterQualityService-style threshold bands."""
+    rules = {}
+    for param, t in thresholds.items():
+        if param == 'turbidity':
+            rules[param] = [
+                ('Critical', lambda v, t=t: v >= t['critical']),
+                ('Warning', lambda v, t=t: v >= t['warning']),
+                ('Normal', _always),
+            ]
+        else:
+            rules[param] = [
+                ('Critical', lambda v, t=t: (v <= t['critical_low']) | (v >= t['critical_high'])),
+                ('Warning', lambda v, t=t: (v <= t['warning_low']) | (v >= t['warning_high'])),
+                ('Normal', lambda v, t=t: (v >= t['normal_low']) & (v <= t['normal_high'])),
+            ]
+    return ThresholdClassifier(rules, default='Abnormal', aliases={'phlevel': 'ph'})
+
+BAND_SEVERITY = {'Critical': 'critical', 'Warning': 'warning', 'Normal': 'normal', 'Abnormal': 'warning'}
+
+# (column, alert parameter, label, result column) for each checked reading field
+ALERT_PARAMETERS = [
+    ('temperature', 'temperature', 'Temperature', 'tempResult'),
+    ('oxygen', 'oxygen', 'Oxygen', 'oxygenResult'),
+    ('phlevel', 'ph', 'pH', 'phResult'),
+    ('turbidity', 'turbidity', 'Turbidity', 'turbidityResult'),
+]
+
+def evaluate_alerts(readings):
+    """Return the list of alerts for each reading, classifying every column at once."""
+    results = [[] for _ in readings]
+    if not readings:
+        return results
+
+    for column, alert_type, label, result_column in ALERT_PARAMETERS:
+        values = [getattr(reading, column) for reading in readings]
+        levels = ALERT_LEVELS.classify(column, np.array(values, dtype=float))
+        for i in np.flatnonzero(levels != 'normal'):
+            reading = readings[i]
+            results[i].append({
+                'type': alert_type,
+                'severity': str(levels[i]),
+                'value': values[i],
+                'message': f'{label} is {getattr(reading, result_column)}'
+            })
+    return results
@@ -0,0 +1,124 @@
+# app/utils/tracker.py
+import math
+from collections import Counter, deque, namedtuple
+
+DEAD_CLASS = 1
+
+TrackerUpdate = namedtuple('TrackerUpdate', ['catfish', 'dead_catfish', 'dead_events', 'tracks'])
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union else 0.0
+
+def _centroid(box):
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+class Track:
+    def __init__(self, track_id, detection, history):
+        self.id = track_id
+        self.box = detection[:4]
+        self.conf = detection[4]
+        self.classes = deque([detection[5]], maxlen=history)
+        self.hits = 1
+        self.missed = 0
+        self.dead_streak = 1 if detection[5] == DEAD_CLASS else 0
+        self.dead_reported = False
+
+    @property
+    def cls(self):
+        """Majority class over the recent history, so one flipped frame does not relabel a fish."""
+        return Counter(self.classes).most_common(1)[0][0]
+
+    def update(self, detection):
+        self.box = detection[:4]
+        self.conf = detection[4]
+        self.classes.append(detection[5])
+        self.hits += 1
+        self.missed = 0
+        self.dead_streak = self.dead_streak + 1 if detection[5] == DEAD_CLASS else 0
+
+class DetectionTracker:
+    """Keeps fish identities across frames and debounces dead-fish detections.
+
+    Detections are matched to tracks by IoU, then by centroid distance for
+    fish that moved further than their box overlap. A track counts once it
+    was seen `min_hits` times and is dropped after `max_missed` frames
+    without a match. A dead event fires once per track, when it has been
+    classified dead for `dead_frames` consecutive frames.
+
+    Only freshly inferred detections may advance the tracker. Frames that
+    reuse the previous result (motion gate, scheduler skips) call
+    `current()` instead, so one inference is never counted as several.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_distance=1.0, min_hits=3, max_missed=10,
+                 dead_frames=5, history=10):
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.min_hits = min_hits
+        self.max_missed = max_missed
+        self.dead_frames = dead_frames
+        self.history = history
+        self.tracks = []
+        self.next_id = 1
+
+    def update(self, detections):
+        unmatched_tracks = list(self.tracks)
+        unmatched_detections = list(detections)
+
+        # Greedy IoU matching, best overlaps first
+        pairs = sorted(
+            ((box_iou(track.box, detection), track, detection)
+             for track in unmatched_tracks for detection in unmatched_detections),
+            key=lambda pair: -pair[0]
+        )
+        for overlap, track, detection in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if track in unmatched_tracks and detection in unmatched_detections:
+                track.update(detection)
+                unmatched_tracks.remove(track)
+                unmatched_detections.remove(detection)
+
+        # Centroid fallback, distance relative to the track's box diagonal
+        for track in list(unmatched_tracks):
+            if not unmatched_detections:
+                break
+            cx, cy = _centroid(track.box)
+            diagonal = math.hypot(track.box[2] - track.box[0], track.box[3] - track.box[1]) or 1
+            distance, detection = min(
+                (math.hypot(cx - _centroid(d)[0], cy - _centroid(d)[1]) / diagonal, d)
+                for d in unmatched_detections
+            )
+            if distance <= self.max_distance:
+                track.update(detection)
+                unmatched_tracks.remove(track)
+                unmatched_detections.remove(detection)
+
+        for track in unmatched_tracks:
+            track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for detection in unmatched_detections:
+            self.tracks.append(Track(self.next_id, detection, self.history))
+            self.next_id += 1
+
+        dead_events = []
+        for track in self.tracks:
+            if not track.dead_reported and track.dead_streak >= self.dead_frames:
+                track.dead_reported = True
+                dead_events.append(track)
+
+        return self.current(dead_events)
+
+    def current(self, dead_events=()):
+        """Counts for the tracks as they stand, without advancing them."""
+        confirmed = [track for track in self.tracks if track.hits >= self.min_hits]
+        dead = sum(1 for track in confirmed if track.cls == DEAD_CLASS)
+        return TrackerUpdate(len(confirmed) - dead, dead, list(dead_events), confirmed)
+
+    def reset(self):
+        self.tracks = []
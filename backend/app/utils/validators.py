@@ -1,6 +1,15 @@
 from functools import wraps
 from flask import request, jsonify
-from datetime import datetime
+from datetime import datetime, timezone
+import numpy as np
+
+# Valid range and error message for each sensor field
+SENSOR_RANGES = {
+    'temperature': (0, 50, 'Temperature out of valid range (0-50°C)'),
+    'oxygen': (0, 20, 'Oxygen level out of valid range (0-20 mg/L)'),
+    'phlevel': (0, 14, 'pH level out of valid range (0-14)'),
+    'turbidity': (0, 1000, 'Turbidity out of valid range (0-1000 NTU)'),
+}
 
 class RequestValidator:
     @staticmethod
@@ -8,27 +17,77 @@ class RequestValidator:
         @wraps(f)
         def decorated_function(*args, **kwargs):
             data = request.json
-            required_fields = ['temperature', 'oxygen', 'phlevel', 'turbidity']
-            
+            required_fields = list(SENSOR_RANGES)
+
             if not all(field in data for field in required_fields):
                 return jsonify({
                     'error': 'Missing required fields',
                     'required_fields': required_fields
                 }), 400
-                
+
             # Validate data ranges
-            if not (0 <= data['temperature'] <= 50):
-                return jsonify({'error': 'Temperature out of valid range (0-50°C)'}), 400
-                
-            if not (0 <= data['oxygen'] <= 20):
-                return jsonify({'error': 'Oxygen level out of valid range (0-20 mg/L)'}), 400
-                
-            if not (0 <= data['phlevel'] <= 14):
-                return jsonify({'error': 'pH level out of valid range (0-14)'}), 400
-                
-            if not (0 <= data['turbidity'] <= 1000):
-                return jsonify({'error': 'Turbidity out of valid range (0-1000 NTU)'}), 400
-                
+            for field, (low, high, message) in SENSOR_RANGES.items():
+                if not (low <= data[field] <= high):
+                    return jsonify({'error': message}), 400
+
             return f(*args, **kwargs)
         return decorated_function
 
+    @staticmethod
+    def validate_sensor_batch(readings):
+        """Validate many readings at once.
+
+        Each field is checked as a whole column with NumPy instead of row by
+        row. Returns one list of error messages per reading (empty if valid).
+        """
+        errors = [[] for _ in readings]
+        if not readings:
+            return errors
+
+        for field, (low, high, message) in SENSOR_RANGES.items():
+            raw = [r.get(field) if isinstance(r, dict) else None for r in readings]
+            values = np.array([_to_float(v) for v in raw], dtype=float)
+
+            missing = np.isnan(values)
+            out_of_range = ~missing & ((values < low) | (values > high))
+
+            for i in np.flatnonzero(missing):
+                errors[i].append(f'Missing or non-numeric field: {field}')
+            for i in np.flatnonzero(out_of_range):
+                errors[i].append(message)
+
+        for i, reading in enumerate(readings):
+            if not isinstance(reading, dict):
+                errors[i] = ['Reading must be a JSON object']
+            else:
+                try:
+                    parse_time_data(reading.get('timeData'))
+                except ValueError:
+                    errors[i].append('Invalid timeData, use ISO 8601')
+
+        return errors
+
+def parse_time_data(value):
+    """Parse an ISO 8601 timeData into the naive UTC datetime stored in aquamans.
+
+    Returns None when the field is absent (None or empty), meaning "use the
+    server time". Offsets are converted to UTC; naive values are taken as UTC.
+    Raises ValueError for anything else.
+    """
+    if value is None or value == '':
+        return None
+    text = str(value)
+    if text.endswith(('Z', 'z')):
+        text = text[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _to_float(value):
+    if isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,50 @@
+"""Move old aquamans readings into the Parquet archive now.
+
+Usage: python archive_readings.py [--days 30 | --before YYYY-MM-DD] [--config production]
+
+Runs the same pass as the ARCHIVE_AFTER_DAYS background job. Whole days
+before the cutoff are written under ARCHIVE_DIR and deleted from MySQL;
+readings referenced by alerts stay in MySQL. Safe to re-run; exits without
+archiving while the app's tiering pass is running.
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from app import create_app
+from app.config import config
+from app.extensions import db
+from app.models import aquamans
+from app.services.archive_service import archive
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default='development', choices=sorted(config))
+    cutoff = parser.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument('--days', type=int, help='archive days older than this, counted from the newest reading')
+    cutoff.add_argument('--before', help='archive days before this date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    app = create_app(args.config, start_background=False)
+    with app.app_context():
+        if args.before:
+            before = datetime.strptime(args.before, '%Y-%m-%d')
+        else:
+            newest = db.session.query(db.func.max(aquamans.timeData)).scalar()
+            if newest is None:
+                logging.info("No readings, nothing to archive")
+                return
+            before = newest - timedelta(days=args.days)
+
+        if not archive.lock.held():
+            logging.error("Another process is archiving readings; try again once it finishes")
+            return
+        try:
+            archived = archive.tier(before)
+        finally:
+            archive.lock.release()
+        logging.info(f"Archive complete, {archived} readings moved; archive covers up to {archive.horizon}")
+
+if __name__ == '__main__':
+    main()
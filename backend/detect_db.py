@@ -1,15 +1,19 @@
 import cv2
-import requests
 import base64
 from io import BytesIO
 from PIL import Image
-from ultralytics import YOLO
 from datetime import datetime, timedelta
 import mysql.connector
 import time
 import logging
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry 
+from app.config import config
+from app.utils.image_store import store_image
+from app.utils.db_pool import ConnectionPool
+from app.services.detection_scheduler import DetectionScheduler, sources_from_config
+from app.services.model_registry import model_registry
+from app.utils.detections import draw_detections
+from app.utils.tracker import DetectionTracker
+from app.utils.detection_reporter import DetectionReporter
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +27,7 @@ logging.basicConfig(
 
 # API and Database Configuration
 FLASK_API_URL = "http://127.0.0.1:5000/update_detection"
+COUNT_HEARTBEAT = 5  # seconds between resends of unchanged counts
 db_config = {
     'host': 'localhost',
     'user': 'root',
@@ -30,145 +35,154 @@ db_config = {
     'database': 'dbserial'
 }
 
-# Configure requests with retry strategy
-session = requests.Session()
-retry_strategy = Retry(
-    total=3,
-    backoff_factor=1,
-    status_forcelist=[429, 500, 502, 503, 504],
-)
-adapter = HTTPAdapter(max_retries=retry_strategy)
-session.mount("http://", adapter)
-session.mount("https://", adapter)
-
-# Load YOLO model
-model = YOLO("C:/Users/ADMIN/AquaAutoManS/machine_learning/weights/best1.pt")
-class_names = ["catfish", "dead_catfish"]
-
-# Initialize video capture
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    logging.error("Error: Could not open webcam.")
-    exit()
-
-# Initialize detection variables
-dead_catfish_detected = False
-last_capture_time = None
+# Reused connections instead of a new connect() per query
+db_pool = ConnectionPool(db_config, pool_name='detect', pool_size=2)
+
+# Counts are posted from a background thread so API hiccups never stall the loop
+reporter = DetectionReporter(FLASK_API_URL)
 
-def get_db_connection():
-    """Establish database connection with retry mechanism"""
-    max_retries = 3
-    retry_delay = 1  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            connection = mysql.connector.connect(**db_config)
-            return connection
-        except mysql.connector.Error as e:
-            logging.error(f"Database connection attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Exponential backoff
-            else:
-                logging.error("All database connection attempts failed")
-                return None
+# Cameras, motion gates and batch size come from the app config
+app_config = config['default']
+settings = {key: getattr(app_config, key) for key in dir(app_config) if key.isupper()}
+
+# Shared model (or inference server client); loaded on the first frame.
+# DETECTION_MODEL_FORMAT and INFERENCE_SERVER_ADDRESS apply here too
+model_registry.configure(settings)
+model = model_registry.get()
+
+# Per source: fish identities across frames (a dead event needs 5 consecutive
+# dead frames), last counts sent, pending snapshots and the newest annotated frame
+trackers = {}
+last_sent_counts = {}
+last_capture_time = None
+latest_counts = {}
+dead_event_pending = set()
+latest_frames = {}
 
 def get_latest_sensor_data():
     """Retrieve the latest sensor data from database"""
+    query = (
+        "SELECT id, temperature, tempResult, oxygen, oxygenResult, phlevel, phResult, "
+        "turbidity, turbidityResult, catfish, dead_catfish, timeData, image_id "
+        "FROM aquamans ORDER BY timeData DESC, id DESC LIMIT 1"
+    )
     try:
-        connection = get_db_connection()
-        if connection is None:
-            return None
-        
-        cursor = connection.cursor(dictionary=True)
-        query = "SELECT * FROM aquamans ORDER BY id DESC LIMIT 1"
-        cursor.execute(query)
-        latest_record = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        return latest_record
+        with db_pool.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(query)
+            latest_record = cursor.fetchone()
+            cursor.close()
+            return latest_record
     except mysql.connector.Error as e:
         logging.error(f"Error fetching latest sensor data: {e}")
         return None
 
 def insert_data_to_db(data):
-    """Insert new data into database"""
+    """Insert new data into database; the last item is the JPEG snapshot (or None)"""
+    query = """
+    INSERT INTO aquamans (
+        temperature, tempResult, oxygen, oxygenResult, 
+        phlevel, phResult, turbidity, turbidityResult, 
+        catfish, dead_catfish, timeData, image_id
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    *reading, image_bytes = data
     try:
-        connection = get_db_connection()
-        if connection is None:
-            return
-        
-        cursor = connection.cursor()
-        query = """
-        INSERT INTO aquamans (
-            temperature, tempResult, oxygen, oxygenResult, 
-            phlevel, phResult, turbidity, turbidityResult, 
-            catfish, dead_catfish, timeData, dead_catfish_image
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        cursor.execute(query, data)
-        connection.commit()
-        cursor.close()
-        connection.close()
+        with db_pool.connection() as connection:
+            cursor = connection.cursor()
+            image_id = store_image(cursor, image_bytes) if image_bytes else None
+            cursor.execute(query, (*reading, image_id))
+            connection.commit()
+            cursor.close()
         logging.info("Successfully inserted data into database")
     except mysql.connector.Error as e:
         logging.error(f"Error uploading data to MySQL: {e}")
 
-def send_detection_data(catfish_count, dead_catfish_count):
-    """Send detection data to Flask API"""
-    data = {
-        'catfish': catfish_count,
-        'dead_catfish': dead_catfish_count
-    }
-    try:
-        response = session.post(
-            FLASK_API_URL,
-            json=data,
-            headers={'Content-Type': 'application/json'},
-            timeout=5  # 5 seconds timeout
-        )
-        response.raise_for_status()
-        logging.info(f"Data sent successfully: {response.json()}")
-        return True
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error sending data to Flask API: {e}")
-        return False
-
-def process_frame(frame):
-    """Process a single frame for detection"""
-    results = model.predict(frame, conf=0.25, iou=0.5)
-    catfish_count = 0
-    dead_catfish_count = 0
-    
-    for result in results:
-        for box in result.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-            conf = box.conf[0]
-            cls = int(box.cls[0])
-            
-            # Filter out small detections
-            if (x2 - x1) < 20 or (y2 - y1) < 20:
-                continue
-            
-            label = f"{class_names[cls]} {conf:.2f}"
-            color = (0, 255, 0) if cls == 0 else (0, 0, 255)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame, label, (x1, y1 - 10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-
-            if cls == 0:
-                catfish_count += 1
-            elif cls == 1:
-                dead_catfish_count += 1
-    
-    return frame, catfish_count, dead_catfish_count
+def send_detection_data(catfish_count, dead_catfish_count, camera='camera0'):
+    """Queue detection data for the Flask API; returns immediately"""
+    return reporter.report(catfish_count, dead_catfish_count, camera)
+
+def process_result(source, frame, detections, fresh):
+    """Draw and track one source's detections"""
+    draw_detections(frame, detections)
+    tracker = trackers.setdefault(source.name, DetectionTracker(dead_frames=5))
+    # Reused detections must not count as more consecutive dead frames
+    tracked = tracker.update(detections) if fresh else tracker.current()
+    return frame, tracked.catfish, tracked.dead_catfish, tracked.dead_events
+
+def handle_result(source, frame, detections, fresh):
+    """Report counts and snapshot dead fish for one frame of one source"""
+    global last_capture_time
+    frame, catfish_count, dead_catfish_count, dead_events = process_result(source, frame, detections, fresh)
+
+    # Send detection data when the smoothed counts change, and resend them every
+    # COUNT_HEARTBEAT seconds so the newest sensor row carries them too
+    counts = (catfish_count, dead_catfish_count)
+    latest_counts[source.name] = counts
+    sent_counts, sent_at = last_sent_counts.get(source.name, (None, 0))
+    if counts != sent_counts or time.monotonic() - sent_at >= COUNT_HEARTBEAT:
+        last_sent_counts[source.name] = (counts, time.monotonic())
+        if send_detection_data(catfish_count, dead_catfish_count, source.name):
+            logging.info(f"Detection data queued from {source.name} - Catfish: {catfish_count}, Dead: {dead_catfish_count}")
+
+    # Snapshot once per confirmed dead fish. At most one row every 20 seconds for
+    # the whole tank, carrying every camera's counts, so readings are not duplicated
+    if dead_events:
+        dead_event_pending.add(source.name)
+        logging.info(f"Dead catfish confirmed on {source.name}: tracks {[track.id for track in dead_events]}")
+
+    if source.name in dead_event_pending:
+        current_time = datetime.now()
+
+        if last_capture_time is None or \
+           (current_time - last_capture_time).total_seconds() >= 20:
+            try:
+                last_capture_time = current_time
+                dead_event_pending.discard(source.name)
+
+                # Convert frame to JPEG
+                pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                img_byte_arr = BytesIO()
+                pil_image.save(img_byte_arr, format='JPEG')
+                img_byte_arr = img_byte_arr.getvalue()
+
+                # Get and update sensor data
+                latest_data = get_latest_sensor_data()
+                if latest_data:
+                    data_to_insert = (
+                        latest_data["temperature"],
+                        latest_data["tempResult"],
+                        latest_data["oxygen"],
+                        latest_data["oxygenResult"],
+                        latest_data["phlevel"],
+                        latest_data["phResult"],
+                        latest_data["turbidity"],
+                        latest_data["turbidityResult"],
+                        sum(counts[0] for counts in latest_counts.values()),
+                        sum(counts[1] for counts in latest_counts.values()),
+                        current_time,
+                        img_byte_arr
+                    )
+                    insert_data_to_db(data_to_insert)
+                    logging.info("Database updated with new detection data")
+            except Exception as e:
+                logging.error(f"Error handling dead catfish detection: {e}")
+
+    latest_frames[source.name] = frame
 
 def main():
     logging.info("Starting detection system...")
     print("Press 'q' to exit the detection.")
-    
+
+    # Frames of every configured camera share batched predict calls
+    scheduler = DetectionScheduler(
+        model,
+        sources_from_config(settings),
+        handle_result,
+        max_batch=settings.get('DETECTION_BATCH_SIZE', 8)
+    )
+    scheduler.start()
     start_time = datetime.now()
-    global dead_catfish_detected, last_capture_time
 
     try:
         while True:
@@ -179,62 +193,12 @@ def main():
                 time.sleep(300)
                 start_time = datetime.now()
 
-            # Capture frame
-            ret, frame = cap.read()
-            if not ret:
-                logging.error("Error: Failed to capture frame.")
-                break
+            scheduler.step()
 
-            # Process frame
-            frame, catfish_count, dead_catfish_count = process_frame(frame)
-
-            # Send detection data to API
-            if catfish_count > 0 or dead_catfish_count > 0:
-                if send_detection_data(catfish_count, dead_catfish_count):
-                    logging.info(f"Detection data sent - Catfish: {catfish_count}, Dead: {dead_catfish_count}")
-                else:
-                    logging.warning("Failed to send detection data")
-
-            # Handle dead catfish detection
-            if dead_catfish_count > 0:
-                dead_catfish_detected = True
-                current_time = datetime.now()
-                
-                if last_capture_time is None or \
-                   (current_time - last_capture_time).total_seconds() >= 20:
-                    try:
-                        last_capture_time = current_time
-                        
-                        # Convert frame to JPEG
-                        pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-                        img_byte_arr = BytesIO()
-                        pil_image.save(img_byte_arr, format='JPEG')
-                        img_byte_arr = img_byte_arr.getvalue()
-
-                        # Get and update sensor data
-                        latest_data = get_latest_sensor_data()
-                        if latest_data:
-                            data_to_insert = (
-                                latest_data["temperature"],
-                                latest_data["tempResult"],
-                                latest_data["oxygen"],
-                                latest_data["oxygenResult"],
-                                latest_data["phlevel"],
-                                latest_data["phResult"],
-                                latest_data["turbidity"],
-                                latest_data["turbidityResult"],
-                                catfish_count,
-                                dead_catfish_count,
-                                current_time,
-                                img_byte_arr
-                            )
-                            insert_data_to_db(data_to_insert)
-                            logging.info("Database updated with new detection data")
-                    except Exception as e:
-                        logging.error(f"Error handling dead catfish detection: {e}")
-
-            # Display frame
-            cv2.imshow("YOLOv8 Real-Time Detection", frame)
+            # Display the newest annotated frame of each camera
+            while latest_frames:
+                name, frame = latest_frames.popitem()
+                cv2.imshow(f"YOLOv8 Real-Time Detection - {name}", frame)
 
             # Check for exit command
             if cv2.waitKey(1) & 0xFF == ord('q'):
@@ -244,7 +208,7 @@ def main():
         logging.error(f"An unexpected error occurred: {e}")
 
     finally:
-        cap.release()
+        scheduler.stop()
         cv2.destroyAllWindows()
         logging.info("Resources released. Program terminated.")
 
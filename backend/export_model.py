@@ -0,0 +1,68 @@
+"""Export the catfish detector to ONNX and check it against the PyTorch model.
+
+Usage: python export_model.py [--weights PATH] [--int8] [--frames DIR|VIDEO|CAMERA]
+                              [--count 50] [--min-match 0.95]
+
+Frames come from a directory of images, a video file or a camera index and
+are also used to calibrate INT8 quantization. Exits non-zero when the
+exported model matches fewer than --min-match of the PyTorch boxes.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import cv2
+from app.services.model_registry import DEFAULT_MODELS, LocalModel
+from app.services.onnx_detector import OnnxModel, export_onnx, parity_check
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def load_frames(source, count):
+    if os.path.isdir(source):
+        paths = sorted(glob.glob(os.path.join(source, '*.jpg')) + glob.glob(os.path.join(source, '*.png')))
+        return [cv2.imread(path) for path in paths[:count]]
+
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--weights', default=DEFAULT_MODELS['catfish'])
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--int8', action='store_true')
+    parser.add_argument('--frames', default='0')
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--min-match', type=float, default=0.95)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.count)
+    if not frames:
+        logging.error(f"No frames could be read from {args.frames}")
+        sys.exit(2)
+
+    path = export_onnx(args.weights, args.imgsz, args.int8, calibration_frames=frames if args.int8 else None)
+    logging.info(f"Exported {path}")
+
+    report = parity_check(
+        LocalModel(args.weights),
+        OnnxModel(args.weights, int8=args.int8, imgsz=args.imgsz, intra_op_threads=args.threads),
+        frames
+    )
+    print(json.dumps(report, indent=2))
+
+    if report['match_rate'] < args.min_match:
+        logging.error(f"Parity check failed: match rate {report['match_rate']} < {args.min_match}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Keep the catfish detector loaded once and serve every Flask worker.
+
+Usage: python inference_server.py [--config production]
+
+Set INFERENCE_SERVER_ADDRESS in the app config to the same address so
+model_registry.get() returns a client instead of loading YOLO in-process.
+Server and clients must share a secret in AQUAMANS_INFERENCE_AUTHKEY: the
+connection unpickles what it receives, so the server will not start
+without one.
+Requests are ('detect', model_name, frames, conf, iou); replies are
+('ok', detections_per_frame) or ('error', message).
+"""
+import argparse
+import logging
+import threading
+from multiprocessing.connection import Listener
+from app.config import config
+from app.services.model_registry import model_registry
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def serve_client(connection):
+    try:
+        while True:
+            try:
+                command, name, frames, conf, iou = connection.recv()
+            except EOFError:
+                break
+            try:
+                if command != 'detect':
+                    raise ValueError(f"Unknown command {command}")
+                connection.send(('ok', model_registry.local(name).detect(frames, conf, iou)))
+            except Exception as e:
+                logging.error(f"Inference request failed: {e}")
+                connection.send(('error', str(e)))
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', default='development', choices=sorted(config))
+    args = parser.parse_args()
+
+    app_config = config[args.config]
+    if not app_config.INFERENCE_SERVER_AUTHKEY:
+        parser.error("set AQUAMANS_INFERENCE_AUTHKEY to a random secret shared with the app")
+    model_registry.configure({key: getattr(app_config, key) for key in dir(app_config) if key.isupper()})
+    address = tuple(app_config.INFERENCE_SERVER_ADDRESS or ('127.0.0.1', 6001))
+
+    # Load before accepting connections so the first request is not slow
+    model_registry.local().load()
+
+    with Listener(address, authkey=app_config.INFERENCE_SERVER_AUTHKEY) as listener:
+        logging.info(f"Inference server listening on {address[0]}:{address[1]}")
+        while True:
+            connection = listener.accept()
+            threading.Thread(target=serve_client, args=(connection,), daemon=True).start()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Move dead catfish snapshots out of aquamans into the catfish_image store.
+
+Usage: python migrate_images.py [--batch-size 200] [--drop-column]
+
+Safe to re-run: rows already migrated are skipped, and identical images are
+stored once. --drop-column removes aquamans.dead_catfish_image once it is
+empty, which shrinks the table after OPTIMIZE TABLE.
+"""
+import argparse
+import logging
+from sqlalchemy import inspect, text
+from app import create_app
+from app.extensions import db
+from app.utils.image_store import store_image
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def ensure_schema():
+    # Creates catfish_image; existing tables are left alone by create_all
+    db.create_all()
+
+    columns = {column['name'] for column in inspect(db.engine).get_columns('aquamans')}
+    if 'image_id' not in columns:
+        logging.info("Adding aquamans.image_id")
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "ALTER TABLE aquamans "
+                "ADD COLUMN image_id INT NULL, "
+                "ADD INDEX ix_aquamans_image_id (image_id), "
+                "ADD CONSTRAINT fk_aquamans_image FOREIGN KEY (image_id) REFERENCES catfish_image (id)"
+            ))
+    return columns
+
+def migrate_images(batch_size):
+    moved = 0
+    connection = db.engine.raw_connection()
+    try:
+        while True:
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT id, dead_catfish_image FROM aquamans "
+                "WHERE dead_catfish_image IS NOT NULL ORDER BY id LIMIT %s",
+                (batch_size,)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            for reading_id, image_bytes in rows:
+                image_id = store_image(cursor, image_bytes) if image_bytes else None
+                cursor.execute(
+                    "UPDATE aquamans SET image_id = %s, dead_catfish_image = NULL WHERE id = %s",
+                    (image_id, reading_id)
+                )
+            connection.commit()
+            cursor.close()
+
+            moved += len(rows)
+            logging.info(f"Moved {moved} images")
+    finally:
+        connection.close()
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--drop-column', action='store_true')
+    args = parser.parse_args()
+
+    app = create_app('development', start_background=False)
+    with app.app_context():
+        columns = ensure_schema()
+        if 'dead_catfish_image' not in columns:
+            logging.info("aquamans.dead_catfish_image already removed, nothing to migrate")
+            return
+
+        moved = migrate_images(args.batch_size)
+        logging.info(f"Migration complete, {moved} images moved")
+
+        if args.drop_column:
+            with db.engine.begin() as connection:
+                connection.execute(text("ALTER TABLE aquamans DROP COLUMN dead_catfish_image"))
+            logging.info("Dropped aquamans.dead_catfish_image")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import time
+from datetime import datetime
+
+
+class SensorFusion:
+    """Joins partial readings from several serial streams into one row.
+
+    Each stream contributes some of the columns of an `aquamans` row. A reading
+    is merged into the oldest pending sample that is still missing that stream
+    and started less than `window` seconds earlier; once every stream has
+    reported, the complete row is handed to `emit` as a single insert.
+
+    Samples that time out are still emitted if they contain the `primary`
+    stream (counted as partial) and dropped otherwise.
+    """
+
+    def __init__(self, emit, streams=('water', 'oxygen'), primary='water', window=2.0):
+        self.emit = emit
+        self.streams = tuple(streams)
+        self.primary = primary
+        self.window = window
+        self.pending = []
+        self.stats = {
+            'fused': 0,
+            'partial': 0,
+            'dropped': 0,
+            'pending': 0,
+            'lag_last_ms': 0.0,
+            'lag_max_ms': 0.0,
+            'lag_avg_ms': 0.0
+        }
+
+    def push(self, stream, **fields):
+        """Add one stream's reading and emit the sample if it is now complete."""
+        now = time.monotonic()
+        self.expire(now)
+
+        sample = next(
+            (s for s in self.pending if stream not in s['sources']),
+            None
+        )
+        if sample is None:
+            sample = {
+                'started': now,
+                'timeData': datetime.utcnow(),
+                'sources': set(),
+                'fields': {}
+            }
+            self.pending.append(sample)
+
+        sample['sources'].add(stream)
+        sample['fields'].update(fields)
+
+        if len(sample['sources']) == len(self.streams):
+            self.pending.remove(sample)
+            self._emit(sample, now)
+            self.stats['fused'] += 1
+
+        self.stats['pending'] = len(self.pending)
+
+    def expire(self, now=None, force=False):
+        """Flush samples whose window has closed without all streams reporting."""
+        now = time.monotonic() if now is None else now
+        while self.pending and (force or now - self.pending[0]['started'] >= self.window):
+            sample = self.pending.pop(0)
+            if self.primary in sample['sources']:
+                self._emit(sample, now)
+                self.stats['partial'] += 1
+            else:
+                self.stats['dropped'] += 1
+        self.stats['pending'] = len(self.pending)
+
+    def drain(self):
+        """Emit everything still pending, e.g. on shutdown."""
+        self.expire(force=True)
+
+    def _emit(self, sample, now):
+        lag_ms = (now - sample['started']) * 1000
+        emitted = self.stats['fused'] + self.stats['partial']
+        self.stats['lag_last_ms'] = round(lag_ms, 1)
+        self.stats['lag_max_ms'] = round(max(self.stats['lag_max_ms'], lag_ms), 1)
+        self.stats['lag_avg_ms'] = round(
+            (self.stats['lag_avg_ms'] * emitted + lag_ms) / (emitted + 1), 1
+        )
+        self.emit(timeData=sample['timeData'], **sample['fields'])
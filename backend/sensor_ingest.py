@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+READING_COLUMNS = [
+    'temperature', 'tempResult', 'oxygen', 'oxygenResult',
+    'phlevel', 'phResult', 'turbidity', 'turbidityResult', 'timeData'
+]
+
+
+class BufferedIngestWriter:
+    """Groups parsed sensor readings into multi-row inserts.
+
+    Rows are flushed with a single executemany + commit once the buffer holds
+    `batch_size` rows or the oldest row is `max_age` seconds old. When MySQL is
+    unreachable the batch is appended to a bounded JSONL spool on disk and
+    replayed ahead of the next successful flush. Replay renames the spool to
+    `<spool>.replaying` and deletes it only once every row is committed, so a
+    crash mid-replay re-inserts rather than loses readings. Lines that no
+    longer parse are moved to `<spool>.bad`.
+
+    With `auto_flush=False` the caller owns flushing (see `due()`), which lets
+    an event loop run the blocking flush in a worker thread.
+
+    `db_error` is the base exception of the driver behind `connect`;
+    MySQLdb.Error unless given. `on_flush(rows)` runs after each committed
+    batch, e.g. to refresh the shared current state; its errors are logged.
+    """
+
+    def __init__(self, connect, batch_size=50, max_age=5.0,
+                 spool_path='logs/sensor_spool.jsonl', spool_max_rows=100000,
+                 auto_flush=True, db_error=None, on_flush=None):
+        if db_error is None:
+            import MySQLdb
+            db_error = MySQLdb.Error
+        self.connect = connect
+        self.db_error = db_error
+        self.on_flush = on_flush
+        self.auto_flush = auto_flush
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.spool_path = spool_path
+        self.replay_path = spool_path + '.replaying'
+        self.bad_path = spool_path + '.bad'
+        self.spool_max_rows = spool_max_rows
+        self.spool_rows = None
+
+        self.buffer = []
+        self.oldest = None
+        self.conn = None
+        self.stats = {
+            'buffered': 0,
+            'inserted': 0,
+            'flushes': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'dropped': 0,
+            'quarantined': 0,
+            'notify_errors': 0
+        }
+
+        spool_dir = os.path.dirname(spool_path)
+        if spool_dir and not os.path.exists(spool_dir):
+            os.makedirs(spool_dir)
+
+    def open(self):
+        """Connect eagerly so a bad DSN fails at startup rather than on the first flush."""
+        return self._connection()
+
+    def add(self, **reading):
+        """Queue one reading; flushes if a size or age threshold is hit."""
+        row = {column: reading.get(column) for column in READING_COLUMNS}
+        if row['timeData'] is None:
+            row['timeData'] = datetime.utcnow()
+
+        if not self.buffer:
+            self.oldest = time.monotonic()
+        self.buffer.append(row)
+        self.stats['buffered'] += 1
+
+        if self.auto_flush and len(self.buffer) >= self.batch_size:
+            self.flush()
+        return row
+
+    def due(self):
+        if not self.buffer:
+            return False
+        return (len(self.buffer) >= self.batch_size
+                or time.monotonic() - self.oldest >= self.max_age)
+
+    def flush_if_due(self):
+        if self.due():
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        batch = self.buffer
+        self.buffer = []
+        self.oldest = None
+
+        try:
+            self._replay_spool()
+            self._insert(batch)
+        except self.db_error as err:
+            logging.error(f"Database unavailable, spooling {len(batch)} readings: {err}")
+            self._close()
+            self._spool(batch)
+        except Exception as err:
+            # Anything else must not take the ingest loop down with the batch
+            logging.exception(f"Unexpected error flushing readings, spooling {len(batch)}: {err}")
+            self._spool(batch)
+        else:
+            self._notify(batch)
+
+    def _notify(self, rows):
+        if self.on_flush is None:
+            return
+        try:
+            self.on_flush(rows)
+        except Exception as err:
+            self.stats['notify_errors'] += 1
+            logging.error(f"Error notifying after flush: {err}")
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._close()
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = self.connect()
+        return self.conn
+
+    def _close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except self.db_error:
+                pass
+            self.conn = None
+
+    def _insert(self, rows):
+        conn = self._connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(
+                f"INSERT INTO aquamans ({', '.join(READING_COLUMNS)}) "
+                f"VALUES ({', '.join(['%s'] * len(READING_COLUMNS))})",
+                [tuple(row[column] for column in READING_COLUMNS) for row in rows]
+            )
+            conn.commit()
+        except self.db_error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        self.stats['inserted'] += len(rows)
+        self.stats['flushes'] += 1
+
+    def _spool(self, rows):
+        with open(self.spool_path, 'a', encoding='utf-8') as spool:
+            for row in rows:
+                record = dict(row, timeData=row['timeData'].isoformat())
+                spool.write(json.dumps(record, default=str) + '\n')
+        self.stats['spooled'] += len(rows)
+        if self.spool_rows is None:
+            self.spool_rows = self._count_lines(self.spool_path)
+        else:
+            self.spool_rows += len(rows)
+        if self.spool_rows > self.spool_max_rows:
+            self._trim_spool()
+
+    def _count_lines(self, path):
+        with open(path, encoding='utf-8') as spool:
+            return sum(1 for _ in spool)
+
+    def _trim_spool(self):
+        with open(self.spool_path, encoding='utf-8') as spool:
+            lines = spool.readlines()
+        overflow = len(lines) - self.spool_max_rows
+        self.spool_rows = len(lines)
+        if overflow <= 0:
+            return
+        # Keep the newest readings; the oldest are the least useful after an outage
+        with open(self.spool_path, 'w', encoding='utf-8') as spool:
+            spool.writelines(lines[overflow:])
+        self.spool_rows = self.spool_max_rows
+        self.stats['dropped'] += overflow
+        logging.warning(f"Sensor spool full, dropped {overflow} oldest readings")
+
+    def _read_spool(self, path):
+        rows = []
+        with open(path, encoding='utf-8') as spool:
+            for line in spool:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    record['timeData'] = datetime.fromisoformat(record['timeData'])
+                except (ValueError, KeyError, TypeError) as err:
+                    self._quarantine(line, err)
+                    continue
+                rows.append({column: record.get(column) for column in READING_COLUMNS})
+        return rows
+
+    def _quarantine(self, line, err):
+        with open(self.bad_path, 'a', encoding='utf-8') as bad:
+            bad.write(line if line.endswith('\n') else line + '\n')
+        self.stats['quarantined'] += 1
+        logging.warning(f"Moved unreadable spool line to {self.bad_path}: {err}")
+
+    def _rewrite_replay(self, rows):
+        partial = self.replay_path + '.part'
+        with open(partial, 'w', encoding='utf-8') as spool:
+            for row in rows:
+                spool.write(json.dumps(dict(row, timeData=row['timeData'].isoformat()), default=str) + '\n')
+        os.replace(partial, self.replay_path)
+
+    def _replay_spool(self):
+        # A leftover .replaying file is from an interrupted replay and goes first
+        if not os.path.exists(self.replay_path):
+            if not os.path.exists(self.spool_path):
+                return
+            os.replace(self.spool_path, self.replay_path)
+            self.spool_rows = 0
+
+        rows = self._read_spool(self.replay_path)
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            try:
+                self._insert(chunk)
+            except Exception:
+                # Keep only what has not been written yet for the next attempt
+                self._rewrite_replay(rows[start:])
+                raise
+            self.stats['replayed'] += len(chunk)
+
+        os.remove(self.replay_path)
+        if rows:
+            logging.info(f"Replayed {len(rows)} spooled readings")
+        # Readings spooled while this replay was pending
+        if os.path.exists(self.spool_path):
+            self._replay_spool()
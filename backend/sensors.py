@@ -1,11 +1,33 @@
 import serial
 import MySQLdb
-import time
+import os
 import sys
+from sensor_ingest import BufferedIngestWriter
+from app import create_app
+from app.services.current_state import refresh_after_flush
+
+# Readings are grouped into one INSERT per batch instead of one commit per line
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 5  # seconds
+SPOOL_PATH = 'logs/sensor_spool.jsonl'
+SPOOL_MAX_ROWS = 100000
+
+# Same config as the web app, so flushed readings reach its shared cache
+app = create_app(os.environ.get('AQUAMANS_CONFIG', 'development'), start_background=False)
+
+def connect_db():
+    return MySQLdb.connect(host="localhost", user="root", passwd="", db="dbserial")
 
 try:
-    dbConn = MySQLdb.connect(host="localhost", user="root", passwd="", db="dbserial")
-    cursor = dbConn.cursor()
+    writer = BufferedIngestWriter(
+        connect_db,
+        batch_size=BATCH_SIZE,
+        max_age=FLUSH_INTERVAL,
+        spool_path=SPOOL_PATH,
+        spool_max_rows=SPOOL_MAX_ROWS,
+        on_flush=refresh_after_flush(app)
+    )
+    writer.open()
 except MySQLdb.Error as err:
     print(f"Could not connect to database: {err}")
     sys.exit(1)
@@ -14,7 +36,8 @@ device = 'COM13'
 
 try:
     print("Trying...", device)
-    arduino = serial.Serial(device, 115200)
+    # The read timeout paces the loop so age-based flushes still happen when the board goes quiet
+    arduino = serial.Serial(device, 115200, timeout=1)
 except serial.SerialException as e:
     print(f"Failed to connect on {device}: {e}")
     sys.exit(1)
@@ -22,31 +45,32 @@ except serial.SerialException as e:
 try:
     while True:
         try:
-            time.sleep(1) 
             data = arduino.readline().decode('utf-8').strip()
-            print(f"Received data: {data}")
 
-            pieces = data.split()
+            if data:
+                print(f"Received data: {data}")
+                pieces = data.split()
+
+                if len(pieces) == 8:  
+                    writer.add(
+                        temperature=pieces[0], tempResult=pieces[1],
+                        oxygen=pieces[2], oxygenResult=pieces[3],
+                        phlevel=pieces[4], phResult=pieces[5],
+                        turbidity=pieces[6], turbidityResult=pieces[7]
+                    )
+                else:
+                    print("Unexpected data format")
 
-            if len(pieces) == 8:  
-                try:
-                    cursor.execute("INSERT INTO aquamans (temperature, tempResult, oxygen, oxygenResult, phlevel, phResult, turbidity, turbidityResult) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", 
-                                   (pieces[0], pieces[1], pieces[2], pieces[3], pieces[4], pieces[5], pieces[6], pieces[7]))
-                    dbConn.commit()
-                except MySQLdb.IntegrityError as err:
-                    print(f"Failed to insert data: {err}")
-            else:
-                print("Unexpected data format")
+            writer.flush_if_due()
 
         except serial.SerialException as e:
             print(f"Error reading from serial port: {e}")
-        except MySQLdb.Error as err:
-            print(f"Database error: {err}")
+        except UnicodeDecodeError as e:
+            print(f"Discarding malformed line: {e}")
 
 except KeyboardInterrupt:
     print("Terminating...")
 
 finally:
-    cursor.close()
-    dbConn.close()
-    arduino.close()
\ No newline at end of file
+    writer.close()
+    arduino.close()
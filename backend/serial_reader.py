@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+
+class SerialPortReader:
+    """Reads and parses one serial port.
+
+    Each line is split on whitespace and mapped onto `fields`; lines with the
+    wrong number of values are discarded. Parsed readings are handed to
+    `enqueue(stream, fields)`.
+    """
+
+    def __init__(self, device, baudrate, stream, fields, timeout=0.5):
+        self.device = device
+        self.baudrate = baudrate
+        self.stream = stream
+        self.fields = tuple(fields)
+        self.timeout = timeout
+        self.port = None
+        self.stats = {'lines': 0, 'parsed': 0, 'malformed': 0, 'errors': 0}
+
+    def open(self):
+        print(f"Trying {self.stream} on {self.device}...")
+        self.port = serial.Serial(self.device, self.baudrate, timeout=self.timeout)
+
+    def close(self):
+        if self.port is not None:
+            self.port.close()
+
+    def parse(self, line):
+        pieces = line.split()
+        if len(pieces) != len(self.fields):
+            self.stats['malformed'] += 1
+            return None
+        return dict(zip(self.fields, pieces))
+
+    async def run(self, enqueue, executor=None):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # pyserial has no native async API; the blocking read runs off the event loop
+                raw = await loop.run_in_executor(executor, self.port.readline)
+            except serial.SerialException as e:
+                self.stats['errors'] += 1
+                logging.error(f"Error reading from {self.device}: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if not raw:
+                continue
+            self.stats['lines'] += 1
+
+            try:
+                line = raw.decode('utf-8').strip()
+            except UnicodeDecodeError:
+                self.stats['malformed'] += 1
+                continue
+
+            reading = self.parse(line)
+            if reading is None:
+                continue
+            self.stats['parsed'] += 1
+            enqueue(self.stream, reading)
+
+
+class SerialIngest:
+    """Services any number of serial ports concurrently.
+
+    Every port runs its own read/parse coroutine, so a slow or silent board no
+    longer stalls the others. All readers feed one bounded queue consumed by a
+    single writer coroutine that hands readings to `fusion` and keeps `writer`
+    flushed.
+
+    Blocking readline calls get a thread per port, so the default pool size
+    never caps how many ports are read at once. Flushes run on their own
+    single thread; `run()` waits for the last one before returning, so the
+    caller can close `writer` without sharing its connection with a flush.
+    """
+
+    def __init__(self, readers, fusion, writer, queue_size=1000, stats_interval=60):
+        self.readers = readers
+        self.fusion = fusion
+        self.writer = writer
+        self.stats_interval = stats_interval
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.queue_dropped = 0
+        self.flush_executor = None
+
+    def enqueue(self, stream, reading):
+        """Never blocks a reader; drops the oldest reading when the queue is full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.queue_dropped += 1
+        self.queue.put_nowait((stream, reading))
+
+    def stats(self):
+        return {
+            'ports': {reader.device: reader.stats for reader in self.readers},
+            'queue_dropped': self.queue_dropped,
+            'fusion': self.fusion.stats,
+            'ingest': self.writer.stats
+        }
+
+    async def _consume(self):
+        last_stats = time.monotonic()
+        while True:
+            try:
+                stream, reading = await asyncio.wait_for(self.queue.get(), timeout=0.5)
+                self.fusion.push(stream, **reading)
+            except asyncio.TimeoutError:
+                pass
+
+            self.fusion.expire()
+            if self.writer.due():
+                # executemany + commit blocks, keep it off the loop the readers share
+                await asyncio.wrap_future(self.flush_executor.submit(self.writer.flush))
+
+            if time.monotonic() - last_stats >= self.stats_interval:
+                print(f"Ingest stats: {self.stats()}")
+                last_stats = time.monotonic()
+
+    async def run(self):
+        read_executor = ThreadPoolExecutor(max_workers=len(self.readers), thread_name_prefix='serial-read')
+        self.flush_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest-flush')
+        tasks = [asyncio.create_task(reader.run(self.enqueue, read_executor)) for reader in self.readers]
+        tasks.append(asyncio.create_task(self._consume()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Cancelling the await does not stop a flush already running in its thread
+            self.flush_executor.shutdown(wait=True)
+            read_executor.shutdown(wait=True)
+            while not self.queue.empty():
+                stream, reading = self.queue.get_nowait()
+                self.fusion.push(stream, **reading)
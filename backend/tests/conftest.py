@@ -0,0 +1,47 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.extensions import db  # noqa: E402
+
+
+def _date_format(value, fmt):
+    # The only MySQL function the rollup SQL needs; %i is MySQL's minutes
+    return datetime.fromisoformat(value).strftime(fmt.replace('%i', '%M'))
+
+
+@pytest.fixture
+def app(tmp_path):
+    """SQLite app with the aquamans schema; background jobs are never started."""
+    flask_app = Flask('aquamans-test')
+    flask_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'aquamans.db'}",
+        BACKGROUND_JOBS=False,
+        ARCHIVE_DIR=str(tmp_path / 'archive')
+    )
+    db.init_app(flask_app)
+    with flask_app.app_context():
+        from app import models  # noqa: F401
+
+        event.listen(db.engine, 'connect',
+                     lambda connection, record: connection.create_function('DATE_FORMAT', 2, _date_format))
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def archive(app, monkeypatch):
+    """The archive singleton pointed at this test's directory, horizon never cached."""
+    from app.services.archive_service import archive
+
+    monkeypatch.setattr(archive, 'archive_dir', app.config['ARCHIVE_DIR'])
+    monkeypatch.setattr(archive, 'horizon_ttl', 0)
+    return archive
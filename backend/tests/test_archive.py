@@ -0,0 +1,107 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from app.extensions import db  # noqa: E402
+from app.models import aquamans  # noqa: E402
+from app.services.archive_service import ARCHIVE_COLUMNS  # noqa: E402
+
+START = datetime(2026, 10, 1)
+
+
+def write_day(archive, rows, name='part-1.parquet'):
+    """Store rows (id, timeData, temperature) as one archived file of their day."""
+    day_dir = archive._day_dir(rows[0][1].replace(hour=0, minute=0, second=0, microsecond=0))
+    os.makedirs(day_dir, exist_ok=True)
+    columns = {column: [None] * len(rows) for column in ARCHIVE_COLUMNS}
+    columns['id'], columns['timeData'], columns['temperature'] = (list(values) for values in zip(*rows))
+    path = os.path.join(day_dir, name)
+    pq.write_table(pa.table(columns, schema=archive._schema()), path)
+    return path
+
+
+def add_hot(rows):
+    db.session.add_all(aquamans(id=row_id, timeData=time, temperature=value) for row_id, time, value in rows)
+    db.session.commit()
+
+
+def read_all(archive, start=None, end=None):
+    return [row for chunk in archive.readings(start, end, ('id', 'temperature'), chunk_size=7) for row in chunk]
+
+
+@pytest.fixture
+def tiers(app, archive):
+    # Two archived days, written out of order within each file, plus hot rows
+    # that interleave with the second day (alerted readings stay in MySQL)
+    cold = [(index + 1, START + timedelta(hours=index * 3), float(index)) for index in range(16)]
+    write_day(archive, cold[8:12][::-1], 'part-9.parquet')
+    write_day(archive, cold[:8][::-1])
+    write_day(archive, cold[12:])
+    hot = [(100, START + timedelta(days=1, hours=4), 50.0), (101, START + timedelta(days=2, hours=1), 51.0),
+           (102, START + timedelta(days=2, hours=2), 52.0)]
+    add_hot(hot)
+    return cold, hot
+
+
+def test_readings_merge_both_tiers_in_time_order(archive, tiers):
+    cold, hot = tiers
+    rows = read_all(archive)
+    assert [row.id for row in rows] == [row_id for row_id, _, _ in sorted(cold + hot, key=lambda row: row[1])]
+
+    window = read_all(archive, START + timedelta(days=1, hours=3), START + timedelta(days=2, hours=1))
+    assert [row.id for row in window] == [10, 100, 11, 12, 13, 14, 15, 16, 101]
+
+
+def test_horizon_follows_the_archive_directory(archive, tiers):
+    assert archive.horizon == START + timedelta(days=2)
+    assert archive.covers(START + timedelta(days=1)) and not archive.covers(START + timedelta(days=2))
+
+    write_day(archive, [(200, START + timedelta(days=2, hours=5), 1.0)])
+    assert archive.covers(START + timedelta(days=2))
+
+
+def test_aggregate_matches_the_archived_rows(archive, tiers):
+    cold, _ = tiers
+    count, minimum, maximum, total, non_null = archive.aggregate(START, START + timedelta(days=1), ('temperature',))
+    values = [value for _, time, value in cold if time < START + timedelta(days=1)]
+    assert (count, minimum, maximum, total, non_null) == (len(values), min(values), max(values), sum(values), len(values))
+
+
+def test_pending_files_are_published_without_rows_still_in_mysql(archive, tiers):
+    rows = [(300 + index, START + timedelta(days=1, hours=1, minutes=index), 70.0 + index) for index in range(4)]
+    path = write_day(archive, rows, 'part-300-303.parquet.pending')
+    add_hot(rows[2:])
+
+    # Until settled, the rows are only read from MySQL
+    assert [row.id for row in read_all(archive) if row.id >= 300] == [302, 303]
+
+    published, count = archive._settle(path)
+    assert count == 2 and not os.path.exists(path)
+    assert pq.read_table(published)['id'].to_pylist() == [300, 301]
+    assert [row.id for row in read_all(archive) if row.id >= 300] == [300, 301, 302, 303]
+
+
+def test_unfiltered_pages_merge_both_tiers(app, archive, tiers):
+    from app.extensions import cache
+    from app.services.data_service import DataService
+
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cold, hot = tiers
+    newest_first = [row_id for row_id, _, _ in sorted(cold + hot, key=lambda row: row[1], reverse=True)]
+    service = DataService()
+
+    pages = [service.get_data(None, page=page, per_page=5).get_json() for page in range(1, 5)]
+    assert [page['total'] for page in pages] == [len(newest_first)] * 4
+    assert [row['id'] for page in pages for row in page['data']] == newest_first
+
+    ids, cursor = [], ''
+    while cursor is not None:
+        body = service.get_data(None, per_page=4, cursor=cursor).get_json()
+        ids += [row['id'] for row in body['data']]
+        cursor = body['next_cursor']
+    assert ids == newest_first
+
@@ -0,0 +1,65 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.delta_codec import FRAME_HEADER, DeltaEncoder, decode_frame
+
+FIELDS = ['temperature', 'oxygen', 'phlevel', 'turbidity']
+
+
+def test_decoded_frames_match_the_payloads():
+    encoder = DeltaEncoder(FIELDS, keyframe_interval=3)
+    payloads = [
+        {'temperature': 27.5, 'oxygen': 5.0, 'phlevel': 7.1, 'turbidity': 12.0, 'timestamp': '2026-10-01T08:00:00'},
+        {'temperature': 27.5, 'oxygen': 4.5, 'phlevel': 7.1, 'turbidity': 12.0, 'timestamp': '2026-10-01T08:00:05'},
+        {'temperature': 28.0, 'oxygen': 4.5, 'phlevel': None, 'turbidity': 12.0, 'timestamp': '2026-10-01T08:00:10'},
+        {'temperature': 28.0, 'oxygen': 4.5, 'phlevel': None, 'turbidity': 12.0, 'timestamp': '2026-10-01T08:00:15'},
+        {'temperature': 28.0, 'oxygen': 4.5, 'phlevel': None, 'turbidity': 13.0, 'timestamp': '2026-10-01T08:00:20'},
+    ]
+
+    state = None
+    keyframes = []
+    for sequence, payload in enumerate(payloads, start=1):
+        state, keyframe, decoded_sequence = decode_frame(encoder.encode(payload), FIELDS, state)
+        keyframes.append(keyframe)
+        assert decoded_sequence == sequence
+        assert {field: state[field] for field in FIELDS} == pytest.approx({field: payload[field] for field in FIELDS})
+        assert state['timestamp'] == payload['timestamp']
+
+    assert keyframes == [True, False, False, False, True]
+
+
+def test_only_changed_fields_are_sent():
+    encoder = DeltaEncoder(FIELDS)
+    first = encoder.encode({'temperature': 27.5, 'oxygen': 5.0, 'timestamp': '2026-10-01T08:00:00'})
+    second = encoder.encode({'temperature': 27.5, 'oxygen': 5.5, 'timestamp': '2026-10-01T08:00:05'})
+    assert len(second) == len(first) - 4 * 3
+
+    # Same reading again: nothing to send
+    assert encoder.encode({'temperature': 27.5, 'oxygen': 5.5, 'timestamp': '2026-10-01T08:00:05'}) is None
+
+
+def test_reset_forces_a_keyframe():
+    encoder = DeltaEncoder(FIELDS)
+    encoder.encode({'temperature': 27.5, 'timestamp': '2026-10-01T08:00:00'})
+    encoder.reset()
+    _, keyframe, _ = decode_frame(encoder.encode({'temperature': 27.5, 'timestamp': '2026-10-01T08:00:00'}), FIELDS)
+    assert keyframe
+
+
+@pytest.fixture
+def manila_time(monkeypatch):
+    monkeypatch.setenv('TZ', 'Asia/Manila')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_timestamps_are_utc_whatever_the_server_zone(manila_time):
+    encoder = DeltaEncoder(FIELDS)
+    frame = encoder.encode({'temperature': 27.5, 'timestamp': '2026-10-01T08:00:00'})
+
+    assert FRAME_HEADER.unpack_from(frame)[2] == datetime(2026, 10, 1, 8, tzinfo=timezone.utc).timestamp()
+    assert decode_frame(frame, FIELDS)[0]['timestamp'] == '2026-10-01T08:00:00'
@@ -0,0 +1,23 @@
+import numpy as np
+
+from app.utils.downsampling import lttb
+
+
+def test_short_series_is_kept_whole():
+    assert list(lttb(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+
+def test_keeps_ends_and_count():
+    x = np.arange(1000.0)
+    y = np.sin(x / 50)
+    selected = lttb(x, y, 100)
+    assert len(selected) == 100
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+
+
+def test_keeps_a_single_spike():
+    x = np.arange(500.0)
+    y = np.zeros(500)
+    y[321] = 40.0
+    assert 321 in lttb(x, y, 20)
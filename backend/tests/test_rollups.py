@@ -0,0 +1,69 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.extensions import db
+from app.models import Alert, aquamans
+from app.services.rollup_service import rollups, split_window
+
+
+@pytest.fixture
+def readings(app, archive):
+    random.seed(7)
+    start = datetime(2026, 10, 14, 22, 17, 33)
+    rows = [
+        aquamans(
+            temperature=random.uniform(20, 35) if index % 13 else None,
+            oxygen=random.uniform(0, 6),
+            phlevel=7.0,
+            turbidity=random.uniform(0, 60),
+            catfish=random.randint(0, 5),
+            dead_catfish=random.randint(0, 1),
+            timeData=start + timedelta(seconds=97 * index, microseconds=random.randint(0, 999999))
+        )
+        for index in range(2 * 86400 // 97)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    db.session.add_all(Alert(reading_id=row.id, alert_type='water_quality') for row in rows[::50])
+    db.session.commit()
+    return rows
+
+
+def expected_summary(rows, start, end):
+    alerted = {row.id for row in rows[::50]}
+    selected = [row for row in rows if start <= row.timeData <= end]
+    temperatures = [row.temperature for row in selected if row.temperature is not None]
+    return {
+        'count': len(selected),
+        'alert_count': sum(1 for row in selected if row.id in alerted),
+        'temperature_min': min(temperatures),
+        'temperature_max': max(temperatures),
+        'temperature_sum': pytest.approx(sum(temperatures)),
+        'temperature_count': len(temperatures),
+        'catfish_sum': pytest.approx(sum(row.catfish for row in selected)),
+    }
+
+
+def test_split_window_covers_the_window_exactly():
+    start, stop = datetime(2026, 10, 1, 3, 4, 5, 600), datetime(2026, 10, 3, 7, 0, 30)
+    segments = split_window(start, stop)
+    assert segments[0][1] == start and segments[-1][2] == stop
+    assert all(previous[2] == following[1] for previous, following in zip(segments, segments[1:]))
+    assert [resolution for resolution, _, _ in segments] == ['raw', 'minute', 'hour', 'day', 'hour', 'raw']
+
+
+@pytest.mark.parametrize('start, end', [
+    (datetime(2026, 10, 15, 3, 4, 5, 600), datetime(2026, 10, 15, 23, 59, 59, 999999)),
+    (datetime(2026, 10, 14, 22, 30), datetime(2026, 10, 16, 23, 0)),
+    (datetime(2026, 10, 15, 10, 0, 1), datetime(2026, 10, 15, 10, 0, 50)),
+])
+def test_summary_from_rollups_matches_the_raw_rows(readings, monkeypatch, start, end):
+    lo, hi = datetime(2026, 10, 14, 22, 0), datetime(2026, 10, 16, 23, 0)
+    rollups.rebuild(lo, hi)
+    monkeypatch.setattr(rollups, 'compacted_until', hi)
+
+    summary = rollups.summary(start, end)
+    expected = expected_summary(readings, start, end)
+    assert {key: summary[key] for key in expected} == expected
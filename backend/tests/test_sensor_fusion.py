@@ -0,0 +1,39 @@
+from sensor_fusion import SensorFusion
+
+
+def collect():
+    rows = []
+    return rows, lambda **row: rows.append(row)
+
+
+def test_streams_join_into_one_row():
+    rows, emit = collect()
+    fusion = SensorFusion(emit)
+    fusion.push('water', temperature=27.0, phlevel=7.2)
+    fusion.push('water', temperature=27.1, phlevel=7.1)
+    fusion.push('oxygen', oxygen=5.0)
+    fusion.push('oxygen', oxygen=4.9)
+
+    # Each oxygen reading completes the oldest sample still missing one
+    assert [(row['temperature'], row['oxygen']) for row in rows] == [(27.0, 5.0), (27.1, 4.9)]
+    assert fusion.stats['fused'] == 2 and not fusion.pending
+
+
+def test_expired_samples_keep_only_the_primary_stream():
+    rows, emit = collect()
+    fusion = SensorFusion(emit, window=2.0)
+    fusion.push('water', temperature=27.0)
+    fusion.push('oxygen', oxygen=5.0)
+    fusion.push('oxygen', oxygen=4.8)
+    fusion.push('oxygen', oxygen=4.6)
+
+    started = fusion.pending[0]['started']
+    fusion.expire(now=started + 10.0)
+
+    assert [row.get('oxygen') for row in rows] == [5.0]
+    assert fusion.stats['dropped'] == 2
+
+    fusion.push('water', temperature=26.5)
+    fusion.drain()
+    assert rows[-1]['temperature'] == 26.5 and 'oxygen' not in rows[-1]
+    assert fusion.stats['partial'] == 1
@@ -0,0 +1,162 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from sensor_ingest import BufferedIngestWriter
+
+
+class DatabaseError(Exception):
+    """Stands in for MySQLdb.Error, so the tests run without the driver."""
+
+
+class FakeDatabase:
+    """Connection factory that fails while `down` is set or after `fail_after` more inserts."""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+        self.fail_after = None
+
+    def connect(self):
+        if self.down:
+            raise DatabaseError("Can't connect to MySQL server")
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.pending = []
+
+    def cursor(self):
+        return self
+
+    def executemany(self, query, rows):
+        if self.database.down or self.database.fail_after == 0:
+            raise DatabaseError('Lost connection to MySQL server during query')
+        if self.database.fail_after is not None:
+            self.database.fail_after -= 1
+        self.pending = list(rows)
+
+    def commit(self):
+        self.database.rows += self.pending
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+def readings(count, start=datetime(2026, 10, 1, 8, 0)):
+    return [{'temperature': 20.0 + index, 'timeData': start + timedelta(seconds=index)} for index in range(count)]
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def writer(database, tmp_path):
+    return BufferedIngestWriter(database.connect, batch_size=5, spool_path=str(tmp_path / 'spool.jsonl'),
+                                db_error=DatabaseError)
+
+
+def temperatures(database):
+    return [row[0] for row in database.rows]
+
+
+def test_outage_is_spooled_and_replayed_in_order(writer, database):
+    database.down = True
+    for reading in readings(12):
+        writer.add(**reading)
+    writer.flush()
+    assert database.rows == [] and writer.stats['spooled'] == 12
+
+    database.down = False
+    for reading in readings(3, datetime(2026, 10, 1, 9, 0)):
+        writer.add(**reading)
+    writer.flush()
+
+    assert temperatures(database) == [20.0 + index for index in range(12)] + [20.0, 21.0, 22.0]
+    assert not os.path.exists(writer.spool_path) and not os.path.exists(writer.replay_path)
+
+
+def test_failed_replay_keeps_the_rows_not_yet_written(writer, database):
+    database.down = True
+    for reading in readings(12):
+        writer.add(**reading)
+    writer.flush()
+
+    # The replay commits one chunk of 5, then the connection drops
+    database.down = False
+    database.fail_after = 1
+    writer.add(**readings(1, datetime(2026, 10, 1, 9, 0))[0])
+    writer.flush()
+    assert len(database.rows) == 5
+
+    database.fail_after = None
+    writer.flush()
+    writer.add(**readings(1, datetime(2026, 10, 1, 10, 0))[0])
+    writer.flush()
+
+    stamps = [row[-1] for row in database.rows]
+    assert len(stamps) == len(set(stamps)) == 14
+    assert stamps[:12] == [reading['timeData'] for reading in readings(12)]
+
+
+def test_unreadable_spool_lines_are_quarantined(writer, database, tmp_path):
+    with open(writer.spool_path, 'w', encoding='utf-8') as spool:
+        spool.write(json.dumps({'temperature': 25.0, 'timeData': '2026-10-01T08:00:00'}) + '\n')
+        spool.write('{"temperature": 26.0, "timeData": \n')
+        spool.write(json.dumps({'temperature': 27.0, 'timeData': 'yesterday'}) + '\n')
+
+    writer.add(**readings(1)[0])
+    writer.flush()
+
+    assert temperatures(database) == [25.0, 20.0]
+    assert writer.stats['quarantined'] == 2
+    with open(writer.bad_path, encoding='utf-8') as bad:
+        assert len(bad.readlines()) == 2
+
+
+def test_spool_keeps_the_newest_rows(database, tmp_path):
+    writer = BufferedIngestWriter(database.connect, batch_size=5, spool_path=str(tmp_path / 'spool.jsonl'),
+                                  spool_max_rows=8, db_error=DatabaseError)
+    database.down = True
+    for reading in readings(20):
+        writer.add(**reading)
+    writer.flush()
+    assert writer.stats['dropped'] > 0
+
+    database.down = False
+    writer.add(**readings(1, datetime(2026, 10, 2))[0])
+    writer.flush()
+
+    replayed = temperatures(database)[:-1]
+    assert len(replayed) == 20 - writer.stats['dropped']
+    assert replayed[-8:] == [20.0 + index for index in range(12, 20)]
+
+
+def test_on_flush_runs_only_for_committed_batches(database, tmp_path):
+    flushed = []
+    writer = BufferedIngestWriter(database.connect, batch_size=5, spool_path=str(tmp_path / 'spool.jsonl'),
+                                  db_error=DatabaseError, on_flush=flushed.append)
+    database.down = True
+    writer.add(**readings(1)[0])
+    writer.flush()
+    assert flushed == []
+
+    database.down = False
+    writer.add(**readings(1, datetime(2026, 10, 1, 9, 0))[0])
+    writer.flush()
+    assert [len(rows) for rows in flushed] == [1]
+
+    writer.on_flush = lambda rows: 1 / 0
+    writer.add(**readings(1, datetime(2026, 10, 1, 10, 0))[0])
+    writer.flush()
+    assert len(database.rows) == 3 and writer.stats['notify_errors'] == 1
@@ -0,0 +1,43 @@
+from app.utils.tracker import DEAD_CLASS, DetectionTracker
+
+LIVE = 0
+
+
+def fish(x, cls=LIVE):
+    return (x, 100, x + 40, 120, 0.9, cls)
+
+
+def test_dead_event_needs_consecutive_dead_frames():
+    tracker = DetectionTracker(dead_frames=5)
+    events = []
+    for frame in range(8):
+        # One flipped frame resets the streak
+        cls = LIVE if frame == 2 else DEAD_CLASS
+        events.append(tracker.update([fish(10 + frame, cls)]).dead_events)
+
+    assert [len(batch) for batch in events] == [0, 0, 0, 0, 0, 0, 0, 1]
+
+
+def test_dead_event_fires_once_per_track():
+    tracker = DetectionTracker(dead_frames=3)
+    fired = sum(len(tracker.update([fish(10, DEAD_CLASS)]).dead_events) for _ in range(10))
+    assert fired == 1
+
+
+def test_reused_frames_do_not_advance_the_tracker():
+    tracker = DetectionTracker(dead_frames=5, min_hits=3)
+    for _ in range(3):
+        tracker.update([fish(10, DEAD_CLASS)])
+    for _ in range(10):
+        counts = tracker.current()
+        assert counts.dead_events == []
+    assert counts.dead_catfish == 1 and counts.catfish == 0
+
+    events = [tracker.update([fish(10, DEAD_CLASS)]).dead_events for _ in range(2)]
+    assert [len(batch) for batch in events] == [0, 1]
+
+
+def test_counts_wait_for_min_hits():
+    tracker = DetectionTracker(min_hits=3)
+    counts = [tracker.update([fish(10), fish(200)]).catfish for _ in range(4)]
+    assert counts == [0, 0, 2, 2]
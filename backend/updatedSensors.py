@@ -1,68 +1,87 @@
-import serial
+import asyncio
 import MySQLdb
-import time
+import serial
+import os
 import sys
+from sensor_ingest import BufferedIngestWriter
+from app import create_app
+from app.services.current_state import refresh_after_flush
+from sensor_fusion import SensorFusion
+from serial_reader import SerialPortReader, SerialIngest
 
-try:
-    dbConn = MySQLdb.connect(host="localhost", user="root", passwd="", db="dbserial")
-    cursor = dbConn.cursor()
-except MySQLdb.Error as err:
-    print(f"Could not connect to database: {err}")
-    sys.exit(1)
+# Readings are grouped into one INSERT per batch instead of one commit per line
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 5  # seconds
+SPOOL_PATH = 'logs/sensor_spool.jsonl'
+SPOOL_MAX_ROWS = 100000
+FUSION_WINDOW = 2  # seconds between matching readings of the boards
+QUEUE_SIZE = 1000
+STATS_INTERVAL = 60  # seconds
 
-device_arduino1 = 'COM8'
-device_arduino2 = 'COM9'
+# One entry per board; add more boards here, each stream fills its own columns
+PORTS = [
+    {
+        'device': 'COM8',
+        'baudrate': 9600,
+        'stream': 'water',
+        'fields': ['temperature', 'tempResult', 'phlevel', 'phResult', 'turbidity', 'turbidityResult']
+    },
+    {
+        'device': 'COM9',
+        'baudrate': 115200,
+        'stream': 'oxygen',
+        'fields': ['oxygen', 'oxygenResult']
+    },
+]
+PRIMARY_STREAM = 'water'
 
-try:
-    print(f"Trying Arduino 1 on {device_arduino1}...")
-    arduino1 = serial.Serial(device_arduino1, 9600)
-except serial.SerialException as e:
-    print(f"Failed to connect to Arduino 1 on {device_arduino1}: {e}")
-    sys.exit(1)
+# Same config as the web app, so flushed readings reach its shared cache
+app = create_app(os.environ.get('AQUAMANS_CONFIG', 'development'), start_background=False)
+
+def connect_db():
+    return MySQLdb.connect(host="localhost", user="root", passwd="", db="dbserial")
 
 try:
-    print(f"Trying Arduino 2 on {device_arduino2}...")
-    arduino2 = serial.Serial(device_arduino2, 115200)
-except serial.SerialException as e:
-    print(f"Failed to connect to Arduino 2 on {device_arduino2}: {e}")
+    writer = BufferedIngestWriter(
+        connect_db,
+        batch_size=BATCH_SIZE,
+        max_age=FLUSH_INTERVAL,
+        spool_path=SPOOL_PATH,
+        spool_max_rows=SPOOL_MAX_ROWS,
+        auto_flush=False,
+        on_flush=refresh_after_flush(app)
+    )
+    writer.open()
+except MySQLdb.Error as err:
+    print(f"Could not connect to database: {err}")
     sys.exit(1)
 
-try:
-    while True:
-        time.sleep(1)
+readers = [SerialPortReader(**port) for port in PORTS]
+for reader in readers:
+    try:
+        reader.open()
+    except serial.SerialException as e:
+        print(f"Failed to connect to {reader.stream} on {reader.device}: {e}")
+        sys.exit(1)
 
-        try:
-            data1 = arduino1.readline().decode('utf-8').strip()
-            print(f"Arduino 1 Data: {data1}")
-            pieces1 = data1.split()
-            if len(pieces1) == 6:
-                cursor.execute(
-                    "INSERT INTO aquamans (temperature, tempResult, phlevel, phResult, turbidity, turbidityResult) "
-                    "VALUES (%s, %s, %s, %s, %s, %s)", 
-                    (pieces1[0], pieces1[1], pieces1[2], pieces1[3], pieces1[4], pieces1[5])
-                )
-                dbConn.commit()
-        except serial.SerialException as e:
-            print(f"Error reading from Arduino 1: {e}")
+# All boards are joined into one row per sample
+fusion = SensorFusion(
+    writer.add,
+    streams=[port['stream'] for port in PORTS],
+    primary=PRIMARY_STREAM,
+    window=FUSION_WINDOW
+)
+ingest = SerialIngest(readers, fusion, writer, queue_size=QUEUE_SIZE, stats_interval=STATS_INTERVAL)
 
-        try:
-            data2 = arduino2.readline().decode('utf-8').strip()
-            print(f"Arduino 2 Data: {data2}")
-            pieces2 = data2.split()
-            if len(pieces2) == 2:
-                cursor.execute(
-                    "UPDATE aquamans SET oxygen = %s, oxygenResult = %s WHERE id = (SELECT MAX(id) FROM aquamans)", 
-                    (pieces2[0], pieces2[1])
-                )
-                dbConn.commit()
-        except serial.SerialException as e:
-            print(f"Error reading from Arduino 2: {e}")
+try:
+    asyncio.run(ingest.run())
 
 except KeyboardInterrupt:
     print("Terminating...")
 
 finally:
-    cursor.close()
-    dbConn.close()
-    arduino1.close()
-    arduino2.close()
+    # ingest.run() has waited for its last flush, so the connection is ours again
+    fusion.drain()
+    writer.close()
+    for reader in readers:
+        reader.close()